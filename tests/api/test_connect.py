@@ -2,9 +2,16 @@ import asyncio
 
 import pytest
 
-from zigpy_znp.api import ZNP
+import zigpy_znp.config as conf
+import zigpy_znp.commands as c
+from zigpy_znp.api import ZNP, ConnectStats
 
-from ..conftest import FAKE_SERIAL_PORT, BaseServerZNP, config_for_port_path
+from ..conftest import (
+    FAKE_SERIAL_PORT,
+    BaseServerZNP,
+    FormedLaunchpadCC26X2R1,
+    config_for_port_path,
+)
 
 pytestmark = [pytest.mark.asyncio]
 
@@ -30,6 +37,71 @@ async def test_connect_skip_bootloader(make_znp_server):
     znp.close()
 
 
+def fast_connect_config():
+    return conf.CONFIG_SCHEMA(
+        {
+            conf.CONF_DEVICE: {conf.CONF_DEVICE_PATH: FAKE_SERIAL_PORT},
+            conf.CONF_ZNP_CONFIG: {conf.CONF_FAST_CONNECT: True},
+        }
+    )
+
+
+async def test_fast_connect(make_znp_server, mocker):
+    znp_server = make_znp_server(server_cls=FormedLaunchpadCC26X2R1)
+    znp = ZNP(fast_connect_config())
+
+    # The fixed delays are never waited for
+    mocker.patch("zigpy_znp.api.AFTER_CONNECT_DELAY", 60)
+    mocker.patch("zigpy_znp.api.STARTUP_DELAY", 60)
+
+    stats = ConnectStats()
+    await znp.connect(stats=stats)
+
+    assert znp.version == 3.30
+    assert stats.connects == 1
+    assert stats.fast_connects == 1
+    assert stats.fallbacks == 0
+    assert stats.last_latency < 1
+
+    # The bootloader is still skipped
+    data_written = b"".join(c[-2][0] for c in znp_server._uart.data_received.mock_calls)
+    assert data_written.startswith(b"\xEF" * 256)
+
+    znp.close()
+
+
+async def test_fast_connect_fallback(make_znp_server, mocker):
+    znp_server = make_znp_server(server_cls=FormedLaunchpadCC26X2R1)
+    znp = ZNP(fast_connect_config())
+
+    mocker.patch("zigpy_znp.api.FAST_CONNECT_PING_TIMEOUTS", (0.01, 0.01))
+
+    # The radio ignores the fast connect pings
+    ping_replier = znp_server.ping_replier
+    pings = []
+
+    def slow_ping_replier(request):
+        pings.append(request)
+
+        if len(pings) <= 2:
+            return []
+
+        return ping_replier(request)
+
+    znp_server.reply_to(c.SYS.Ping.Req(), responses=[slow_ping_replier], override=True)
+
+    stats = ConnectStats()
+    await znp.connect(stats=stats)
+
+    assert len(pings) == 3
+    assert znp.version == 3.30
+    assert stats.connects == 1
+    assert stats.fast_connects == 0
+    assert stats.fallbacks == 1
+
+    znp.close()
+
+
 async def wait_for_spy(spy):
     while True:
         if spy.called:
@@ -73,3 +145,19 @@ async def test_api_close(connected_znp, mocker):
     assert dict_minus(znp.__dict__, ignored_keys) == dict_minus(
         znp2.__dict__, ignored_keys
     )
+
+
+async def test_connect_known_version(make_znp_server, mocker):
+    znp_server = make_znp_server(server_cls=FormedLaunchpadCC26X2R1)
+    znp = ZNP(config_for_port_path(znp_server.port_path))
+
+    detect_zstack_version = mocker.patch("zigpy_znp.api.detect_zstack_version")
+
+    await znp.connect(version=3.0)
+
+    # The provided version is trusted, the radio still has to respond to a ping
+    assert znp.version == 3.0
+    assert znp.capabilities is not None
+    assert detect_zstack_version.call_count == 0
+
+    znp.close()
@@ -2,6 +2,7 @@ import pytest
 
 import zigpy_znp.types as t
 import zigpy_znp.commands as c
+from zigpy_znp.nvram import legacy_groups
 from zigpy_znp.types import nvids
 from zigpy_znp.exceptions import SecurityError
 
@@ -311,3 +312,12 @@ async def test_osal_delete(connected_znp, nvid, length):
         assert not delete_rsp.done()
     else:
         await delete_rsp
+
+
+def test_legacy_groups_table_bounds():
+    groups = {group[0]: group for group in legacy_groups()}
+
+    for start, end in nvids.NWK_NVID_TABLES.items():
+        # Table ranges include their END NVID
+        assert groups[start] == list(range(start, end + 1))
+        assert end not in groups
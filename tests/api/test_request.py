@@ -59,6 +59,28 @@ async def test_cleanup_timeout_internal(connected_znp):
     assert not znp._listeners
 
 
+async def test_request_timeout_override(connected_znp):
+    znp, znp_server = connected_znp
+
+    # The configured timeout is far longer
+    with pytest.raises(asyncio.TimeoutError):
+        async with async_timeout.timeout(1):
+            await znp.request(c.Util.TimeAlive.Req(), timeout=0.1)
+
+    assert not znp._listeners
+
+
+async def test_last_frame_received(connected_znp):
+    znp, znp_server = connected_znp
+
+    assert znp.last_frame_received is None
+
+    znp_server.send(c.ZDO.PermitJoinInd.Callback(Duration=0))
+    await asyncio.sleep(0.01)
+
+    assert znp.last_frame_received is not None
+
+
 async def test_cleanup_timeout_external(connected_znp):
     znp, znp_server = connected_znp
 
@@ -1,12 +1,22 @@
+import time
 import asyncio
 
 import pytest
 
+import zigpy_znp.types as t
 import zigpy_znp.config as conf
+import zigpy_znp.commands as c
+from zigpy_znp.api import ZNP
 from zigpy_znp.uart import connect as uart_connect
+from zigpy_znp.exceptions import ConnectionLostError
 from zigpy_znp.zigbee.application import ControllerApplication
 
-from ..conftest import FORMED_DEVICES, FormedLaunchpadCC26X2R1, swap_attribute
+from ..conftest import (
+    FORMED_DEVICES,
+    FormedZStack1CC2531,
+    FormedLaunchpadCC26X2R1,
+    swap_attribute,
+)
 
 pytestmark = [pytest.mark.asyncio]
 
@@ -181,7 +191,8 @@ async def test_multiple_shutdown(make_application):
 
 @pytest.mark.parametrize("device", FORMED_DEVICES)
 async def test_reconnect_lockup(device, event_loop, make_application, mocker):
-    mocker.patch("zigpy_znp.zigbee.application.WATCHDOG_PERIOD", 0.1)
+    mocker.patch("zigpy_znp.zigbee.application.WATCHDOG_IDLE_INTERVAL", 0.1)
+    mocker.patch("zigpy_znp.zigbee.application.WATCHDOG_PING_TIMEOUT", 0.1)
 
     app, znp_server = make_application(
         server_cls=device,
@@ -202,7 +213,7 @@ async def test_reconnect_lockup(device, event_loop, make_application, mocker):
         assert app._znp is not None
         assert app._reconnect_task.done()
 
-        # Wait for more than the SREQ_TIMEOUT to pass, the watchdog will notice
+        # Wait for the idle ping to time out, the watchdog will notice
         await asyncio.sleep(0.3)
 
         # We will treat this as a disconnect
@@ -222,7 +233,7 @@ async def test_reconnect_lockup(device, event_loop, make_application, mocker):
 
 @pytest.mark.parametrize("device", FORMED_DEVICES)
 async def test_reconnect_lockup_pyserial(device, event_loop, make_application, mocker):
-    mocker.patch("zigpy_znp.zigbee.application.WATCHDOG_PERIOD", 0.1)
+    mocker.patch("zigpy_znp.zigbee.application.WATCHDOG_IDLE_INTERVAL", 0.1)
 
     app, znp_server = make_application(
         server_cls=device,
@@ -270,3 +281,276 @@ async def test_reconnect_lockup_pyserial(device, event_loop, make_application, m
     assert app._znp and app._znp._uart
 
     await app.shutdown()
+
+
+@pytest.mark.parametrize("device", FORMED_DEVICES)
+async def test_watchdog_activity(device, make_application, mocker):
+    mocker.patch("zigpy_znp.zigbee.application.WATCHDOG_IDLE_INTERVAL", 0.1)
+
+    app, znp_server = make_application(server_cls=device)
+    await app.startup(auto_form=False)
+
+    mocker.spy(app._znp, "request")
+
+    def ping_count():
+        return sum(
+            isinstance(call[1][0], c.SYS.Ping.Req)
+            for call in app._znp.request.mock_calls
+        )
+
+    # Any traffic from the radio counts as a heartbeat
+    for i in range(10):
+        znp_server.send(c.ZDO.PermitJoinInd.Callback(Duration=0))
+        await asyncio.sleep(0.03)
+
+    assert ping_count() == 0
+
+    # The radio is pinged only once it is idle
+    await asyncio.sleep(0.15)
+    assert ping_count() >= 1
+    assert not app._watchdog_task.done()
+
+    await app.shutdown()
+
+
+def warm_reconnect_config():
+    return {
+        conf.CONF_ZNP_CONFIG: {
+            conf.CONF_WARM_RECONNECT: True,
+            conf.CONF_AUTO_RECONNECT_RETRY_DELAY: 0.01,
+        }
+    }
+
+
+async def wait_for_reconnect(app):
+    await asyncio.sleep(0)
+
+    while app._znp is None or not app._reconnect_task.done():
+        await asyncio.sleep(0.01)
+
+
+@pytest.mark.parametrize("device", FORMED_DEVICES)
+async def test_warm_reconnect(device, make_application, mocker):
+    app, znp_server = make_application(
+        server_cls=device, client_config=warm_reconnect_config()
+    )
+
+    await app.startup(auto_form=False)
+
+    mocker.spy(app, "_startup")
+    mocker.spy(app, "_reset")
+
+    znp_server._uart._transport.close()
+    assert app._znp is None
+
+    await wait_for_reconnect(app)
+
+    # The radio was not restarted but its lost endpoints were registered again
+    assert app._startup.call_count == 0
+    assert app._reset.call_count == 0
+    assert znp_server.active_endpoints == [2, 1]
+    assert not app._watchdog_task.done()
+
+    await app.shutdown()
+
+
+@pytest.mark.parametrize("device", FORMED_DEVICES)
+async def test_warm_reconnect_network_changed(device, make_application, mocker):
+    app, znp_server = make_application(
+        server_cls=device, client_config=warm_reconnect_config()
+    )
+
+    await app.startup(auto_form=False)
+
+    mocker.spy(app, "_startup")
+
+    znp_server._uart._transport.close()
+
+    # Something else changed the network while we were disconnected
+    znp_server.nib.nwkPanId = 0x1234
+
+    await wait_for_reconnect(app)
+
+    assert app._startup.call_count == 1
+    assert app.pan_id == 0x1234
+
+    await app.shutdown()
+
+
+@pytest.mark.parametrize("device", FORMED_DEVICES)
+async def test_warm_reconnect_endpoint_check_fails(device, make_application, mocker):
+    app, znp_server = make_application(
+        server_cls=device, client_config=warm_reconnect_config()
+    )
+
+    await app.startup(auto_form=False)
+
+    mocker.spy(app, "_startup")
+    connect = mocker.spy(ZNP, "connect")
+
+    failures = 0
+
+    def active_endpoints_request(req):
+        nonlocal failures
+
+        # The half-reconnected radio is not used by the application
+        assert app._znp is None
+
+        # The first check after reconnecting fails
+        if failures == 0:
+            failures += 1
+            return c.ZDO.ActiveEpReq.Rsp(Status=t.Status.FAILURE)
+
+        return znp_server.active_endpoints_request(req)
+
+    znp_server.reply_to(
+        c.ZDO.ActiveEpReq.Req(DstAddr=0x0000, NWKAddrOfInterest=0x0000),
+        responses=active_endpoints_request,
+        override=True,
+    )
+
+    znp_server._uart._transport.close()
+    await wait_for_reconnect(app)
+
+    # The failed connection was closed and the retry was still warm
+    assert failures == 1
+    assert app._startup.call_count == 0
+    assert connect.call_count == 2
+
+    failed_znp, znp = [call[1][0] for call in connect.mock_calls]
+    assert failed_znp._uart is None
+    assert app._znp is znp
+    assert znp._uart is not None
+
+    await app.shutdown()
+
+
+@pytest.mark.parametrize("device", FORMED_DEVICES)
+@pytest.mark.parametrize(
+    "cluster,data,requeued",
+    [
+        # Read Attributes
+        (0x0006, bytes([0x00, 0x02, 0x00, 0x00, 0x00]), True),
+        # On
+        (0x0006, bytes([0x01, 0x02, 0x01]), False),
+    ],
+)
+async def test_warm_reconnect_in_flight(
+    device, cluster, data, requeued, make_application
+):
+    app, znp_server = make_application(
+        server_cls=device, client_config=warm_reconnect_config()
+    )
+
+    await app.startup(auto_form=False)
+
+    device = app.add_initialized_device(ieee=t.EUI64(range(8)), nwk=0xAABB)
+
+    def disconnect(request):
+        znp_server._uart._transport.close()
+        return []
+
+    data_requests = []
+
+    def data_request_replier(request):
+        data_requests.append(request)
+
+        # The connection is lost before the first request is confirmed
+        if len(data_requests) == 1:
+            return [c.AF.DataRequestExt.Rsp(Status=t.Status.SUCCESS), disconnect]
+
+        return [
+            c.AF.DataRequestExt.Rsp(Status=t.Status.SUCCESS),
+            c.AF.DataConfirm.Callback(Status=t.Status.SUCCESS, Endpoint=1, TSN=2),
+        ]
+
+    znp_server.reply_to(
+        c.AF.DataRequestExt.Req(partial=True), responses=[data_request_replier]
+    )
+
+    request = app.request(
+        device=device,
+        profile=260,
+        cluster=cluster,
+        src_ep=1,
+        dst_ep=1,
+        sequence=2,
+        data=data,
+    )
+
+    if requeued:
+        status, _ = await request
+        assert status == t.Status.SUCCESS
+        assert len(data_requests) == 2
+    else:
+        with pytest.raises(ConnectionLostError):
+            await request
+
+        assert len(data_requests) == 1
+
+    await wait_for_reconnect(app)
+    await app.shutdown()
+
+
+@pytest.fixture
+def fast_probe(mocker):
+    mocker.patch("zigpy_znp.api.AFTER_CONNECT_DELAY", 0.01)
+    mocker.patch("zigpy_znp.api.STARTUP_DELAY", 0.01)
+    mocker.patch("zigpy_znp.uart.RTS_TOGGLE_DELAY", 0)
+    mocker.patch("zigpy_znp.zigbee.application.PROBE_TIMEOUT", 1)
+
+
+async def test_probe_many(fast_probe, make_pty_znp_server):
+    silent_path, _ = make_pty_znp_server()
+    launchpad_path, _ = make_pty_znp_server(FormedLaunchpadCC26X2R1)
+    cc2531_path, _ = make_pty_znp_server(FormedZStack1CC2531)
+
+    configs = [
+        conf.SCHEMA_DEVICE({conf.CONF_DEVICE_PATH: path})
+        for path in [silent_path, launchpad_path, "/dev/null", cc2531_path]
+    ]
+
+    start = time.monotonic()
+    results = await ControllerApplication.probe_many(configs)
+
+    # Ports are probed concurrently
+    assert time.monotonic() - start < 2
+
+    assert [r.device_config for r in results] == [configs[1], configs[3]]
+    assert [r.version for r in results] == [3.30, 1.2]
+    assert t.MTCapabilities.CAP_APP_CNF in results[0].capabilities
+    assert t.MTCapabilities.CAP_APP_CNF not in results[1].capabilities
+
+
+async def test_probe_many_first(fast_probe, make_pty_znp_server, mocker):
+    mocker.patch("zigpy_znp.zigbee.application.PROBE_TIMEOUT", 10)
+
+    silent_path, _ = make_pty_znp_server()
+    launchpad_path, _ = make_pty_znp_server(FormedLaunchpadCC26X2R1)
+
+    configs = [
+        conf.SCHEMA_DEVICE({conf.CONF_DEVICE_PATH: path})
+        for path in [silent_path, launchpad_path]
+    ]
+
+    start = time.monotonic()
+    results = await ControllerApplication.probe_many(configs, first=True)
+
+    # The silent port's probe is cancelled instead of timing out
+    assert time.monotonic() - start < 5
+    assert [r.device_config for r in results] == [configs[1]]
+
+    # Both ports were closed and can be probed again
+    assert await ControllerApplication.probe(configs[1])
+
+
+async def test_probe_many_none(fast_probe, make_pty_znp_server):
+    silent_path, _ = make_pty_znp_server()
+
+    configs = [
+        conf.SCHEMA_DEVICE({conf.CONF_DEVICE_PATH: path})
+        for path in [silent_path, "/dev/null"]
+    ]
+
+    assert await ControllerApplication.probe_many(configs) == []
+    assert await ControllerApplication.probe_many(configs, first=True) == []
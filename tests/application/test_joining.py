@@ -4,6 +4,7 @@ import contextlib
 import pytest
 import zigpy.util
 import zigpy.types
+import zigpy.device
 from zigpy.zdo.types import SizePrefixedSimpleDescriptor
 
 import zigpy_znp.types as t
@@ -169,7 +170,7 @@ async def test_on_zdo_device_join_and_announce_fast(device, make_application, mo
     nwk = 0x1234
     ieee = t.EUI64.convert("11:22:33:44:55:66:77:88")
 
-    assert not app._join_announce_tasks
+    assert app._join_pipeline.waiting == 0
 
     znp_server.send(c.ZDO.TCDevInd.Callback(SrcNwk=nwk, SrcIEEE=ieee, ParentNwk=0x0001))
 
@@ -186,11 +187,12 @@ async def test_on_zdo_device_join_and_announce_fast(device, make_application, mo
             Capabilities=c.zdo.MACCapabilities.AllocateShortAddrDuringAssocNeeded,
         )
     )
+    await asyncio.sleep(0.01)
 
     app.handle_join.assert_called_once_with(nwk=nwk, ieee=ieee, parent_nwk=None)
 
     # Everything is cleaned up
-    assert not app._join_announce_tasks
+    assert app._join_pipeline.waiting == 0
 
     await app.shutdown()
 
@@ -206,7 +208,7 @@ async def test_on_zdo_device_join_and_announce_slow(device, make_application, mo
     nwk = 0x1234
     ieee = t.EUI64.convert("11:22:33:44:55:66:77:88")
 
-    assert not app._join_announce_tasks
+    assert app._join_pipeline.waiting == 0
 
     znp_server.send(c.ZDO.TCDevInd.Callback(SrcNwk=nwk, SrcIEEE=ieee, ParentNwk=0x0001))
 
@@ -226,6 +228,7 @@ async def test_on_zdo_device_join_and_announce_slow(device, make_application, mo
             Capabilities=c.zdo.MACCapabilities.AllocateShortAddrDuringAssocNeeded,
         )
     )
+    await asyncio.sleep(0.01)
 
     # The announcement will trigger another join indication
     assert app.handle_join.call_count == 2
@@ -233,6 +236,88 @@ async def test_on_zdo_device_join_and_announce_slow(device, make_application, mo
     await app.shutdown()
 
 
+@pytest.mark.parametrize("device", FORMED_ZSTACK3_DEVICES)
+async def test_on_zdo_device_rejoin_storm(device, make_application, mocker):
+    app, znp_server = make_application(server_cls=device)
+    await app.startup(auto_form=False)
+
+    mocker.patch("zigpy_znp.zigbee.application.DEVICE_JOIN_MAX_DELAY", new=0.2)
+    mocker.spy(app, "handle_join")
+    mocker.patch.object(app, "_discover_route", new=CoroutineMock())
+    mocker.patch.object(zigpy.device.Device, "schedule_initialize")
+    mocker.patch.object(zigpy.device.Device, "schedule_group_membership_scan")
+
+    devices = [
+        app.add_initialized_device(ieee=t.EUI64([i] * 8), nwk=0x1000 + i)
+        for i in range(10)
+    ]
+
+    # Every device joins twice
+    for _ in range(2):
+        for device in devices:
+            znp_server.send(
+                c.ZDO.TCDevInd.Callback(
+                    SrcNwk=device.nwk, SrcIEEE=device.ieee, ParentNwk=0x0000
+                )
+            )
+
+    # One device came back with a new address
+    znp_server.send(
+        c.ZDO.TCDevInd.Callback(
+            SrcNwk=0x2000, SrcIEEE=devices[0].ieee, ParentNwk=0x0000
+        )
+    )
+
+    # Routes are discovered right away, only for devices that need one
+    await asyncio.sleep(0.05)
+    app._discover_route.assert_called_once_with(0x2000)
+    assert app.handle_join.call_count == 0
+
+    await asyncio.sleep(0.3)
+
+    # Repeated joins are handled once and known devices are not interviewed again
+    assert app.handle_join.call_count == 10
+    assert zigpy.device.Device.schedule_initialize.call_count == 1
+    assert devices[0].nwk == 0x2000
+
+    # But their group membership is still rescanned
+    assert zigpy.device.Device.schedule_group_membership_scan.call_count == 10
+
+    assert app._join_pipeline.coalesced == 11
+    assert app._join_pipeline.handled == 10
+
+    await app.shutdown()
+
+
+@pytest.mark.parametrize("device", FORMED_DEVICES)
+async def test_on_zdo_device_join_during_shutdown(device, make_application, mocker):
+    app, znp_server = make_application(server_cls=device)
+    await app.startup(auto_form=False)
+
+    mocker.patch("zigpy_znp.zigbee.application.DEVICE_JOIN_MAX_DELAY", new=0.05)
+    mocker.patch.object(app, "handle_join")
+    mocker.patch.object(app, "_discover_route", new=CoroutineMock())
+
+    # The join is still queued when the application shuts down
+    app._inbound_messages.put(
+        app.on_zdo_tc_device_join,
+        c.ZDO.TCDevInd.Callback(
+            SrcNwk=0x1234,
+            SrcIEEE=t.EUI64.convert("11:22:33:44:55:66:77:88"),
+            ParentNwk=0x0000,
+        ),
+    )
+
+    await app.shutdown()
+    await asyncio.sleep(0.1)
+
+    # Nothing is sent to the device afterwards
+    assert app._join_pipeline.waiting == 0
+    assert app._join_pipeline.active == 0
+    assert app.handle_join.call_count == 0
+    assert app._discover_route.call_count == 0
+
+
 @pytest.mark.parametrize("device", FORMED_DEVICES)
 async def test_new_device_join_and_bind_complex(device, make_application, mocker):
     app, znp_server = make_application(server_cls=device)
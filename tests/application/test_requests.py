@@ -2,13 +2,15 @@ import asyncio
 
 import pytest
 import zigpy.zdo
-from zigpy.zdo.types import ZDOCmd, SizePrefixedSimpleDescriptor
+import zigpy.zdo.types as zdo_t
+from zigpy.zdo.types import ZDOCmd, NodeDescriptor, SizePrefixedSimpleDescriptor
 from zigpy.exceptions import DeliveryError
 
 import zigpy_znp.types as t
 import zigpy_znp.config as conf
 import zigpy_znp.commands as c
 from zigpy_znp.exceptions import InvalidCommandResponse
+from zigpy_znp.zigbee.retry import RecoveryStrategy
 
 from ..conftest import FORMED_DEVICES, CoroutineMock, FormedLaunchpadCC26X2R1
 
@@ -342,7 +344,7 @@ async def test_request_concurrency(device, make_application, mocker):
             nonlocal in_flight_requests
             nonlocal did_lock
 
-            if app._concurrent_requests_semaphore.locked():
+            if app._concurrency_limiter.locked():
                 did_lock = True
 
             in_flight_requests += 1
@@ -390,6 +392,260 @@ async def test_request_concurrency(device, make_application, mocker):
     await app.shutdown()
 
 
+@pytest.mark.parametrize("device", [FormedLaunchpadCC26X2R1])
+@pytest.mark.parametrize("adaptive", [True, False])
+async def test_request_concurrency_adaptive(device, adaptive, make_application, mocker):
+    app, znp_server = make_application(
+        server_cls=device,
+        client_config={
+            "znp_config": {
+                conf.CONF_MAX_CONCURRENT_REQUESTS: 8,
+                conf.CONF_ADAPTIVE_CONCURRENCY: adaptive,
+                conf.CONF_RETRY_POLICY: {conf.CONF_RETRY_DELAY: 0},
+            }
+        },
+    )
+
+    await app.startup()
+
+    device = app.add_initialized_device(ieee=t.EUI64(range(8)), nwk=0xAABB)
+    limiter = app._concurrency_limiter
+
+    # The radio runs out of buffers a few times
+    buffer_errors = 3
+
+    def data_request_rsp(req):
+        nonlocal buffer_errors
+
+        if buffer_errors > 0:
+            buffer_errors -= 1
+            return c.AF.DataRequestExt.Rsp(Status=t.Status.BUFFER_FULL)
+
+        return [
+            c.AF.DataRequestExt.Rsp(Status=t.Status.SUCCESS),
+            c.AF.DataConfirm.Callback(Status=t.Status.SUCCESS, Endpoint=1, TSN=req.TSN),
+        ]
+
+    znp_server.reply_to(
+        request=c.AF.DataRequestExt.Req(partial=True), responses=[data_request_rsp]
+    )
+
+    async def send_requests(count):
+        return await asyncio.gather(
+            *[
+                app.request(
+                    device,
+                    profile=260,
+                    cluster=1,
+                    src_ep=1,
+                    dst_ep=1,
+                    sequence=seq,
+                    data=b"\x00",
+                )
+                for seq in range(count)
+            ]
+        )
+
+    responses = await send_requests(8)
+    assert all(status == t.Status.SUCCESS for status, msg in responses)
+
+    assert limiter.errors == 3
+    assert limiter.error_rate > 0
+    assert limiter.in_flight == 0
+
+    if adaptive:
+        # Concurrent errors caused by the same congestion shrink the window only once
+        assert limiter.decreases == 1
+        assert limiter.limit < 8
+    else:
+        assert limiter.decreases == 0
+        assert limiter.limit == 8
+
+    # Sustained success grows the window back
+    responses = await send_requests(100)
+    assert all(status == t.Status.SUCCESS for status, msg in responses)
+
+    assert limiter.limit == 8
+    assert limiter.successes == 108
+
+    await app.shutdown()
+
+
+@pytest.mark.parametrize("device", [FormedLaunchpadCC26X2R1])
+async def test_broadcast_budget(device, make_application, mocker):
+    mocker.patch("zigpy_znp.zigbee.application.MAX_OUTSTANDING_BROADCASTS", new=2)
+
+    app, znp_server = make_application(
+        server_cls=device,
+        client_config={"znp_config": {conf.CONF_MAX_CONCURRENT_REQUESTS: 1}},
+    )
+
+    await app.startup()
+
+    # Broadcasts are delivered within 0.3s. Forget the ones sent during startup.
+    app._nib.BroadcastDeliveryTime = 3
+    budget = app._broadcast_budget
+    budget.reset()
+    broadcasts = budget.broadcasts
+
+    device = app.add_initialized_device(ieee=t.EUI64(range(8)), nwk=0xAABB)
+
+    broadcast_req = znp_server.reply_to(
+        request=c.AF.DataRequestExt.Req(
+            DstAddrModeAddress=t.AddrModeAddress(
+                mode=t.AddrMode.Broadcast, address=0xFFFD
+            ),
+            partial=True,
+        ),
+        responses=[c.AF.DataRequestExt.Rsp(Status=t.Status.SUCCESS)],
+    )
+
+    znp_server.reply_to(
+        request=c.AF.DataRequestExt.Req(
+            DstAddrModeAddress=t.AddrModeAddress(mode=t.AddrMode.NWK, address=0xAABB),
+            partial=True,
+        ),
+        responses=[
+            lambda req: [
+                c.AF.DataRequestExt.Rsp(Status=t.Status.SUCCESS),
+                c.AF.DataConfirm.Callback(
+                    Status=t.Status.SUCCESS, Endpoint=1, TSN=req.TSN
+                ),
+            ]
+        ],
+    )
+
+    def broadcast(sequence):
+        return asyncio.create_task(
+            app.broadcast(
+                profile=260,
+                cluster=0x0003,
+                src_ep=1,
+                dst_ep=0xFF,
+                grpid=0,
+                radius=3,
+                sequence=sequence,
+                data=b"???",
+            )
+        )
+
+    # Broadcasts return as soon as they are sent
+    await asyncio.wait_for(broadcast(1), timeout=0.1)
+    await asyncio.wait_for(broadcast(2), timeout=0.1)
+
+    # And do not hold up unicast requests
+    status, _ = await asyncio.wait_for(
+        app.request(
+            device,
+            profile=260,
+            cluster=1,
+            src_ep=1,
+            dst_ep=1,
+            sequence=3,
+            data=b"\x00",
+        ),
+        timeout=0.1,
+    )
+    assert status == t.Status.SUCCESS
+
+    # The broadcast transaction table is full until the first two are delivered
+    third = broadcast(4)
+    await asyncio.sleep(0.1)
+
+    assert not third.done()
+    assert broadcast_req.call_count == 2
+
+    await asyncio.wait_for(third, timeout=0.5)
+    assert broadcast_req.call_count == 3
+
+    assert budget.broadcasts == broadcasts + 3
+    assert budget.delayed == 1
+    assert budget.max_wait > 0.1
+
+    await app.shutdown()
+
+
+@pytest.mark.parametrize("device", [FormedLaunchpadCC26X2R1])
+async def test_request_concurrency_per_device(device, make_application):
+    app, znp_server = make_application(
+        server_cls=device,
+        client_config={
+            "znp_config": {
+                conf.CONF_MAX_CONCURRENT_REQUESTS: 4,
+                conf.CONF_MAX_CONCURRENT_REQUESTS_PER_DEVICE: 2,
+            }
+        },
+    )
+
+    await app.startup()
+
+    slow_device = app.add_initialized_device(ieee=t.EUI64(range(8)), nwk=0xAABB)
+    fast_device = app.add_initialized_device(ieee=t.EUI64(range(1, 9)), nwk=0xCCDD)
+    limiter = app._concurrency_limiter
+
+    in_flight = {slow_device.nwk: 0, fast_device.nwk: 0}
+
+    def make_response(req):
+        async def callback(req):
+            in_flight[req.DstAddrModeAddress.address] += 1
+            assert in_flight[slow_device.nwk] <= 2
+
+            znp_server.send(c.AF.DataRequestExt.Rsp(Status=t.Status.SUCCESS))
+
+            # The slow device takes a while to acknowledge every request
+            if req.DstAddrModeAddress.address == slow_device.nwk:
+                await asyncio.sleep(0.2)
+
+            in_flight[req.DstAddrModeAddress.address] -= 1
+            znp_server.send(
+                c.AF.DataConfirm.Callback(
+                    Status=t.Status.SUCCESS, Endpoint=1, TSN=req.TSN
+                )
+            )
+
+        asyncio.create_task(callback(req))
+
+    znp_server.reply_to(
+        request=c.AF.DataRequestExt.Req(partial=True), responses=[make_response]
+    )
+
+    def send_request(device, seq):
+        return asyncio.create_task(
+            app.request(
+                device,
+                profile=260,
+                cluster=1,
+                src_ep=1,
+                dst_ep=1,
+                sequence=seq,
+                data=b"\x00",
+            )
+        )
+
+    slow_requests = [send_request(slow_device, seq) for seq in range(6)]
+    await asyncio.sleep(0.01)
+    fast_request = send_request(fast_device, 6)
+
+    # Requests to the other device are not stuck behind the slow device
+    status, _ = await asyncio.wait_for(fast_request, timeout=0.15)
+    assert status == t.Status.SUCCESS
+    assert not any(r.done() for r in slow_requests)
+
+    responses = await asyncio.gather(*slow_requests)
+    assert all(status == t.Status.SUCCESS for status, msg in responses)
+
+    slow_stats = limiter.destination_stats[slow_device.ieee]
+    fast_stats = limiter.destination_stats[fast_device.ieee]
+
+    assert slow_stats.requests == 6
+    assert slow_stats.delayed == 4
+    assert slow_stats.max_wait >= 0.2
+    assert fast_stats.requests == 1
+    assert fast_stats.max_wait == 0
+
+    await app.shutdown()
+
+
 """
 @pytest.mark.parametrize("device", [FormedLaunchpadCC26X2R1])
 async def test_request_concurrency_overflow(device, make_application, mocker):
@@ -473,7 +729,7 @@ async def test_nonstandard_profile(device, make_application):
             c.AF.DataRequestExt.Rsp(Status=t.Status.SUCCESS),
             lambda req: c.AF.DataConfirm.Callback(
                 Status=t.Status.SUCCESS,
-                Endpoint=2,
+                Endpoint=1,
                 TSN=req.TSN,
             ),
             lambda req: c.AF.IncomingMsg.Callback(
@@ -558,6 +814,117 @@ async def test_request_cancellation_shielding(
     await app.shutdown()
 
 
+@pytest.mark.parametrize("device", [FormedLaunchpadCC26X2R1])
+async def test_request_tsn_collision(device, make_application, mocker, event_loop):
+    app, znp_server = make_application(server_cls=device)
+
+    await app.startup(auto_form=False)
+
+    mocker.patch("zigpy_znp.zigbee.application.DATA_CONFIRM_TIMEOUT", new=0.1)
+    app._znp._config[conf.CONF_ZNP_CONFIG][conf.CONF_ARSP_TIMEOUT] = 1
+
+    device = app.add_initialized_device(ieee=t.EUI64(range(8)), nwk=0xABCD)
+
+    late_confirm_sent = event_loop.create_future()
+    sent_after_late_confirm = []
+
+    def reply(req):
+        sent_after_late_confirm.append(late_confirm_sent.done())
+
+        # The first request is only confirmed after it times out
+        if len(sent_after_late_confirm) > 1:
+            return c.AF.DataConfirm.Callback(
+                Status=t.Status.SUCCESS, Endpoint=1, TSN=req.TSN
+            )
+
+        async def inner():
+            await asyncio.sleep(0.3)
+            znp_server.send(
+                c.AF.DataConfirm.Callback(
+                    Status=t.Status.SUCCESS, Endpoint=1, TSN=req.TSN
+                )
+            )
+            late_confirm_sent.set_result(True)
+
+        asyncio.create_task(inner())
+
+    znp_server.reply_to(
+        c.AF.DataRequestExt.Req(partial=True),
+        responses=[c.AF.DataRequestExt.Rsp(Status=t.Status.SUCCESS), reply],
+    )
+
+    kwargs = dict(
+        device=device, profile=260, cluster=1, src_ep=1, dst_ep=1, data=b"\x00"
+    )
+
+    with pytest.raises(asyncio.TimeoutError):
+        await app.request(sequence=1, **kwargs)
+
+    # The same TSN on another endpoint does not collide
+    assert (1, 1) in app._in_flight_requests
+    assert (1, 2) not in app._in_flight_requests
+    assert app._orphaned_confirms.live == 1
+
+    # The second request is only sent once the first one has been confirmed
+    status, _ = await app.request(sequence=1, **kwargs)
+
+    assert status == t.Status.SUCCESS
+    assert sent_after_late_confirm == [False, True]
+    assert app._in_flight_requests.collisions == 1
+    assert app._in_flight_requests.in_flight == 0
+    assert app._orphaned_confirms.live == 0
+    assert app._orphaned_confirms.late == 1
+
+    await app.shutdown()
+
+
+@pytest.mark.parametrize("device", [FormedLaunchpadCC26X2R1])
+async def test_request_orphaned_confirm_expiry(device, make_application, mocker):
+    app, znp_server = make_application(server_cls=device)
+
+    await app.startup(auto_form=False)
+
+    mocker.patch("zigpy_znp.zigbee.application.DATA_CONFIRM_TIMEOUT", new=0.1)
+    app._znp._config[conf.CONF_ZNP_CONFIG][conf.CONF_ARSP_TIMEOUT] = 30
+    app._orphaned_confirms.max_age = 0.2
+
+    device = app.add_initialized_device(ieee=t.EUI64(range(8)), nwk=0xABCD)
+
+    # The request is never confirmed
+    znp_server.reply_to(
+        c.AF.DataRequestExt.Req(partial=True),
+        responses=[c.AF.DataRequestExt.Rsp(Status=t.Status.SUCCESS)],
+    )
+
+    def confirm_listeners():
+        return app._znp._listeners.get(c.AF.DataConfirm.Callback.header, [])
+
+    with pytest.raises(asyncio.TimeoutError):
+        await app.request(
+            device=device,
+            profile=260,
+            cluster=1,
+            src_ep=1,
+            dst_ep=1,
+            sequence=1,
+            data=b"\x00",
+        )
+
+    assert app._orphaned_confirms.live == 1
+    assert len(confirm_listeners()) == 1
+    assert (1, 1) in app._in_flight_requests
+
+    # The orphaned wait is cancelled long before the ARSP timeout, freeing its TSN
+    await asyncio.sleep(0.3)
+
+    assert app._orphaned_confirms.live == 0
+    assert app._orphaned_confirms.expired == 1
+    assert not confirm_listeners()
+    assert (1, 1) not in app._in_flight_requests
+
+    await app.shutdown()
+
+
 @pytest.mark.parametrize("device", [FormedLaunchpadCC26X2R1])
 async def test_request_recovery_route_rediscovery_zdo(device, make_application, mocker):
     app, znp_server = make_application(server_cls=device)
@@ -622,6 +989,183 @@ async def test_request_recovery_route_rediscovery_zdo(device, make_application,
     await app.shutdown()
 
 
+@pytest.mark.parametrize("device", [FormedLaunchpadCC26X2R1])
+async def test_zdo_request_route_cache(device, make_application):
+    app, znp_server = make_application(server_cls=device)
+
+    await app.startup(auto_form=False)
+
+    # Routes are never cached for longer than Z-Stack keeps them
+    assert 0 < app._route_cache.ttl <= app._nib.RouteExpiryTime
+
+    device1 = app.add_initialized_device(ieee=t.EUI64(range(8)), nwk=0xABCD)
+    device2 = app.add_initialized_device(ieee=t.EUI64(range(1, 9)), nwk=0x1234)
+
+    route_check = znp_server.reply_to(
+        c.ZDO.ExtRouteChk.Req(partial=True),
+        responses=[c.ZDO.ExtRouteChk.Rsp(Status=c.zdo.RoutingStatus.SUCCESS)],
+        override=True,
+    )
+
+    for device in (device1, device2):
+        znp_server.reply_to(
+            c.ZDO.ActiveEpReq.Req(DstAddr=device.nwk, NWKAddrOfInterest=device.nwk),
+            responses=[
+                c.ZDO.ActiveEpReq.Rsp(Status=t.Status.SUCCESS),
+                c.ZDO.ActiveEpRsp.Callback(
+                    Src=device.nwk,
+                    Status=t.ZDOStatus.SUCCESS,
+                    NWK=device.nwk,
+                    ActiveEndpoints=[],
+                ),
+            ],
+        )
+
+    # The route is only checked before the first request
+    for i in range(3):
+        await device1.zdo.Active_EP_req(device1.nwk)
+
+    assert route_check.call_count == 1
+
+    # A route record proves that a route exists
+    znp_server.send(
+        c.ZDO.SrcRtgInd.Callback(DstAddr=device2.nwk, Relays=[0x0001, 0x0002])
+    )
+    await asyncio.sleep(0.1)
+
+    await device2.zdo.Active_EP_req(device2.nwk)
+    assert route_check.call_count == 1
+
+    # Resetting the radio clears its routing table
+    await app._reset()
+    await device1.zdo.Active_EP_req(device1.nwk)
+    assert route_check.call_count == 2
+
+    assert app._route_cache.hits == 3
+
+    await app.shutdown()
+
+
+@pytest.mark.parametrize("device", [FormedLaunchpadCC26X2R1])
+async def test_zdo_request_route_cache_delivery(device, make_application):
+    app, znp_server = make_application(server_cls=device)
+
+    await app.startup(auto_form=False)
+
+    device = app.add_initialized_device(ieee=t.EUI64(range(8)), nwk=0xABCD)
+
+    route_check = znp_server.reply_to(
+        c.ZDO.ExtRouteChk.Req(partial=True),
+        responses=[c.ZDO.ExtRouteChk.Rsp(Status=c.zdo.RoutingStatus.FAIL)],
+        override=True,
+    )
+
+    znp_server.reply_to(
+        c.ZDO.ExtRouteDisc.Req(partial=True),
+        responses=[c.ZDO.ExtRouteDisc.Rsp(Status=t.Status.SUCCESS)],
+    )
+
+    znp_server.reply_to(
+        c.ZDO.ActiveEpReq.Req(DstAddr=device.nwk, NWKAddrOfInterest=device.nwk),
+        responses=[
+            c.ZDO.ActiveEpReq.Rsp(Status=t.Status.SUCCESS),
+            c.ZDO.ActiveEpRsp.Callback(
+                Src=device.nwk,
+                Status=t.ZDOStatus.SUCCESS,
+                NWK=device.nwk,
+                ActiveEndpoints=[],
+            ),
+        ],
+    )
+
+    znp_server.reply_to(
+        c.AF.DataRequestExt.Req(partial=True),
+        responses=lambda req: [
+            c.AF.DataRequestExt.Rsp(Status=t.Status.SUCCESS),
+            c.AF.DataConfirm.Callback(
+                Status=t.Status.SUCCESS, Endpoint=req.SrcEndpoint, TSN=req.TSN
+            ),
+        ],
+    )
+
+    # Accepted ZDO requests do not prove that the route works
+    for i in range(2):
+        await device.zdo.Active_EP_req(device.nwk)
+
+    assert route_check.call_count == 2
+
+    # Confirmed AF deliveries do
+    await app.request(
+        device=device,
+        profile=260,
+        cluster=6,
+        src_ep=1,
+        dst_ep=1,
+        sequence=1,
+        data=b"\x01\x01\x00",
+    )
+
+    await device.zdo.Active_EP_req(device.nwk)
+    assert route_check.call_count == 2
+
+    await app.shutdown()
+
+
+@pytest.mark.parametrize("device", [FormedLaunchpadCC26X2R1])
+async def test_zdo_request_timeout_route_cache(device, make_application, mocker):
+    app, znp_server = make_application(server_cls=device)
+
+    await app.startup(auto_form=False)
+
+    mocker.patch("zigpy_znp.zigbee.application.ZDO_REQUEST_TIMEOUT", new=0.1)
+
+    device = app.add_initialized_device(ieee=t.EUI64(range(8)), nwk=0xABCD)
+
+    route_check = znp_server.reply_to(
+        c.ZDO.ExtRouteChk.Req(partial=True),
+        responses=[c.ZDO.ExtRouteChk.Rsp(Status=c.zdo.RoutingStatus.SUCCESS)],
+        override=True,
+    )
+
+    # The device accepts the first request but never replies to it
+    replies = 0
+
+    def active_ep_replier(req):
+        nonlocal replies
+        replies += 1
+
+        responses = [c.ZDO.ActiveEpReq.Rsp(Status=t.Status.SUCCESS)]
+
+        if replies > 1:
+            responses.append(
+                c.ZDO.ActiveEpRsp.Callback(
+                    Src=device.nwk,
+                    Status=t.ZDOStatus.SUCCESS,
+                    NWK=device.nwk,
+                    ActiveEndpoints=[],
+                )
+            )
+
+        return responses
+
+    znp_server.reply_to(
+        c.ZDO.ActiveEpReq.Req(DstAddr=device.nwk, NWKAddrOfInterest=device.nwk),
+        responses=active_ep_replier,
+    )
+
+    with pytest.raises(asyncio.TimeoutError):
+        await device.zdo.Active_EP_req(device.nwk)
+
+    assert route_check.call_count == 1
+    assert not app._route_cache.is_fresh(device.nwk)
+
+    # The route is checked again
+    await device.zdo.Active_EP_req(device.nwk)
+    assert route_check.call_count == 2
+
+    await app.shutdown()
+
+
 @pytest.mark.parametrize("device", [FormedLaunchpadCC26X2R1])
 async def test_request_recovery_route_rediscovery_af(device, make_application, mocker):
     app, znp_server = make_application(server_cls=device)
@@ -694,7 +1238,7 @@ async def test_request_recovery_assoc_remove(
     await app.startup(auto_form=False)
 
     mocker.patch("zigpy_znp.zigbee.application.DATA_CONFIRM_TIMEOUT", new=0.1)
-    mocker.patch("zigpy_znp.zigbee.application.REQUEST_ERROR_RETRY_DELAY", new=0)
+    app._retry_policy.retry_delay = 0
 
     app._znp._config[conf.CONF_ZNP_CONFIG][conf.CONF_ARSP_TIMEOUT] = 1
 
@@ -829,7 +1373,7 @@ async def test_request_recovery_manual_source_route(
     await app.startup(auto_form=False)
 
     mocker.patch("zigpy_znp.zigbee.application.DATA_CONFIRM_TIMEOUT", new=0.1)
-    mocker.patch("zigpy_znp.zigbee.application.REQUEST_ERROR_RETRY_DELAY", new=0)
+    app._retry_policy.retry_delay = 0
 
     app._znp._config[conf.CONF_ZNP_CONFIG][conf.CONF_ARSP_TIMEOUT] = 1
 
@@ -897,6 +1441,293 @@ async def test_request_recovery_manual_source_route(
     await app.shutdown()
 
 
+@pytest.mark.parametrize("device", [FormedLaunchpadCC26X2R1])
+async def test_request_sleepy_device(device, make_application, mocker):
+    app, znp_server = make_application(
+        server_cls=device,
+        client_config={"znp_config": {conf.CONF_SLEEPY_DEVICE_REQUEST_EXPIRY: 60}},
+    )
+
+    await app.startup(auto_form=False)
+
+    device = app.add_initialized_device(ieee=t.EUI64(range(8)), nwk=0xABCD)
+    device.node_desc = NodeDescriptor(
+        byte1=zdo_t.LogicalType.EndDevice,
+        byte2=0x40,
+        mac_capability_flags=0x80,  # receiver is off when idle
+        manufacturer_code=0x1234,
+        maximum_buffer_size=82,
+        maximum_incoming_transfer_size=82,
+        server_mask=0,
+        maximum_outgoing_transfer_size=82,
+        descriptor_capability_field=0,
+    )
+
+    asleep = True
+
+    data_req = znp_server.reply_to(
+        c.AF.DataRequestExt.Req(partial=True),
+        responses=[
+            c.AF.DataRequestExt.Rsp(Status=t.Status.SUCCESS),
+            lambda req: c.AF.DataConfirm.Callback(
+                Status=(
+                    t.Status.MAC_TRANSACTION_EXPIRED if asleep else t.Status.SUCCESS
+                ),
+                Endpoint=1,
+                TSN=req.TSN,
+            ),
+        ],
+    )
+
+    assoc_get = znp_server.reply_to(
+        c.Util.AssocGetWithAddress.Req(partial=True), responses=[]
+    )
+
+    def send_request(sequence):
+        return asyncio.create_task(
+            app.request(
+                device=device,
+                profile=260,
+                cluster=1,
+                src_ep=1,
+                dst_ep=1,
+                sequence=sequence,
+                data=b"\x00",
+            )
+        )
+
+    # The device does not pick up the first request and is considered to be asleep
+    req1 = send_request(1)
+    await asyncio.sleep(0.1)
+
+    assert app._sleepy_devices.is_asleep(device.nwk)
+    assert data_req.call_count == 1
+
+    # Later requests are held back without being sent
+    req2 = send_request(2)
+    await asyncio.sleep(0.1)
+
+    assert data_req.call_count == 1
+    assert app._sleepy_devices.pending(device.nwk) == 2
+    assert not req1.done() and not req2.done()
+
+    # The concurrency slots are not held while the device sleeps
+    assert app._concurrency_limiter.in_flight == 0
+
+    # The device wakes up and sends a message
+    asleep = False
+    znp_server.send(
+        c.AF.IncomingMsg.Callback(
+            GroupId=0x0000,
+            ClusterId=6,
+            SrcAddr=device.nwk,
+            SrcEndpoint=1,
+            DstEndpoint=1,
+            WasBroadcast=False,
+            LQI=63,
+            SecurityUse=False,
+            TimeStamp=1198515,
+            TSN=0,
+            Data=b"\x18\x01\x0A\x00\x00\x10\x00",
+            MacSrcAddr=device.nwk,
+            MsgResultRadius=29,
+        )
+    )
+
+    assert (await req1)[0] == t.Status.SUCCESS
+    assert (await req2)[0] == t.Status.SUCCESS
+
+    assert data_req.call_count == 3
+    assert assoc_get.call_count == 0
+    assert not app._sleepy_devices.is_asleep(device.nwk)
+
+    # A device that does not wake up in time fails the request
+    asleep = True
+    app._sleepy_devices.expiry = 0.2
+
+    with pytest.raises(DeliveryError):
+        await send_request(3)
+
+    assert app._sleepy_devices.expired == 1
+    assert data_req.call_count == 4
+
+    await app.shutdown()
+
+
+@pytest.mark.parametrize("device", [FormedLaunchpadCC26X2R1])
+@pytest.mark.parametrize("learned", [True, False])
+async def test_request_recovery_learned_strategy(device, learned, make_application):
+    app, znp_server = make_application(
+        server_cls=device,
+        client_config={
+            "znp_config": {
+                conf.CONF_RETRY_POLICY: {
+                    conf.CONF_RETRY_DELAY: 0,
+                    conf.CONF_LEARN_STRATEGIES: learned,
+                }
+            }
+        },
+    )
+
+    await app.startup(auto_form=False)
+
+    device = app.add_initialized_device(ieee=t.EUI64(range(8)), nwk=0xABCD)
+    device.relays = [0x1234]
+    device.node_desc, _ = device.node_desc.deserialize(bytes(14))
+
+    # Source routing has worked for this device before
+    policy = app._retry_policy
+
+    for i in range(2):
+        policy.record_result(
+            device.ieee, RecoveryStrategy.LAST_GOOD_ROUTE, success=True
+        )
+
+    normal_data_request = znp_server.reply_to(
+        c.AF.DataRequestExt.Req(partial=True),
+        responses=[
+            c.AF.DataRequestExt.Rsp(Status=t.Status.SUCCESS),
+            lambda req: c.AF.DataConfirm.Callback(
+                Status=t.Status.MAC_NO_ACK, Endpoint=1, TSN=req.TSN
+            ),
+        ],
+    )
+
+    source_routing_data_request = znp_server.reply_to(
+        c.AF.DataRequestSrcRtg.Req(partial=True),
+        responses=[
+            c.AF.DataRequestSrcRtg.Rsp(Status=t.Status.SUCCESS),
+            lambda req: c.AF.DataConfirm.Callback(
+                Status=t.Status.SUCCESS, Endpoint=1, TSN=req.TSN
+            ),
+        ],
+    )
+
+    route_discovery = znp_server.reply_to(
+        c.ZDO.ExtRouteDisc.Req(Dst=device.nwk, partial=True),
+        responses=[c.ZDO.ExtRouteDisc.Rsp(Status=t.Status.SUCCESS)],
+    )
+
+    await app.request(
+        device=device,
+        profile=260,
+        cluster=1,
+        src_ep=1,
+        dst_ep=1,
+        sequence=1,
+        data=b"\x00",
+    )
+
+    assert source_routing_data_request.call_count == 1
+
+    if learned:
+        # The cheap strategy that worked before is used right after the first retry
+        assert normal_data_request.call_count == 2
+        assert route_discovery.call_count == 0
+    else:
+        assert normal_data_request.call_count == 4
+        assert route_discovery.call_count == 1
+
+    stats = policy.device_stats[device.ieee][RecoveryStrategy.LAST_GOOD_ROUTE]
+    assert stats.successes == 3
+    assert stats.airtime == 1
+
+    await app.shutdown()
+
+
+@pytest.mark.parametrize("device", [FormedLaunchpadCC26X2R1])
+@pytest.mark.parametrize("proactive", [True, False])
+async def test_request_proactive_source_route(
+    device, proactive, make_application, mocker
+):
+    app, znp_server = make_application(
+        server_cls=device,
+        client_config={
+            conf.CONF_ZNP_CONFIG: {conf.CONF_PROACTIVE_SOURCE_ROUTING: proactive}
+        },
+    )
+
+    await app.startup(auto_form=False)
+
+    mocker.patch("zigpy_znp.zigbee.application.DATA_CONFIRM_TIMEOUT", new=0.1)
+    app._retry_policy.retry_delay = 0
+
+    device = app.add_initialized_device(ieee=t.EUI64(range(8)), nwk=0xABCD)
+
+    # The device is only reachable through the path it reports
+    znp_server.send(
+        c.ZDO.SrcRtgInd.Callback(DstAddr=device.nwk, Relays=[0x1111, 0x2222])
+    )
+    await asyncio.sleep(0.1)
+
+    def data_confirm_replier(req):
+        return c.AF.DataConfirm.Callback(
+            Status=(
+                t.Status.SUCCESS
+                if isinstance(req, c.AF.DataRequestSrcRtg.Req)
+                else t.Status.MAC_NO_ACK
+            ),
+            Endpoint=1,
+            TSN=req.TSN,
+        )
+
+    normal_data_request = znp_server.reply_to(
+        c.AF.DataRequestExt.Req(partial=True),
+        responses=[
+            c.AF.DataRequestExt.Rsp(Status=t.Status.SUCCESS),
+            data_confirm_replier,
+        ],
+    )
+
+    source_routing_data_request = znp_server.reply_to(
+        c.AF.DataRequestSrcRtg.Req(SourceRoute=[0x2222, 0x1111], partial=True),
+        responses=[
+            c.AF.DataRequestSrcRtg.Rsp(Status=t.Status.SUCCESS),
+            data_confirm_replier,
+        ],
+    )
+
+    znp_server.reply_to(
+        c.ZDO.ExtRouteDisc.Req(Dst=device.nwk, partial=True),
+        responses=[c.ZDO.ExtRouteDisc.Rsp(Status=t.Status.SUCCESS)],
+    )
+
+    async def send_request(sequence):
+        status, _ = await app.request(
+            device=device,
+            profile=260,
+            cluster=1,
+            src_ep=1,
+            dst_ep=1,
+            sequence=sequence,
+            data=b"\x00",
+        )
+        assert status == t.Status.SUCCESS
+
+    # The first request goes through every recovery step before using the path
+    await send_request(1)
+
+    normal_attempts = normal_data_request.call_count
+    assert normal_attempts >= 3
+    assert source_routing_data_request.call_count == 1
+
+    await send_request(2)
+
+    if proactive:
+        assert normal_data_request.call_count == normal_attempts
+    else:
+        assert normal_data_request.call_count == 2 * normal_attempts
+
+    assert source_routing_data_request.call_count == 2
+
+    (route,) = app._source_routes.routes(device.nwk)
+    assert route.relays == (0x2222, 0x1111)
+    assert route.successes == 2
+    assert route.failures == 0
+
+    await app.shutdown()
+
+
 @pytest.mark.parametrize("device", [FormedLaunchpadCC26X2R1])
 async def test_route_discovery_concurrency(device, make_application):
     app, znp_server = make_application(server_cls=device)
@@ -1,9 +1,11 @@
 import pytest
+import zigpy.profiles
 
 import zigpy_znp.types as t
 import zigpy_znp.config as conf
 import zigpy_znp.commands as c
 from zigpy_znp.types.nvids import ExNvIds, OsalNvIds
+from zigpy_znp.zigbee.application import ControllerApplication
 
 from ..conftest import (
     ALL_DEVICES,
@@ -102,6 +104,49 @@ async def test_endpoints(device, make_application):
     await app.shutdown()
 
 
+@pytest.mark.parametrize("device", [FormedLaunchpadCC26X2R1])
+async def test_find_endpoint(device, make_application):
+    app, znp_server = make_application(server_cls=device)
+    await app.startup(auto_form=False)
+
+    zha = zigpy.profiles.zha.PROFILE_ID
+    zll = zigpy.profiles.zll.PROFILE_ID
+
+    assert app._find_endpoint(dst_ep=0, profile=zha, cluster=0x0006) == 0
+    assert app._find_endpoint(dst_ep=1, profile=zha, cluster=0x0500) == 1
+    assert app._find_endpoint(dst_ep=1, profile=zll, cluster=0x0006) == 2
+    assert app._find_endpoint(dst_ep=1, profile=0x9876, cluster=0x0006) == 1
+
+    await app.shutdown()
+
+
+@pytest.mark.parametrize("device", [FormedLaunchpadCC26X2R1])
+async def test_register_endpoint(device, make_application):
+    app, znp_server = make_application(server_cls=device)
+    await app.startup(auto_form=False)
+
+    await app.register_endpoint(
+        endpoint=3, profile_id=0x9876, device_id=0x0001, input_clusters=[0x0006]
+    )
+
+    assert znp_server.active_endpoints == [3, 2, 1]
+    assert app.zigpy_device.endpoints[3].profile_id == 0x9876
+    assert app._find_endpoint(dst_ep=1, profile=0x9876, cluster=0x0006) == 3
+
+    with pytest.raises(ValueError):
+        await app.register_endpoint(endpoint=2)
+
+    # The endpoint is registered again after the radio restarts
+    await app.shutdown()
+    znp_server.active_endpoints.clear()
+    await app.startup(auto_form=False)
+
+    assert znp_server.active_endpoints == [3, 2, 1]
+    assert app._find_endpoint(dst_ep=1, profile=0x9876, cluster=0x0006) == 3
+
+    await app.shutdown()
+
+
 @pytest.mark.parametrize("device", EMPTY_DEVICES)
 async def test_not_configured(device, make_application):
     app, znp_server = make_application(server_cls=device)
@@ -231,3 +276,201 @@ async def test_auto_form_necessary(device, make_application, mocker):
     assert nvram[OsalNvIds.ZDO_DIRECT_CB] == t.Bool(True).serialize()
 
     await app.shutdown()
+
+
+def count_requests(znp_server, mocker):
+    requests = []
+
+    def frame_received(frame):
+        if frame.header.type == t.CommandType.SREQ:
+            requests.append(c.COMMANDS_BY_ID[frame.header].from_frame(frame))
+
+        return original(frame)
+
+    original = znp_server.frame_received
+    mocker.patch.object(znp_server, "frame_received", new=frame_received)
+
+    return requests
+
+
+@pytest.mark.parametrize("device", FORMED_DEVICES)
+@pytest.mark.parametrize("use_cache_file", [False, True])
+async def test_fast_restart(device, use_cache_file, make_application, tmp_path, mocker):
+    cache_path = tmp_path / "startup_cache.json"
+    client_config = {
+        conf.CONF_ZNP_CONFIG: {
+            conf.CONF_FAST_RESTART: True,
+            conf.CONF_STARTUP_CACHE_PATH: str(cache_path) if use_cache_file else None,
+        }
+    }
+
+    app, znp_server = make_application(server_cls=device, client_config=client_config)
+    requests = count_requests(znp_server, mocker)
+
+    await app.startup(auto_form=False)
+    await app.shutdown()
+
+    slow_requests = list(requests)
+    requests.clear()
+
+    # A new application can only use the cache file
+    if use_cache_file:
+        assert str(app.network_key) not in cache_path.read_text()
+        assert str(app.network_key).replace(":", "") not in cache_path.read_text()
+
+        app2 = ControllerApplication(app.config)
+    else:
+        app2 = app
+
+    await app2.startup(auto_form=False)
+
+    # The radio was configured by the first startup, nothing is re-read or re-written
+    assert len(requests) < len(slow_requests) / 2
+    assert not any(isinstance(r, c.ZDO.NodeDescReq.Req) for r in requests)
+    assert not any(isinstance(r, c.SYS.OSALNVWrite.Req) for r in requests)
+    assert not any(
+        isinstance(r, c.SYS.OSALNVLength.Req) and r.Id != OsalNvIds.NIB
+        for r in requests
+    )
+
+    assert app2.ieee == app.ieee
+    assert app2.pan_id == app.pan_id
+    assert app2.channel == app.channel
+    assert app2.network_key == app.network_key
+    assert app2.zigpy_device.node_desc == app.zigpy_device.node_desc
+    assert 1 in app2.zigpy_device.endpoints
+    assert 2 in app2.zigpy_device.endpoints
+
+    await app2.shutdown()
+
+
+@pytest.mark.parametrize("device", FORMED_DEVICES)
+async def test_fast_restart_network_changed(device, make_application, mocker):
+    app, znp_server = make_application(
+        server_cls=device,
+        client_config={conf.CONF_ZNP_CONFIG: {conf.CONF_FAST_RESTART: True}},
+    )
+
+    await app.startup(auto_form=False)
+    await app.shutdown()
+
+    # Something else changed the network in the meantime
+    znp_server.nib.nwkPanId = 0x1234
+
+    requests = count_requests(znp_server, mocker)
+    await app.startup(auto_form=False)
+
+    assert app.pan_id == 0x1234
+    assert any(isinstance(r, c.ZDO.NodeDescReq.Req) for r in requests)
+
+    await app.shutdown()
+
+    # The new state is remembered
+    requests.clear()
+    await app.startup(auto_form=False)
+
+    assert not any(isinstance(r, c.ZDO.NodeDescReq.Req) for r in requests)
+
+    await app.shutdown()
+
+
+@pytest.mark.parametrize("device", FORMED_DEVICES)
+async def test_fast_restart_disabled(device, make_application, mocker):
+    # Fast restarts are disabled by default
+    app, znp_server = make_application(server_cls=device)
+
+    await app.startup(auto_form=False)
+    await app.shutdown()
+
+    requests = count_requests(znp_server, mocker)
+    await app.startup(auto_form=False)
+
+    assert any(isinstance(r, c.ZDO.NodeDescReq.Req) for r in requests)
+
+    await app.shutdown()
+
+
+def is_version_detection(request):
+    return (
+        isinstance(request, (c.SYS.NVLength.Req, c.SYS.NVRead.Req))
+        and request.ItemId == ExNvIds.TCLK_TABLE
+    )
+
+
+@pytest.mark.parametrize("device", FORMED_DEVICES)
+@pytest.mark.parametrize("use_cache_file", [False, True])
+async def test_device_profile(
+    device, use_cache_file, make_application, tmp_path, mocker
+):
+    cache_path = tmp_path / "startup_cache.json"
+    client_config = {
+        conf.CONF_ZNP_CONFIG: {
+            conf.CONF_LED_MODE: "off",
+            conf.CONF_FAST_RESTART: True,
+            conf.CONF_STARTUP_CACHE_PATH: str(cache_path) if use_cache_file else None,
+        }
+    }
+
+    app, znp_server = make_application(server_cls=device, client_config=client_config)
+
+    # The LaunchPad has no LEDs and never responds
+    if device is FormedLaunchpadCC26X2R1:
+        znp_server.reply_to(c.Util.LEDControl.Req(partial=True), responses=[])
+
+    requests = count_requests(znp_server, mocker)
+
+    await app.startup(auto_form=False)
+    await app.shutdown()
+
+    version = app._device_profile.version
+    assert app._device_profile.led_control is (device is not FormedLaunchpadCC26X2R1)
+
+    if version > 1.2:
+        assert any(is_version_detection(r) for r in requests)
+
+    requests.clear()
+
+    if use_cache_file:
+        app2 = ControllerApplication(app.config)
+    else:
+        app2 = app
+
+    await app2.startup(auto_form=False)
+
+    # Nothing has to be detected again
+    assert not any(is_version_detection(r) for r in requests)
+    assert any(isinstance(r, c.Util.LEDControl.Req) for r in requests) is (
+        device is not FormedLaunchpadCC26X2R1
+    )
+
+    assert app2._znp.version == version
+    assert app2._device_profile == app._device_profile
+
+    await app2.shutdown()
+
+
+@pytest.mark.parametrize("device", FORMED_DEVICES)
+async def test_device_profile_firmware_changed(device, make_application, mocker):
+    app, znp_server = make_application(server_cls=device)
+
+    await app.startup(auto_form=False)
+    await app.shutdown()
+
+    version = app._device_profile.version
+    old_build_id = app._device_profile.build_id
+
+    # The radio was flashed with a different build of the same firmware
+    version_rsp = znp_server.version_replier(c.SYS.Version.Req())
+    version_rsp = version_rsp.replace(CodeRevision=20210101)
+    znp_server.reply_to(c.SYS.Version.Req(), responses=[version_rsp], override=True)
+
+    requests = count_requests(znp_server, mocker)
+    await app.startup(auto_form=False)
+
+    if version > 1.2:
+        assert any(is_version_detection(r) for r in requests)
+
+    assert app._znp.version == version
+    assert app._device_profile.build_id == 20210101 != old_build_id
+
+    await app.shutdown()
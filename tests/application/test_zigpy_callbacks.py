@@ -1,12 +1,14 @@
+import asyncio
 import logging
 
 import pytest
 from zigpy.zdo.types import ZDOCmd
 
 import zigpy_znp.types as t
+import zigpy_znp.config as conf
 import zigpy_znp.commands as c
 
-from ..conftest import FORMED_DEVICES
+from ..conftest import FORMED_DEVICES, FormedLaunchpadCC26X2R1
 
 pytestmark = [pytest.mark.asyncio]
 
@@ -59,6 +61,7 @@ async def test_on_zdo_device_announce_nwk_change(device, make_application, mocke
             Capabilities=c.zdo.MACCapabilities.Router,
         )
     )
+    await asyncio.sleep(0.01)
 
     app.handle_join.assert_called_once_with(
         nwk=new_nwk, ieee=device.ieee, parent_nwk=None
@@ -87,6 +90,8 @@ async def test_on_zdo_device_leave_callback(device, make_application, mocker):
             NWK=nwk, IEEE=ieee, Request=False, Remove=False, Rejoin=False
         )
     )
+    await asyncio.sleep(0)
+
     app.handle_leave.assert_called_once_with(nwk=nwk, ieee=ieee)
 
     await app.shutdown()
@@ -121,8 +126,9 @@ async def test_on_af_message_callback(device, make_application, mocker):
         MsgResultRadius=1,
     )
 
-    # Normal message
+    # Normal message, handled asynchronously
     znp_server.send(af_message)
+    await asyncio.sleep(0)
     app.get_device.assert_called_once_with(nwk=0xABCD)
     device.radio_details.assert_called_once_with(lqi=19, rssi=None)
     app.handle_message.assert_called_once_with(
@@ -135,6 +141,7 @@ async def test_on_af_message_callback(device, make_application, mocker):
     app.get_device.reset_mock()
 
     znp_server.send(af_message.replace(DstEndpoint=2))
+    await asyncio.sleep(0)
     app.get_device.assert_called_once_with(nwk=0xABCD)
     device.radio_details.assert_called_once_with(lqi=19, rssi=None)
     app.handle_message.assert_called_once_with(
@@ -147,6 +154,7 @@ async def test_on_af_message_callback(device, make_application, mocker):
     app.get_device.reset_mock()
 
     znp_server.send(af_message.replace(DstEndpoint=3))
+    await asyncio.sleep(0)
     app.get_device.assert_called_once_with(nwk=0xABCD)
     device.radio_details.assert_called_once_with(lqi=19, rssi=None)
     app.handle_message.assert_called_once_with(
@@ -159,8 +167,98 @@ async def test_on_af_message_callback(device, make_application, mocker):
     app.get_device.reset_mock()
 
     znp_server.send(af_message)
+    await asyncio.sleep(0)
     app.get_device.assert_called_once_with(nwk=0xABCD)
     assert device.radio_details.call_count == 0
     assert app.handle_message.call_count == 0
 
     await app.shutdown()
+
+
+@pytest.mark.parametrize("device", [FormedLaunchpadCC26X2R1])
+@pytest.mark.parametrize("window", [None, 0.1])
+async def test_on_af_message_duplicates(device, window, make_application, mocker):
+    app, znp_server = make_application(
+        server_cls=device,
+        client_config={
+            conf.CONF_ZNP_CONFIG: {conf.CONF_DUPLICATE_MESSAGE_WINDOW: window}
+        },
+    )
+    await app.startup(auto_form=False)
+
+    mocker.patch.object(app, "get_device")
+    mocker.patch.object(app, "handle_message")
+
+    af_message = c.AF.IncomingMsg.Callback(
+        GroupId=0,
+        ClusterId=6,
+        SrcAddr=0xABCD,
+        SrcEndpoint=1,
+        DstEndpoint=1,
+        WasBroadcast=False,
+        LQI=19,
+        SecurityUse=False,
+        TimeStamp=0,
+        TSN=0,
+        Data=b"\x18\x01\x0A\x00\x00\x10\x00",
+        MacSrcAddr=0xABCD,
+        MsgResultRadius=1,
+    )
+
+    znp_server.send(af_message)
+    znp_server.send(af_message)
+
+    # Messages from other devices or with other contents are not duplicates
+    znp_server.send(af_message.replace(SrcAddr=0x1234))
+    znp_server.send(af_message.replace(Data=b"\x18\x02\x0A\x00\x00\x10\x00"))
+    await asyncio.sleep(0)
+
+    if window is None:
+        assert app.handle_message.call_count == 4
+    else:
+        assert app.handle_message.call_count == 3
+        assert app._duplicate_filter.duplicates == 1
+
+        # The same message is accepted again once the window has passed
+        await asyncio.sleep(0.15)
+        znp_server.send(af_message)
+        await asyncio.sleep(0)
+
+        assert app.handle_message.call_count == 4
+
+    await app.shutdown()
+
+
+@pytest.mark.parametrize("device", FORMED_DEVICES)
+async def test_on_af_message_priority(device, make_application, mocker):
+    app, znp_server = make_application(server_cls=device)
+    await app.startup(auto_form=False)
+
+    mocker.patch.object(app, "get_device")
+    mocker.patch.object(app, "handle_message")
+
+    af_message = c.AF.IncomingMsg.Callback(
+        GroupId=0,
+        ClusterId=6,
+        SrcAddr=0xABCD,
+        SrcEndpoint=1,
+        DstEndpoint=1,
+        WasBroadcast=False,
+        LQI=19,
+        SecurityUse=False,
+        TimeStamp=0,
+        TSN=0,
+        Data=b"\x18\x01\x0A\x00\x00\x10\x00",
+        MacSrcAddr=0xABCD,
+        MsgResultRadius=1,
+    )
+
+    znp_server.send(af_message)
+    znp_server.send(af_message.replace(ClusterId=0x0500, TSN=1))  # IAS Zone
+    await asyncio.sleep(0)
+
+    # The alarm is handled before the message received before it
+    clusters = [call[2]["cluster"] for call in app.handle_message.mock_calls]
+    assert clusters == [0x0500, 6]
+
+    await app.shutdown()
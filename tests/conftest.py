@@ -1,3 +1,4 @@
+import os
 import json
 import asyncio
 import logging
@@ -68,6 +69,25 @@ class ForwardingSerialTransport:
         return f"<{type(self).__name__} to {self.protocol}>"
 
 
+class PtyTransport:
+    """
+    Transport writing to the master side of a pseudo-terminal.
+    """
+
+    def __init__(self, fd):
+        self.fd = fd
+
+    def write(self, data):
+        try:
+            os.write(self.fd, data)
+        except BlockingIOError:
+            # Nothing is reading from the other side
+            pass
+
+    def close(self):
+        pass
+
+
 def config_for_port_path(path):
     return conf.CONFIG_SCHEMA({conf.CONF_DEVICE: {conf.CONF_DEVICE_PATH: path}})
 
@@ -139,6 +159,51 @@ async def make_znp_server(mocker):
     yield inner
 
 
+@pytest.fixture
+async def make_pty_znp_server():
+    """
+    Runs simulated radios behind pseudo-terminals, so they can be opened like real
+    serial ports. Without a server class, the port never responds.
+    """
+
+    loop = asyncio.get_running_loop()
+    fds = []
+
+    def inner(server_cls=None):
+        master, slave = os.openpty()
+        os.set_blocking(master, False)
+
+        # Keeping the slave side open prevents hangups when clients disconnect
+        fds.extend([master, slave])
+        path = os.ttyname(slave)
+
+        if server_cls is None:
+            return path, None
+
+        server = server_cls(config_for_port_path(path))
+        server.port_path = path
+        server._uart = ZnpMtProtocol(server)
+        server._uart._transport = PtyTransport(master)
+
+        def data_received():
+            try:
+                data = os.read(master, 4096)
+            except BlockingIOError:
+                return
+
+            server._uart.data_received(data)
+
+        loop.add_reader(master, data_received)
+
+        return path, server
+
+    yield inner
+
+    for fd in fds:
+        loop.remove_reader(fd)
+        os.close(fd)
+
+
 def simple_deepcopy(d):
     if not hasattr(d, "copy"):
         return d
@@ -327,6 +392,11 @@ class BaseZStackDevice(BaseServerZNP):
             )
         )
 
+    def update_device_state(self, state):
+        self.device_state = state
+
+        return c.ZDO.StateChangeInd.Callback(State=state)
+
     def connection_lost(self, exc):
         self.active_endpoints.clear()
 
@@ -445,7 +515,10 @@ class BaseZStackDevice(BaseServerZNP):
         if req.Id not in self.nvram[ExNvIds.LEGACY]:
             return c.SYS.OSALNVDelete.Rsp(Status=t.Status.INVALID_PARAMETER)
 
-        assert req.ItemLen == len(self.nvram[ExNvIds.LEGACY][req.Id])
+        # Z-Stack refuses to delete items if the length is wrong
+        if req.ItemLen != len(self.nvram[ExNvIds.LEGACY][req.Id]):
+            return c.SYS.OSALNVDelete.Rsp(Status=t.Status.NV_BAD_ITEM_LEN)
+
         self.nvram[ExNvIds.LEGACY].pop(req.Id)
 
         return c.SYS.OSALNVDelete.Rsp(Status=t.Status.SUCCESS)
@@ -561,7 +634,7 @@ class BaseZStack1CC2531(BaseZStackDevice):
         if self.nib.nwkState == NwkState8.NWK_ROUTER:
             return [
                 c.ZDO.StartupFromApp.Rsp(State=c.zdo.StartupState.RestoredNetworkState),
-                c.ZDO.StateChangeInd.Callback(State=t.DeviceState.StartedAsCoordinator),
+                self.update_device_state(t.DeviceState.StartedAsCoordinator),
             ]
         else:
 
@@ -588,7 +661,7 @@ class BaseZStack1CC2531(BaseZStackDevice):
                 c.ZDO.StateChangeInd.Callback(
                     State=t.DeviceState.StartingAsCoordinator
                 ),
-                c.ZDO.StateChangeInd.Callback(State=t.DeviceState.StartedAsCoordinator),
+                self.update_device_state(t.DeviceState.StartedAsCoordinator),
                 update_logical_channel,
             ]
 
@@ -674,11 +747,6 @@ class BaseZStack3Device(BaseZStackDevice):
             c.ZDO.MgmtPermitJoinRsp.Callback(Src=0x0000, Status=t.ZDOStatus.SUCCESS),
         ]
 
-    def update_device_state(self, state):
-        self.device_state = state
-
-        return c.ZDO.StateChangeInd.Callback(State=state)
-
     @reply_to(
         c.AppConfig.BDBStartCommissioning.Req(
             Mode=c.app_config.BDBCommissioningMode.NwkFormation
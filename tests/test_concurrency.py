@@ -0,0 +1,333 @@
+import asyncio
+
+import pytest
+
+from zigpy_znp.zigbee.concurrency import (
+    InFlightTable,
+    OrphanRegistry,
+    AdaptiveLimiter,
+    BroadcastBudget,
+)
+
+pytestmark = [pytest.mark.asyncio]
+
+
+async def test_limiter_fifo():
+    limiter = AdaptiveLimiter(2)
+
+    await limiter.acquire()
+    await limiter.acquire()
+    assert limiter.locked()
+
+    order = []
+
+    async def waiter(n):
+        await limiter.acquire()
+        order.append(n)
+
+    tasks = [asyncio.create_task(waiter(n)) for n in range(3)]
+    await asyncio.sleep(0)
+
+    assert limiter.waiting == 3
+
+    limiter.release()
+    limiter.release()
+    await asyncio.sleep(0)
+
+    assert order == [0, 1]
+    assert limiter.in_flight == 2
+    assert limiter.waiting == 1
+
+    tasks[2].cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+    assert limiter.waiting == 0
+
+
+async def test_limiter_cancelled_after_wakeup():
+    limiter = AdaptiveLimiter(1)
+    await limiter.acquire()
+
+    task = asyncio.create_task(limiter.acquire())
+    await asyncio.sleep(0)
+
+    # The slot is handed over and the waiter is cancelled before it can run
+    limiter.release()
+    task.cancel()
+
+    with pytest.raises(asyncio.CancelledError):
+        await task
+
+    assert limiter.in_flight == 0
+    assert not limiter.locked()
+
+
+async def test_limiter_aimd():
+    limiter = AdaptiveLimiter(16, min_limit=2)
+    epoch = await limiter.acquire()
+    limiter.release()
+
+    limiter.record_error(epoch)
+    assert limiter.limit == 8
+
+    # Errors of requests started before the decrease are ignored
+    limiter.record_error(epoch)
+    assert limiter.limit == 8
+
+    epoch = await limiter.acquire()
+    limiter.release()
+
+    limiter.record_error(epoch)
+    limiter.record_error(epoch + 1)
+    assert limiter.limit == 2
+    assert limiter.decreases == 3
+
+    # Never below the minimum
+    limiter.record_error(limiter._epoch)
+    assert limiter.limit == 2
+
+    # A full window of successes adds a single slot
+    limiter.record_success()
+    assert limiter.limit == 2
+
+    limiter.record_success()
+    assert limiter.limit == 3
+    assert limiter.increases == 1
+
+    # Growing back to the maximum takes one window per slot
+    for i in range(sum(range(3, 16))):
+        limiter.record_success()
+
+    assert limiter.limit == 16
+    assert limiter.increases == 14
+    assert limiter.errors == 5
+
+
+async def test_limiter_not_adaptive():
+    limiter = AdaptiveLimiter(4, adaptive=False)
+    epoch = await limiter.acquire()
+
+    limiter.record_error(epoch)
+    assert limiter.limit == 4
+    assert limiter.errors == 1
+    assert limiter.error_rate > 0
+
+
+async def test_limiter_destination_cap():
+    limiter = AdaptiveLimiter(4, max_per_destination=2)
+
+    await limiter.acquire("a")
+    await limiter.acquire("a")
+
+    assert not limiter.locked()
+    assert limiter.would_wait("a")
+    assert not limiter.would_wait("b")
+
+    # The third request for the same destination waits even though slots are free
+    task = asyncio.create_task(limiter.acquire("a"))
+    await asyncio.sleep(0)
+    assert not task.done()
+
+    await limiter.acquire("b")
+    assert limiter.in_flight == 3
+
+    limiter.release("a")
+    await task
+
+    assert limiter.destination_stats["a"].in_flight == 2
+    assert limiter.destination_stats["a"].requests == 3
+    assert limiter.destination_stats["a"].delayed == 1
+    assert limiter.destination_stats["a"].max_wait > 0
+    assert limiter.destination_stats["b"].max_wait == 0
+
+
+async def test_limiter_parent_cap():
+    limiter = AdaptiveLimiter(4, max_per_parent=2)
+
+    await limiter.acquire("a", parent=0x1234)
+    await limiter.acquire("b", parent=0x1234)
+
+    assert limiter.would_wait("c", parent=0x1234)
+    assert not limiter.would_wait("c", parent=0x5678)
+    assert not limiter.would_wait("c")
+
+    task = asyncio.create_task(limiter.acquire("c", parent=0x1234))
+    await asyncio.sleep(0)
+    assert not task.done()
+
+    limiter.release("a", parent=0x1234)
+    await task
+
+
+async def test_limiter_fair_scheduling():
+    limiter = AdaptiveLimiter(1)
+    await limiter.acquire()
+
+    order = []
+
+    async def waiter(destination):
+        await limiter.acquire(destination)
+        order.append(destination)
+
+    # A busy device queues many requests before a quiet one queues a single request
+    tasks = [asyncio.create_task(waiter("busy")) for i in range(3)]
+    tasks.append(asyncio.create_task(waiter("quiet")))
+    await asyncio.sleep(0)
+
+    limiter.release()
+
+    for i in range(4):
+        await asyncio.sleep(0)
+        limiter.release(order[-1])
+
+    await asyncio.gather(*tasks)
+
+    assert order == ["busy", "quiet", "busy", "busy"]
+
+
+async def test_limiter_capped_destination_skipped():
+    limiter = AdaptiveLimiter(2, max_per_destination=1)
+
+    await limiter.acquire("a")
+    await limiter.acquire("b")
+
+    task_a = asyncio.create_task(limiter.acquire("a"))
+    task_c = asyncio.create_task(limiter.acquire("c"))
+    await asyncio.sleep(0)
+
+    # "a" is queued first but is still at its cap when "b" finishes
+    limiter.release("b")
+    await task_c
+
+    assert not task_a.done()
+
+    limiter.release("a")
+    await task_a
+
+
+async def test_broadcast_budget():
+    budget = BroadcastBudget(2)
+
+    budget.release_after(0.1, await budget.acquire())
+    budget.release_after(0.1, await budget.acquire())
+
+    assert budget.locked()
+
+    task = asyncio.create_task(budget.acquire())
+    await asyncio.sleep(0.05)
+    assert not task.done()
+    assert budget.waiting == 1
+
+    # Tokens are returned once broadcasts have been delivered
+    await asyncio.wait_for(task, timeout=0.1)
+    await asyncio.sleep(0.01)
+
+    assert budget.outstanding == 1
+    assert budget.delayed == 1
+
+    # Resetting the radio empties the table
+    budget.release_after(60, await task)
+    budget.reset()
+
+    assert budget.outstanding == 0
+    assert not budget._timers
+
+
+async def test_broadcast_budget_reset_in_flight():
+    budget = BroadcastBudget(2)
+
+    old_generation = await budget.acquire()
+    await budget.acquire()
+    budget.reset()
+
+    # A broadcast sent after the reset holds a token of the new generation
+    generation = await budget.acquire()
+    assert generation != old_generation
+    assert budget.outstanding == 1
+
+    # Broadcasts that were in flight during the reset return their tokens late
+    budget.release_after(0, old_generation)
+    budget.release_after(0, old_generation)
+    await asyncio.sleep(0.01)
+
+    assert budget.outstanding == 1
+
+    budget.release_after(0, generation)
+    await asyncio.sleep(0.01)
+
+    assert budget.outstanding == 0
+
+
+async def test_in_flight_table():
+    table = InFlightTable()
+
+    key1 = await table.reserve(1, 1)
+    key2 = await table.reserve(1, 2)
+
+    assert table.in_flight == 2
+    assert table.collisions == 0
+
+    # Reusing an active pair waits until it is released
+    reserve3 = asyncio.create_task(table.reserve(1, 1))
+    reserve4 = asyncio.create_task(table.reserve(1, 1))
+    await asyncio.sleep(0.01)
+
+    assert not reserve3.done()
+    assert not reserve4.done()
+    assert table.collisions == 2
+
+    table.release(key1)
+    await asyncio.sleep(0.01)
+
+    # Only one of the deferred requests gets the pair at a time
+    assert reserve3.done() != reserve4.done()
+
+    table.release((1, 1))
+    await asyncio.sleep(0.01)
+
+    assert reserve3.done() and reserve4.done()
+    assert table.in_flight == 2
+    assert table.max_in_flight == 2
+    assert table.total_deferral > 0
+
+    table.release(key2)
+    table.release(await reserve3)
+
+    assert table.in_flight == 0
+
+
+async def test_orphan_registry():
+    registry = OrphanRegistry(max_orphans=2, max_age=0.1)
+    loop = asyncio.get_running_loop()
+
+    late, expiring, evicted = [loop.create_future() for _ in range(3)]
+
+    # Finished waits are not orphaned
+    done = loop.create_future()
+    done.set_result(None)
+    registry.adopt(done)
+    assert registry.live == 0
+
+    registry.adopt(expiring)
+    registry.adopt(late)
+    assert registry.live == 2
+
+    # The oldest wait is evicted to make room
+    registry.adopt(evicted)
+    assert registry.live == 2
+    assert registry.evicted == 1
+    assert expiring.cancelled()
+
+    late.set_result(None)
+    await asyncio.sleep(0)
+    assert registry.live == 1
+    assert registry.late == 1
+
+    await asyncio.sleep(0.15)
+    assert registry.live == 0
+    assert registry.expired == 1
+    assert evicted.cancelled()
+
+    registry.adopt(loop.create_future())
+    registry.clear()
+    assert registry.live == 0
@@ -1,5 +1,6 @@
 import enum
 
+import zigpy_znp.config as conf
 from zigpy_znp.config import EnumValue
 
 
@@ -20,3 +21,15 @@ def test_EnumValue():
 
     assert EnumValue(TestEnum)(TestEnum.foo) == TestEnum.foo
     assert EnumValue(TestEnum)(TestEnum.BAR) == TestEnum.BAR
+
+
+def test_request_behavior_defaults():
+    config = conf.CONFIG_SCHEMA(
+        {conf.CONF_DEVICE: {conf.CONF_DEVICE_PATH: "/dev/null"}}
+    )[conf.CONF_ZNP_CONFIG]
+
+    # Changes to how requests are sent are opt-in
+    assert not config[conf.CONF_ADAPTIVE_CONCURRENCY]
+    assert config[conf.CONF_MAX_CONCURRENT_REQUESTS_PER_DEVICE] is None
+    assert config[conf.CONF_MAX_CONCURRENT_REQUESTS_PER_ROUTER] is None
+    assert config[conf.CONF_SLEEPY_DEVICE_REQUEST_EXPIRY] is None
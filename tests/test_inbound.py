@@ -0,0 +1,148 @@
+import asyncio
+
+import pytest
+
+from zigpy_znp.zigbee.inbound import Priority, InboundQueue, DuplicateFilter
+
+pytestmark = [pytest.mark.asyncio]
+
+
+async def test_inbound_queue_batches():
+    handled = []
+    queue = InboundQueue(max_size=100, time_budget=1, max_batch=4)
+
+    for i in range(10):
+        queue.put(handled.append, i)
+
+    # Nothing is handled until the consumer runs
+    assert handled == []
+    assert queue.depth == 10
+
+    # Other tasks can run between batches
+    await asyncio.sleep(0)
+    assert handled == [0, 1, 2, 3]
+
+    await asyncio.sleep(0)
+    assert handled == list(range(8))
+
+    await asyncio.sleep(0)
+    await asyncio.sleep(0)
+    assert handled == list(range(10))
+    assert queue.depth == 0
+    assert queue.max_depth == 10
+    assert queue.batches == 3
+
+    # The consumer is started again for new messages
+    queue.put(handled.append, 10)
+    await asyncio.sleep(0)
+    assert handled == list(range(11))
+
+
+async def test_inbound_queue_time_budget(mocker):
+    handled = []
+    queue = InboundQueue(max_size=100, time_budget=0.05, max_batch=100)
+
+    loop = asyncio.get_running_loop()
+    now = loop.time()
+    mocker.patch.object(loop, "time", side_effect=lambda: now + 0.03 * len(handled))
+
+    for i in range(5):
+        queue.put(handled.append, i)
+
+    # Two messages fit in the time budget
+    await asyncio.sleep(0)
+    assert handled == [0, 1]
+
+
+async def test_inbound_queue_overflow():
+    handled = []
+    queue = InboundQueue(max_size=3, time_budget=1, max_batch=10)
+
+    for i in range(5):
+        queue.put(handled.append, i)
+
+    # The oldest messages are handled right away to make room
+    assert handled == [0, 1]
+    assert queue.depth == 3
+    assert queue.overflows == 2
+
+    queue.flush()
+    assert handled == [0, 1, 2, 3, 4]
+    assert queue.dispatched == queue.received == 5
+
+
+async def test_inbound_queue_handler_error(caplog):
+    handled = []
+
+    def handler(message):
+        if message == 1:
+            raise RuntimeError("Uh oh")
+
+        handled.append(message)
+
+    queue = InboundQueue(max_size=10, time_budget=1, max_batch=10)
+
+    for i in range(3):
+        queue.put(handler, i)
+
+    await asyncio.sleep(0)
+
+    assert handled == [0, 2]
+    assert "Uh oh" in caplog.text
+
+
+async def test_inbound_queue_priority():
+    handled = []
+    queue = InboundQueue(max_size=4, time_budget=1, max_batch=2)
+
+    queue.put(handled.append, "normal 1")
+    queue.put(handled.append, "normal 2")
+    queue.put(handled.append, "normal 3")
+    queue.put(handled.append, "high 1", priority=Priority.HIGH)
+
+    # High priority messages skip the queue
+    await asyncio.sleep(0)
+    assert handled == ["high 1", "normal 1"]
+
+    # And also make room first when the queue is full
+    queue.put(handled.append, "high 2", priority=Priority.HIGH)
+    queue.put(handled.append, "high 3", priority=Priority.HIGH)
+    queue.put(handled.append, "high 4", priority=Priority.HIGH)
+    assert handled == ["high 1", "normal 1", "high 2"]
+    assert queue.overflows == 1
+
+    queue.flush()
+    assert handled == [
+        "high 1",
+        "normal 1",
+        "high 2",
+        "high 3",
+        "high 4",
+        "normal 2",
+        "normal 3",
+    ]
+
+    # Time to dispatch is tracked per lane
+    high = queue.lane_stats[Priority.HIGH]
+    normal = queue.lane_stats[Priority.NORMAL]
+    assert high.dispatched == 4
+    assert normal.dispatched == 3
+    assert 0 <= high.average_delay <= high.max_delay
+    assert 0 <= normal.average_delay <= normal.max_delay
+    assert queue.dispatched == queue.received == 7
+
+
+async def test_duplicate_filter():
+    dedup = DuplicateFilter(window=0.1)
+
+    assert not dedup.is_duplicate((0x1234, 1, 6, 0, b"\x00"))
+    assert dedup.is_duplicate((0x1234, 1, 6, 0, b"\x00"))
+    assert not dedup.is_duplicate((0x1234, 1, 6, 1, b"\x00"))
+
+    # Old messages are forgotten
+    await asyncio.sleep(0.15)
+    assert not dedup.is_duplicate((0x1234, 1, 6, 1, b"\x00"))
+    assert len(dedup) == 1
+
+    assert dedup.checked == 4
+    assert dedup.duplicates == 1
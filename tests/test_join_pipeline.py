@@ -0,0 +1,118 @@
+import asyncio
+
+import pytest
+
+import zigpy_znp.types as t
+import zigpy_znp.commands as c
+from zigpy_znp.zigbee.joining import JoinPipeline
+
+pytestmark = [pytest.mark.asyncio]
+
+
+def make_pipeline(max_concurrent):
+    handled = []
+    release = asyncio.Event()
+
+    async def handler(join):
+        handled.append(join)
+        await release.wait()
+
+    pipeline = JoinPipeline(handler, max_concurrent=max_concurrent)
+
+    return pipeline, handled, release
+
+
+async def test_join_pipeline_concurrency():
+    pipeline, handled, release = make_pipeline(max_concurrent=2)
+
+    for i in range(5):
+        pipeline.joined(t.NWK(i), t.EUI64([i] * 8), parent_nwk=0x0000, delay=0)
+
+    await asyncio.sleep(0.01)
+
+    # Only two devices are handled at once
+    assert [join.nwk for join in handled] == [0, 1]
+    assert pipeline.active == 2
+    assert pipeline.waiting == 3
+
+    release.set()
+    await asyncio.sleep(0.01)
+
+    assert [join.nwk for join in handled] == [0, 1, 2, 3, 4]
+    assert pipeline.active == 0
+    assert pipeline.waiting == 0
+    assert pipeline.handled == 5
+    assert pipeline.max_active == 2
+
+
+async def test_join_pipeline_coalescing():
+    pipeline, handled, release = make_pipeline(max_concurrent=2)
+    release.set()
+
+    ieee = t.EUI64.convert("11:22:33:44:55:66:77:88")
+    capabilities = c.zdo.MACCapabilities.AllocateShortAddrDuringAssocNeeded
+
+    # Repeated join indications are merged
+    pipeline.joined(0x1234, ieee, parent_nwk=0x0000, delay=0.1)
+    pipeline.joined(0x1234, ieee, parent_nwk=0x0001, delay=0.1)
+    await asyncio.sleep(0)
+    assert handled == []
+
+    # The announcement replaces them and is handled right away
+    pipeline.announced(0x1234, ieee, capabilities)
+    await asyncio.sleep(0.01)
+
+    assert len(handled) == 1
+    assert handled[0].announced
+    assert handled[0].capabilities == capabilities
+    assert handled[0].parent_nwk is None
+
+    # The join timer was cancelled
+    await asyncio.sleep(0.15)
+    assert len(handled) == 1
+
+    assert pipeline.joins == 2
+    assert pipeline.announcements == 1
+    assert pipeline.coalesced == 2
+
+
+async def test_join_pipeline_same_device():
+    pipeline, handled, release = make_pipeline(max_concurrent=2)
+
+    ieee = t.EUI64.convert("11:22:33:44:55:66:77:88")
+    capabilities = c.zdo.MACCapabilities.AllocateShortAddrDuringAssocNeeded
+
+    pipeline.joined(0x1234, ieee, parent_nwk=0x0000, delay=0)
+    await asyncio.sleep(0.01)
+    assert len(handled) == 1
+
+    # The device is not handled again until the first request is done
+    pipeline.announced(0x1234, ieee, capabilities)
+    await asyncio.sleep(0.01)
+    assert len(handled) == 1
+    assert pipeline.waiting == 1
+
+    release.set()
+    await asyncio.sleep(0.01)
+    assert len(handled) == 2
+    assert handled[1].announced
+
+
+async def test_join_pipeline_forget_and_clear():
+    pipeline, handled, release = make_pipeline(max_concurrent=1)
+
+    ieee1 = t.EUI64.convert("11:22:33:44:55:66:77:88")
+    ieee2 = t.EUI64.convert("11:22:33:44:55:66:77:99")
+
+    pipeline.joined(0x1234, ieee1, parent_nwk=0x0000, delay=0.01)
+    pipeline.joined(0x5678, ieee2, parent_nwk=0x0000, delay=0)
+    pipeline.forget(ieee1)
+
+    await asyncio.sleep(0.05)
+    assert [join.ieee for join in handled] == [ieee2]
+    assert pipeline.active == 1
+
+    pipeline.clear()
+    await asyncio.sleep(0)
+    assert pipeline.active == 0
+    assert pipeline.waiting == 0
@@ -0,0 +1,116 @@
+import pytest
+
+import zigpy_znp.types as t
+import zigpy_znp.config as conf
+from zigpy_znp.zigbee.retry import RetryPolicy, RecoveryStrategy
+
+IEEE = t.EUI64(range(8))
+
+
+def test_backoff():
+    policy = RetryPolicy(retry_delay=0.5, max_retry_delay=5, jitter=0.25)
+
+    for attempt, delay in enumerate([0.5, 1, 2, 4, 5, 5]):
+        assert 0.75 * delay <= policy.backoff(attempt) <= delay
+
+    assert 0.75 * 1.5 <= policy.backoff(0, transient=True) <= 1.5
+    assert 0.75 * 3 <= policy.backoff(1, transient=True) <= 3
+    assert 0.75 * 5 <= policy.backoff(2, transient=True) <= 5
+
+    assert RetryPolicy(retry_delay=0).backoff(3) == 0
+    assert RetryPolicy(jitter=0).backoff(1) == 1
+
+
+def test_default_strategies():
+    policy = RetryPolicy()
+
+    assert policy.recovery_strategies(t.Status.MAC_TRANSACTION_EXPIRED) == [
+        RecoveryStrategy.ASSOC_REMOVE,
+        RecoveryStrategy.ROUTE_DISCOVERY,
+        RecoveryStrategy.DISABLE_ROUTE_DISCOVERY_SUPPRESSION,
+        RecoveryStrategy.LAST_GOOD_ROUTE,
+    ]
+
+    assert policy.recovery_strategies(t.Status.NWK_NO_ROUTE, IEEE) == [
+        RecoveryStrategy.ROUTE_DISCOVERY,
+        RecoveryStrategy.DISABLE_ROUTE_DISCOVERY_SUPPRESSION,
+        RecoveryStrategy.LAST_GOOD_ROUTE,
+    ]
+
+    assert policy.recovery_strategies(t.Status.BUFFER_FULL) == []
+
+
+@pytest.mark.parametrize("learn", [True, False])
+def test_learned_strategies(learn):
+    policy = RetryPolicy(learn=learn)
+    status = t.Status.MAC_TRANSACTION_EXPIRED
+    default = policy.recovery_strategies(status, IEEE)
+
+    # A single success is not enough
+    policy.record_attempt(IEEE, RecoveryStrategy.ROUTE_DISCOVERY)
+    policy.record_result(IEEE, RecoveryStrategy.ROUTE_DISCOVERY, success=True)
+    assert policy.recovery_strategies(status, IEEE) == default
+
+    # Strategies that worked before are tried first, cheapest first
+    for strategy in (
+        RecoveryStrategy.ROUTE_DISCOVERY,
+        RecoveryStrategy.LAST_GOOD_ROUTE,
+    ):
+        policy.record_attempt(IEEE, strategy)
+        policy.record_result(IEEE, strategy, success=True)
+        policy.record_attempt(IEEE, strategy)
+        policy.record_result(IEEE, strategy, success=True)
+
+    # Strategies that keep failing are not
+    for i in range(3):
+        policy.record_result(IEEE, RecoveryStrategy.ASSOC_REMOVE, success=False)
+
+    if learn:
+        assert policy.recovery_strategies(status, IEEE) == [
+            RecoveryStrategy.LAST_GOOD_ROUTE,
+            RecoveryStrategy.ROUTE_DISCOVERY,
+            RecoveryStrategy.ASSOC_REMOVE,
+            RecoveryStrategy.DISABLE_ROUTE_DISCOVERY_SUPPRESSION,
+        ]
+    else:
+        assert policy.recovery_strategies(status, IEEE) == default
+
+    # Other devices are unaffected
+    assert policy.recovery_strategies(status, t.EUI64(range(1, 9))) == default
+
+    stats = policy.device_stats[IEEE][RecoveryStrategy.ROUTE_DISCOVERY]
+    assert stats.attempts == 3
+    assert stats.successes == 3
+    assert stats.airtime == 3 * 4
+
+    policy.forget(IEEE)
+    assert policy.recovery_strategies(status, IEEE) == default
+
+
+def test_strategies_config():
+    config = conf.CONFIG_SCHEMA(
+        {
+            conf.CONF_DEVICE: {conf.CONF_DEVICE_PATH: "/dev/null"},
+            conf.CONF_ZNP_CONFIG: {
+                conf.CONF_RETRY_POLICY: {
+                    conf.CONF_RECOVERY_STRATEGIES: {
+                        "mac_no_ack": ["last_good_route"],
+                        "BUFFER_FULL": [],
+                    }
+                }
+            },
+        }
+    )
+
+    strategies = config[conf.CONF_ZNP_CONFIG][conf.CONF_RETRY_POLICY][
+        conf.CONF_RECOVERY_STRATEGIES
+    ]
+    policy = RetryPolicy(strategies=strategies)
+
+    assert policy.recovery_strategies(t.Status.MAC_NO_ACK) == [
+        RecoveryStrategy.LAST_GOOD_ROUTE
+    ]
+    assert policy.recovery_strategies(t.Status.BUFFER_FULL) == []
+
+    # Statuses without an override keep their defaults
+    assert len(policy.recovery_strategies(t.Status.APS_NO_ACK)) == 3
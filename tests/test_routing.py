@@ -0,0 +1,93 @@
+import pytest
+
+from zigpy_znp.zigbee.routing import RouteCache, SourceRouteTable
+
+
+@pytest.fixture
+def now(mocker):
+    now = mocker.patch("zigpy_znp.zigbee.routing.time.monotonic")
+    now.return_value = 1000.0
+
+    return now
+
+
+def test_route_cache(now):
+    cache = RouteCache(ttl=30)
+
+    assert not cache.is_fresh(0x1234)
+
+    cache.mark_fresh(0x1234)
+    assert cache.is_fresh(0x1234)
+
+    now.return_value += 29
+    assert cache.is_fresh(0x1234)
+
+    now.return_value += 1
+    assert not cache.is_fresh(0x1234)
+    assert len(cache) == 0
+
+    cache.mark_fresh(0x1234)
+    cache.invalidate(0x1234)
+    assert not cache.is_fresh(0x1234)
+
+    cache.mark_fresh(0x1234)
+    cache.mark_fresh(0x5678)
+    cache.clear()
+    assert not cache.is_fresh(0x5678)
+
+    assert cache.hits == 2
+    assert cache.misses == 4
+
+
+def test_source_route_table(now):
+    table = SourceRouteTable(max_age=60, max_paths=2)
+
+    assert table.best_route(0x1234) is None
+
+    # Relays are stored in the order they are used when sending
+    table.record_route(0x1234, [0x0001, 0x0002])
+    assert table.best_route(0x1234).relays == (0x0002, 0x0001)
+
+    # The most recently seen path wins among equally good paths
+    now.return_value += 1
+    table.record_route(0x1234, [0x0003])
+    assert table.best_route(0x1234).relays == (0x0003,)
+
+    # Until it fails
+    table.record_result(0x1234, [0x0003], success=False)
+    assert table.best_route(0x1234).relays == (0x0002, 0x0001)
+
+    table.record_result(0x1234, [0x0002, 0x0001], success=True)
+    assert table.best_route(0x1234).successes == 1
+
+    # Only a limited number of paths is remembered, the worst one is dropped
+    now.return_value += 1
+    table.record_route(0x1234, [0x0004])
+    assert {r.relays for r in table.routes(0x1234)} == {(0x0002, 0x0001), (0x0004,)}
+
+    # Unknown paths are ignored
+    table.record_result(0x1234, [0x0005], success=True)
+    assert len(table.routes(0x1234)) == 2
+
+    # Old paths are not used
+    now.return_value += 61
+    assert table.best_route(0x1234) is None
+
+    table.remove(0x1234)
+    assert table.routes(0x1234) == []
+
+
+def test_source_route_table_default_failures(now):
+    table = SourceRouteTable()
+
+    table.record_result(0x1234, None, success=False)
+    table.record_result(0x1234, None, success=False)
+    assert table.default_failures(0x1234) == 2
+
+    # Source routed requests do not count
+    table.record_route(0x1234, [0x0001])
+    table.record_result(0x1234, [0x0001], success=True)
+    assert table.default_failures(0x1234) == 2
+
+    table.record_result(0x1234, None, success=True)
+    assert table.default_failures(0x1234) == 0
@@ -0,0 +1,77 @@
+import json
+import pathlib
+
+import pytest
+
+import zigpy_znp.types as t
+from zigpy_znp.znp.nib import NIB, CC2531NIB
+from zigpy_znp.znp.schema import NVRAMView, item_types, parse_item
+from zigpy_znp.types.nvids import ExNvIds, NvSysIds, OsalNvIds
+from zigpy_znp.tools.snapshot import from_json
+
+NVRAM_JSON_DIR = pathlib.Path(__file__).parent / "nvram"
+
+
+@pytest.mark.parametrize("path", sorted(NVRAM_JSON_DIR.glob("*.formed.json")))
+def test_nvram_view(path):
+    view = NVRAMView(from_json(json.loads(path.read_text())))
+
+    nwkkey = view.legacy(OsalNvIds.NWKKEY)
+
+    if path.name.startswith("CC2531"):
+        assert isinstance(view.legacy(OsalNvIds.NIB), CC2531NIB)
+        assert isinstance(nwkkey, t.NwkActiveKeyItemsCC2531)
+    else:
+        assert isinstance(view.legacy(OsalNvIds.NIB), NIB)
+        assert isinstance(nwkkey, t.NwkActiveKeyItems)
+
+    # Values are cached
+    assert view.legacy(OsalNvIds.NIB) is view.legacy(OsalNvIds.NIB)
+
+    # Unknown items pass through
+    unknown = next(key for key in view if not item_types(key))
+    assert view[unknown] == view.raw[unknown]
+
+    if path.name.startswith("CC2652R"):
+        table = view.table(ExNvIds.TCLK_TABLE)
+    else:
+        table = view.table(OsalNvIds.LEGACY_TCLK_TABLE_START)
+
+    assert all(isinstance(entry, t.TCLKDevEntry) for entry in table)
+    assert len(table) == len(table[:]) == len(table.keys)
+
+
+def test_layout_chosen_by_length():
+    key = (NvSysIds.ZSTACK, ExNvIds.LEGACY, OsalNvIds.NWKKEY)
+    desc = t.NwkKeyDesc(KeySeqNum=1, Key=[i for i in range(16)])
+
+    padded = t.NwkActiveKeyItems(
+        Active=desc,
+        PaddingByte1=b"\x00",
+        PaddingByte2=b"\x00",
+        PaddingByte3=b"\x00",
+        FrameCounter=1234,
+    )
+    unpadded = t.NwkActiveKeyItemsCC2531(Active=desc, FrameCounter=1234)
+
+    # The version is only a hint, the length always wins
+    for version in (None, 1.2, 3.0, 3.30):
+        assert parse_item(key, padded.serialize(), version=version) == padded
+        assert parse_item(key, unpadded.serialize(), version=version) == unpadded
+
+    with pytest.raises(ValueError):
+        parse_item(key, b"\x00")
+
+
+@pytest.mark.parametrize("path", sorted(NVRAM_JSON_DIR.glob("*.formed.json")))
+def test_nib_must_fit_exactly(path):
+    view = NVRAMView(from_json(json.loads(path.read_text())))
+    key = (NvSysIds.ZSTACK, ExNvIds.LEGACY, OsalNvIds.NIB)
+    nib = view.raw[key]
+
+    assert parse_item(key, nib) == view.legacy(OsalNvIds.NIB)
+
+    # The NIB layouts already include their padding, anything else is unknown
+    for value in (nib + b"\x00", nib + b"\x00\x00\x00", nib[:-1]):
+        with pytest.raises(ValueError):
+            parse_item(key, value)
@@ -0,0 +1,110 @@
+import asyncio
+
+import pytest
+import zigpy.zdo.types as zdo_t
+from zigpy.zdo.types import NodeDescriptor
+from zigpy.exceptions import DeliveryError
+
+import zigpy_znp.types as t
+import zigpy_znp.config as conf
+import zigpy_znp.commands as c
+from zigpy_znp.exceptions import ConnectionLostError
+from zigpy_znp.zigbee.sleepy import SleepyDeviceQueue
+
+from .conftest import FormedLaunchpadCC26X2R1
+
+pytestmark = [pytest.mark.asyncio]
+
+
+async def test_sleepy_device_queue():
+    queue = SleepyDeviceQueue(expiry=0.1)
+
+    assert not queue.is_asleep(0x1234)
+    queue.mark_asleep(0x1234)
+    assert queue.is_asleep(0x1234)
+
+    waiter1 = asyncio.create_task(queue.wait_until_awake(0x1234, timeout=10))
+    waiter2 = asyncio.create_task(queue.wait_until_awake(0x1234, timeout=10))
+    other = asyncio.create_task(queue.wait_until_awake(0x5678, timeout=10))
+    await asyncio.sleep(0)
+
+    assert queue.pending(0x1234) == 2
+    assert queue.pending(0x5678) == 1
+
+    # Only the device that woke up has its requests released
+    queue.wake_up(0x1234)
+    await waiter1
+    await waiter2
+
+    assert not queue.is_asleep(0x1234)
+    assert queue.pending(0x1234) == 0
+    assert not other.done()
+
+    # Devices are not considered to be asleep forever
+    queue.mark_asleep(0x1234)
+    await asyncio.sleep(0.15)
+    assert not queue.is_asleep(0x1234)
+
+    queue.clear()
+    await asyncio.sleep(0)
+
+    with pytest.raises(ConnectionLostError):
+        await other
+
+    with pytest.raises(asyncio.TimeoutError):
+        await queue.wait_until_awake(0x1234, timeout=0.01)
+
+    assert queue.pending(0x1234) == 0
+    assert queue.parked == 4
+    assert queue.released == 2
+    assert queue.expired == 1
+
+
+async def test_sleepy_device_request_app_closed(make_application):
+    app, znp_server = make_application(
+        server_cls=FormedLaunchpadCC26X2R1,
+        client_config={"znp_config": {conf.CONF_SLEEPY_DEVICE_REQUEST_EXPIRY: 60}},
+    )
+
+    await app.startup(auto_form=False)
+
+    device = app.add_initialized_device(ieee=t.EUI64(range(8)), nwk=0xABCD)
+    device.node_desc = NodeDescriptor(
+        byte1=zdo_t.LogicalType.EndDevice,
+        byte2=0x40,
+        mac_capability_flags=0x80,  # receiver is off when idle
+        manufacturer_code=0x1234,
+        maximum_buffer_size=82,
+        maximum_incoming_transfer_size=82,
+        server_mask=0,
+        maximum_outgoing_transfer_size=82,
+        descriptor_capability_field=0,
+    )
+
+    znp_server.reply_to(
+        c.AF.DataRequestExt.Req(partial=True),
+        responses=[c.AF.DataRequestExt.Rsp(Status=t.Status.SUCCESS)],
+    )
+
+    app._sleepy_devices.mark_asleep(device.nwk)
+
+    request = asyncio.create_task(
+        app.request(
+            device=device,
+            profile=260,
+            cluster=1,
+            src_ep=1,
+            dst_ep=1,
+            sequence=1,
+            data=b"\x00",
+        )
+    )
+
+    await asyncio.sleep(0.1)
+    assert app._sleepy_devices.pending(device.nwk) == 1
+
+    # Parked requests fail like any other request when the radio goes away
+    await app.shutdown()
+
+    with pytest.raises(DeliveryError):
+        await request
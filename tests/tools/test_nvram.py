@@ -1,3 +1,4 @@
+import io
 import json
 
 import pytest
@@ -5,6 +6,7 @@ import pytest
 import zigpy_znp.types as t
 import zigpy_znp.commands as c
 from zigpy_znp.types.nvids import NWK_NVID_TABLES, ExNvIds, OsalNvIds
+from zigpy_znp.tools.snapshot import NVRAMSnapshot, to_json
 from zigpy_znp.tools.nvram_read import main as nvram_read
 from zigpy_znp.tools.nvram_reset import main as nvram_reset
 from zigpy_znp.tools.nvram_write import main as nvram_write
@@ -83,6 +85,37 @@ async def test_nvram_read(device, make_znp_server, tmp_path, mocker):
     znp_server.close()
 
 
+@pytest.mark.parametrize("device", ALL_DEVICES)
+async def test_nvram_read_stdout(device, make_znp_server, capsysbinary):
+    znp_server = make_znp_server(server_cls=device)
+
+    # The backup is written to stdout by default
+    await nvram_read([znp_server._port_path])
+    assert json.loads(capsysbinary.readouterr().out) == dump_nvram(znp_server)
+
+    await nvram_read([znp_server._port_path, "--format", "binary"])
+    snapshot = NVRAMSnapshot(capsysbinary.readouterr().out)
+    assert to_json(snapshot) == dump_nvram(znp_server)
+
+    znp_server.close()
+
+
+@pytest.mark.parametrize("device", ALL_DEVICES)
+async def test_nvram_write_stdin(device, make_znp_server, mocker):
+    znp_server = make_znp_server(server_cls=device)
+
+    backup = dump_nvram(znp_server)
+    backup["LEGACY"]["HAS_CONFIGURED_ZSTACK1"] = "ff"
+
+    stdin = io.TextIOWrapper(io.BytesIO(json.dumps(backup).encode("utf-8")))
+    mocker.patch("sys.stdin", stdin)
+
+    await nvram_write([znp_server._port_path, "-i", "-"])
+    assert dump_nvram(znp_server)["LEGACY"]["HAS_CONFIGURED_ZSTACK1"] == "ff"
+
+    znp_server.close()
+
+
 @pytest.mark.parametrize("device", ALL_DEVICES)
 async def test_nvram_write(device, make_znp_server, tmp_path, mocker):
     znp_server = make_znp_server(server_cls=device)
@@ -125,6 +158,152 @@ async def test_nvram_write(device, make_znp_server, tmp_path, mocker):
     znp_server.close()
 
 
+@pytest.mark.parametrize("device", ALL_DEVICES)
+async def test_nvram_binary_round_trip(device, make_znp_server, tmp_path):
+    znp_server = make_znp_server(server_cls=device)
+    original = dump_nvram(znp_server)
+
+    backup_file = tmp_path / "backup.bin"
+    await nvram_read([znp_server._port_path, "-o", str(backup_file), "-f", "binary"])
+
+    with backup_file.open("rb") as f:
+        assert to_json(NVRAMSnapshot.from_file(f)) == original
+
+    znp_server.nvram = {ExNvIds.LEGACY: {}}
+    await nvram_write([znp_server._port_path, "-i", str(backup_file)])
+
+    restored = dump_nvram(znp_server)
+
+    for item_id, sub_ids in original.items():
+        for sub_id, value in sub_ids.items():
+            # The NIB is handled differently within tests
+            if sub_id == "NIB":
+                continue
+
+            assert restored[item_id][sub_id] == value
+
+    znp_server.close()
+
+
+@pytest.mark.parametrize("device", ALL_DEVICES)
+async def test_nvram_incremental(device, make_znp_server, tmp_path):
+    znp_server = make_znp_server(server_cls=device)
+
+    full_file = tmp_path / "backup.json"
+    await nvram_read([znp_server._port_path, "-o", str(full_file)])
+    original = json.loads(full_file.read_text())
+
+    znp_server.nvram[ExNvIds.LEGACY][OsalNvIds.HAS_CONFIGURED_ZSTACK1] = b"\x12"
+
+    # Known lengths let unchanged items be read without querying their length first
+    unchanged = next(
+        OsalNvIds[name]
+        for name, value in original["LEGACY"].items()
+        if "+" not in name and name != "NIB" and len(value) // 2 < 248
+    )
+    length_req = znp_server.wait_for_response(c.SYS.OSALNVLength.Req(Id=unchanged))
+
+    delta_file = tmp_path / "delta1.json"
+    await nvram_read(
+        [znp_server._port_path, "-o", str(delta_file), "-p", str(full_file)]
+    )
+
+    assert not length_req.done()
+
+    delta = json.loads(delta_file.read_text())
+    assert delta["changed"] == {"LEGACY": {"HAS_CONFIGURED_ZSTACK1": "12"}}
+    assert delta["removed"] == {}
+
+    # Incremental backups can be chained
+    znp_server.nvram[ExNvIds.LEGACY][OsalNvIds.HAS_CONFIGURED_ZSTACK1] = b"\x34"
+
+    delta_file2 = tmp_path / "delta2.json"
+    await nvram_read(
+        [znp_server._port_path, "-o", str(delta_file2), "-p", str(delta_file)]
+    )
+
+    expected = dump_nvram(znp_server)
+    znp_server.nvram = {ExNvIds.LEGACY: {}}
+
+    await nvram_write(
+        [
+            znp_server._port_path,
+            "-i",
+            str(full_file),
+            "-d",
+            str(delta_file),
+            "-d",
+            str(delta_file2),
+        ]
+    )
+
+    restored = dump_nvram(znp_server)
+
+    for item_id, sub_ids in expected.items():
+        for sub_id, value in sub_ids.items():
+            # The NIB is handled differently within tests
+            if sub_id == "NIB":
+                continue
+
+            assert restored[item_id][sub_id] == value
+
+    assert restored["LEGACY"]["HAS_CONFIGURED_ZSTACK1"] == "34"
+    assert original["LEGACY"].get("HAS_CONFIGURED_ZSTACK1") != "34"
+
+    znp_server.close()
+
+
+def fill_sec_material_table(znp_server, count):
+    start = OsalNvIds.LEGACY_NWK_SEC_MATERIAL_TABLE_START
+    end = OsalNvIds.LEGACY_NWK_SEC_MATERIAL_TABLE_END
+    table = range(start, end + 1)
+
+    for nvid in table:
+        znp_server.nvram[ExNvIds.LEGACY].pop(nvid, None)
+
+    for nvid in table[:count]:
+        znp_server.nvram[ExNvIds.LEGACY][nvid] = bytes([nvid & 0xFF]) * 12
+
+    # Record which table entries have their lengths queried
+    length_reqs = []
+    znp_server.callback_for_response(
+        c.SYS.OSALNVLength.Req(partial=True),
+        lambda req: length_reqs.append(req.Id) if req.Id in table else None,
+    )
+
+    return table, length_reqs
+
+
+@pytest.mark.parametrize("device", ALL_DEVICES)
+async def test_nvram_read_table_lengths(device, make_znp_server, tmp_path):
+    znp_server = make_znp_server(server_cls=device)
+    table, length_reqs = fill_sec_material_table(znp_server, 8)
+
+    backup_file = tmp_path / "backup.json"
+    await nvram_read([znp_server._port_path, "-o", str(backup_file)])
+
+    backup = json.loads(backup_file.read_text())
+    assert backup["LEGACY"] == dump_nvram(znp_server)["LEGACY"]
+
+    # Only the first entry and the missing entry after the last have their length read
+    assert length_reqs == [table[0], table[8]]
+
+    znp_server.close()
+
+
+@pytest.mark.parametrize("device", ALL_DEVICES)
+async def test_nvram_reset_table_lengths(device, make_znp_server):
+    znp_server = make_znp_server(server_cls=device)
+    table, length_reqs = fill_sec_material_table(znp_server, 8)
+
+    await nvram_reset(["-c", znp_server._port_path])
+
+    assert not any(nvid in znp_server.nvram[ExNvIds.LEGACY] for nvid in table)
+    assert length_reqs == [table[0], table[8]]
+
+    znp_server.close()
+
+
 @pytest.mark.parametrize("device", ALL_DEVICES)
 async def test_nvram_reset_normal(device, make_znp_server, mocker):
     znp_server = make_znp_server(server_cls=device)
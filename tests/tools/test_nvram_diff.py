@@ -0,0 +1,118 @@
+import json
+import pathlib
+
+import pytest
+
+import zigpy_znp.types as t
+import zigpy_znp.commands as c
+from zigpy_znp.types.nvids import ExNvIds, OsalNvIds
+from zigpy_znp.tools.snapshot import to_json, from_json, serialize
+from zigpy_znp.tools.nvram_diff import main as nvram_diff, decode_item, parse_item_name
+
+from ..conftest import ALL_DEVICES, FORMED_DEVICES
+from .test_nvram import dump_nvram
+
+pytestmark = [pytest.mark.asyncio]
+
+NVRAM_JSON_DIR = pathlib.Path(__file__).parent.parent / "nvram"
+
+
+def test_parse_item_name():
+    assert parse_item_name("NIB") == (1, ExNvIds.LEGACY, OsalNvIds.NIB)
+    assert parse_item_name("LEGACY/NIB") == (1, ExNvIds.LEGACY, OsalNvIds.NIB)
+    assert parse_item_name("TCLK_TABLE/0x0001") == (1, ExNvIds.TCLK_TABLE, 0x0001)
+
+
+@pytest.mark.parametrize("path", sorted(NVRAM_JSON_DIR.glob("*.json")))
+def test_decode_known_items(path):
+    items = from_json(json.loads(path.read_text()))
+
+    for key, value in items.items():
+        obj = decode_item(key, value)
+
+        if key[2] in (OsalNvIds.NIB, OsalNvIds.NWKKEY) and key[1] == ExNvIds.LEGACY:
+            assert obj is not None
+        elif key[1] in (ExNvIds.TCLK_TABLE, ExNvIds.NWK_SEC_MATERIAL_TABLE):
+            assert obj is not None
+
+
+async def test_diff_files(tmp_path, capsys):
+    old = from_json(
+        json.loads((NVRAM_JSON_DIR / "CC2652R-ZStack4.formed.json").read_text())
+    )
+    new = dict(old)
+
+    nib_key = (1, ExNvIds.LEGACY, OsalNvIds.NIB)
+    nib = decode_item(nib_key, old[nib_key])
+    new[nib_key] = nib.replace(nwkPanId=nib.nwkPanId ^ 0xFFFF).serialize()
+    new[1, ExNvIds.LEGACY, OsalNvIds.HAS_CONFIGURED_ZSTACK1] = b"\x55"
+    del new[1, ExNvIds.TCLK_TABLE, 0x0000]
+
+    old_file = tmp_path / "old.bin"
+    old_file.write_bytes(serialize(old))
+
+    new_file = tmp_path / "new.json"
+    new_file.write_text(json.dumps(to_json(new)))
+
+    await nvram_diff([str(new_file), "-i", str(old_file)])
+
+    lines = capsys.readouterr().out.splitlines()
+
+    assert lines == [
+        "LEGACY/NIB: changed",
+        f"    nwkPanId: {nib.nwkPanId!r} -> {nib.nwkPanId ^ 0xFFFF!r}",
+        "LEGACY/HAS_CONFIGURED_ZSTACK1: added (1 bytes)",
+        "TCLK_TABLE/0x0000: removed (20 bytes)",
+    ]
+
+
+@pytest.mark.parametrize("device", ALL_DEVICES)
+async def test_diff_live_identical(device, make_znp_server, tmp_path, capsys):
+    znp_server = make_znp_server(server_cls=device)
+
+    backup_file = tmp_path / "backup.json"
+    backup_file.write_text(json.dumps(dump_nvram(znp_server)))
+
+    # Only lengths are compared by default
+    read_req = znp_server.wait_for_response(c.SYS.OSALNVReadExt.Req(partial=True))
+
+    await nvram_diff([znp_server._port_path, "-i", str(backup_file)])
+
+    assert not read_req.done()
+
+    lines = capsys.readouterr().out.splitlines()
+    assert len(lines) == 1
+    assert lines[0].endswith("items with identical lengths were not compared")
+
+    znp_server.close()
+
+
+@pytest.mark.parametrize("device", FORMED_DEVICES)
+async def test_diff_live_requested(device, make_znp_server, tmp_path, capsys):
+    znp_server = make_znp_server(server_cls=device)
+
+    backup_file = tmp_path / "backup.json"
+    backup_file.write_text(json.dumps(dump_nvram(znp_server)))
+
+    # Same length, different contents
+    znp_server.nib = znp_server.nib.replace(nwkUpdateId=znp_server.nib.nwkUpdateId + 1)
+
+    # Different length
+    znp_server.nvram[ExNvIds.LEGACY][OsalNvIds.APS_USE_INSECURE_JOIN] = b"\x01\x02"
+
+    await nvram_diff([znp_server._port_path, "-i", str(backup_file)])
+    lines = capsys.readouterr().out.splitlines()
+
+    assert "LEGACY/NIB: changed" not in lines
+    assert "LEGACY/APS_USE_INSECURE_JOIN: length changed 1 -> 2" in lines
+
+    await nvram_diff([znp_server._port_path, "-i", str(backup_file), "--item", "NIB"])
+    lines = capsys.readouterr().out.splitlines()
+
+    assert "LEGACY/NIB: changed" in lines
+    assert (
+        f"    nwkUpdateId: {t.uint8_t(znp_server.nib.nwkUpdateId - 1)!r}"
+        f" -> {znp_server.nib.nwkUpdateId!r}"
+    ) in lines
+
+    znp_server.close()
@@ -0,0 +1,158 @@
+import io
+import json
+import pathlib
+
+import pytest
+
+from zigpy_znp.types.nvids import ExNvIds, NvSysIds, OsalNvIds
+from zigpy_znp.tools.snapshot import (
+    HEADER,
+    NVRAMSnapshot,
+    load,
+    to_json,
+    is_delta,
+    from_json,
+    serialize,
+    make_delta,
+    apply_delta,
+    is_snapshot,
+    build_manifest,
+    legacy_item_name,
+    parse_legacy_item_name,
+)
+
+NVRAM_JSON_DIR = pathlib.Path(__file__).parent.parent / "nvram"
+
+
+@pytest.mark.parametrize("path", sorted(NVRAM_JSON_DIR.glob("*.json")))
+def test_json_round_trip(path):
+    obj = json.loads(path.read_text())
+    items = from_json(obj)
+
+    assert to_json(items) == obj
+
+    snapshot = NVRAMSnapshot(serialize(items))
+
+    assert len(snapshot) == len(items)
+    assert dict(snapshot) == items
+    assert to_json(snapshot) == obj
+
+
+def test_legacy_first():
+    items = from_json(
+        {
+            "TCLK_TABLE": {"0x0000": "aa"},
+            "LEGACY": {"NIB": "bb", "LEGACY_TCLK_TABLE_START+2": "cc"},
+        }
+    )
+
+    assert list(items) == [
+        (NvSysIds.ZSTACK, ExNvIds.LEGACY, OsalNvIds.NIB),
+        (NvSysIds.ZSTACK, ExNvIds.LEGACY, OsalNvIds.LEGACY_TCLK_TABLE_START + 2),
+        (NvSysIds.ZSTACK, ExNvIds.TCLK_TABLE, 0x0000),
+    ]
+
+
+def test_legacy_item_names():
+    for nvid in [OsalNvIds.NIB, OsalNvIds.LEGACY_TCLK_TABLE_START + 3, 0x1234]:
+        assert parse_legacy_item_name(legacy_item_name(nvid)) == nvid
+
+    assert legacy_item_name(0x1234) == "0x1234"
+    assert legacy_item_name(OsalNvIds.LEGACY_TCLK_TABLE_START + 3) == (
+        "LEGACY_TCLK_TABLE_START+3"
+    )
+
+
+def test_snapshot_mmap(tmp_path):
+    items = {
+        (NvSysIds.ZSTACK, ExNvIds.LEGACY, OsalNvIds.NIB): b"nib",
+        (NvSysIds.ZSTACK, ExNvIds.ADDRMGR, 0x0001): b"\xFF" * 1000,
+        (NvSysIds.ZSTACK, ExNvIds.ADDRMGR, 0x0002): b"\x00",
+    }
+
+    path = tmp_path / "backup.bin"
+    path.write_bytes(serialize(items))
+
+    with path.open("rb") as f:
+        assert is_snapshot(f.read())
+        f.seek(0)
+
+        with load(f) as snapshot:
+            assert isinstance(snapshot, NVRAMSnapshot)
+            assert snapshot.length((NvSysIds.ZSTACK, ExNvIds.ADDRMGR, 0x0001)) == 1000
+            assert dict(snapshot) == items
+
+            with pytest.raises(KeyError):
+                snapshot[NvSysIds.ZSTACK, ExNvIds.ADDRMGR, 0x0003]
+
+
+def test_load_json_stream():
+    obj = {"LEGACY": {"NIB": "aabb"}}
+    items = load(io.BytesIO(json.dumps(obj).encode()))
+
+    assert items == {(NvSysIds.ZSTACK, ExNvIds.LEGACY, OsalNvIds.NIB): b"\xAA\xBB"}
+
+
+def test_invalid_snapshots():
+    data = serialize({(NvSysIds.ZSTACK, ExNvIds.LEGACY, OsalNvIds.NIB): b"test"})
+
+    with pytest.raises(ValueError):
+        NVRAMSnapshot(data[: HEADER.size - 1])
+
+    with pytest.raises(ValueError):
+        NVRAMSnapshot(b"X" + data[1:])
+
+    with pytest.raises(ValueError):
+        NVRAMSnapshot(data[:-1])
+
+    with pytest.raises(ValueError):
+        to_json({(NvSysIds.APP, 0x0001, 0x0000): b"test"})
+
+
+def test_delta_round_trip():
+    obj = json.loads((NVRAM_JSON_DIR / "CC2652R-ZStack4.formed.json").read_text())
+    old = from_json(obj)
+
+    new = dict(old)
+    legacy = (NvSysIds.ZSTACK, ExNvIds.LEGACY)
+
+    # Same length, different contents
+    key = legacy + (OsalNvIds.PANID,)
+    new[key] = bytes([old[key][0] ^ 0xFF]) + old[key][1:]
+
+    # New item and removed item
+    new[legacy + (OsalNvIds.HAS_CONFIGURED_ZSTACK1,)] = b"\x55"
+    removed = next(k for k in old if k[1] != ExNvIds.LEGACY)
+    del new[removed]
+
+    delta = make_delta(build_manifest(old), new)
+
+    assert is_delta(delta)
+    assert not is_delta(obj)
+    assert from_json(delta["changed"]).keys() == {
+        key,
+        legacy + (OsalNvIds.HAS_CONFIGURED_ZSTACK1,),
+    }
+    assert sum(len(v) for v in delta["removed"].values()) == 1
+
+    # The delta survives serialization and reproduces the new backup exactly
+    delta = json.loads(json.dumps(delta))
+    assert apply_delta(old, delta) == new
+
+    # Nothing changed
+    assert make_delta(build_manifest(new), new)["changed"] == {}
+
+
+def test_delta_wrong_base():
+    obj = json.loads((NVRAM_JSON_DIR / "CC2652R-ZStack4.formed.json").read_text())
+    old = from_json(obj)
+    new = dict(old)
+    new[NvSysIds.ZSTACK, ExNvIds.LEGACY, OsalNvIds.HAS_CONFIGURED_ZSTACK1] = b"\x55"
+
+    delta = make_delta(build_manifest(old), new)
+
+    other = dict(old)
+    other[NvSysIds.ZSTACK, ExNvIds.LEGACY, OsalNvIds.PANID] = b"\x00\x00"
+
+    with pytest.raises(ValueError):
+        apply_delta(other, delta)
@@ -1,3 +1,4 @@
+import time
 import typing
 import asyncio
 import logging
@@ -15,13 +16,21 @@ import zigpy_znp.commands as c
 from zigpy_znp import uart
 from zigpy_znp.nvram import NVRAMHelper
 from zigpy_znp.frames import GeneralFrame
-from zigpy_znp.exceptions import CommandNotRecognized, InvalidCommandResponse
+from zigpy_znp.exceptions import (
+    ConnectionLostError,
+    CommandNotRecognized,
+    InvalidCommandResponse,
+)
 from zigpy_znp.types.nvids import ExNvIds, NvSysIds
 
 LOGGER = logging.getLogger(__name__)
 AFTER_CONNECT_DELAY = 1  # seconds
 STARTUP_DELAY = 1  # seconds
 
+# Ping timeouts when probing a radio that may not be ready yet. Their sum is shorter
+# than the fixed delays of a conservative connect.
+FAST_CONNECT_PING_TIMEOUTS = (0.05, 0.1, 0.2, 0.4, 0.8)  # seconds
+
 
 def _deduplicate_commands(
     commands: typing.Iterable[t.CommandBase],
@@ -79,6 +88,40 @@ async def detect_zstack_version(znp) -> float:
         return 3.0
 
 
+class ConnectStats:
+    """
+    Connection latency accounting, accumulated over every successful connection.
+    """
+
+    def __init__(self):
+        self.connects = 0
+        self.fast_connects = 0
+        self.fallbacks = 0
+        self.last_latency = None
+        self.total_latency = 0.0
+
+    def record(self, latency: float, *, fast: bool, fell_back: bool) -> None:
+        self.connects += 1
+        self.fast_connects += fast
+        self.fallbacks += fell_back
+        self.last_latency = latency
+        self.total_latency += latency
+
+    @property
+    def average_latency(self) -> typing.Optional[float]:
+        if not self.connects:
+            return None
+
+        return self.total_latency / self.connects
+
+    def __repr__(self) -> str:
+        return (
+            f"<{type(self).__name__}(connects={self.connects}, "
+            f"fast_connects={self.fast_connects}, fallbacks={self.fallbacks}, "
+            f"last_latency={self.last_latency})>"
+        )
+
+
 @dataclasses.dataclass(frozen=True)
 class BaseResponseListener:
     matching_commands: typing.Tuple[t.CommandBase]
@@ -158,6 +201,15 @@ class OneShotResponseListener(BaseResponseListener):
 
         return True
 
+    def fail(self, exc: Exception) -> None:
+        if self.future.done():
+            return
+
+        self.future.set_exception(exc)
+
+        # Retrieve the exception so it is not logged if nothing awaits the future
+        self.future.exception()
+
 
 @dataclasses.dataclass(frozen=True)
 class CallbackResponseListener(BaseResponseListener):
@@ -199,6 +251,9 @@ class ZNP:
         self.capabilities = None
         self.version = None
 
+        # Any frame from the radio shows that it is still running
+        self.last_frame_received: typing.Optional[float] = None
+
         self.nvram = NVRAMHelper(self)
 
     def set_application(self, app):
@@ -209,54 +264,45 @@ class ZNP:
     def _port_path(self) -> str:
         return self._config[conf.CONF_DEVICE][conf.CONF_DEVICE_PATH]
 
-    async def connect(self, *, test_port=True) -> None:
+    async def connect(
+        self,
+        *,
+        test_port=True,
+        stats: typing.Optional[ConnectStats] = None,
+        version: typing.Optional[float] = None,
+    ) -> None:
         """
         Connects to the device specified by the "device" section of the config dict.
 
         The `test_port` kwarg allows port testing to be disabled, mainly to get into the
-        bootloader.
+        bootloader. Connection latency is recorded into `stats`, if provided.
+
+        A previously detected Z-Stack `version` skips version detection. It is up to the
+        caller to make sure that it still applies to the connected radio.
         """
 
         # So we cannot connect twice
         assert self._uart is None
 
+        start_time = time.monotonic()
+        fast = False
+        fell_back = False
+
         try:
             self._uart = await uart.connect(self._config[conf.CONF_DEVICE], self)
 
-            LOGGER.debug("Waiting %ss before sending anything", AFTER_CONNECT_DELAY)
-            await asyncio.sleep(AFTER_CONNECT_DELAY)
-
-            if self._config[conf.CONF_ZNP_CONFIG][conf.CONF_SKIP_BOOTLOADER]:
-                LOGGER.debug("Sending bootloader skip byte")
-
-                # XXX: Z-Stack locks up if other radios try probing it first.
-                #      Writing the bootloader skip byte a bunch of times (at least 167)
-                #      appears to reset it.
-                skip = bytes([c.ubl.BootloaderRunMode.FORCE_RUN])
-                self._uart._transport_write(skip * 256)
-
-            # We have to disable all non-bootloader commands to enter the serial
-            # bootloader upon connecting to the UART.
-            if test_port:
-                # Some Z-Stack 3 devices don't like you sending data immediately after
-                # opening the serial port. A small delay helps, but they also sometimes
-                # send a reset indication message when they're ready.
-                LOGGER.debug(
-                    "Waiting %ss or until a reset indication is received", STARTUP_DELAY
-                )
+            if test_port and self._config[conf.CONF_ZNP_CONFIG][conf.CONF_FAST_CONNECT]:
+                fast = await self._fast_connect()
+                fell_back = not fast
 
-                try:
-                    async with async_timeout.timeout(STARTUP_DELAY):
-                        await self.wait_for_response(
-                            c.SYS.ResetInd.Callback(partial=True)
-                        )
-                except asyncio.TimeoutError:
-                    pass
+            if not fast:
+                await self._conservative_connect(test_port=test_port)
 
-                LOGGER.debug("Testing connection to %s", self._port_path)
+            if test_port and version is not None:
+                self.version = version
 
-                # Make sure that our port works
-                self.capabilities = (await self.request(c.SYS.Ping.Req())).Capabilities
+                LOGGER.debug("Assuming previously detected Z-Stack %s", self.version)
+            elif test_port:
                 self.version = await detect_zstack_version(self)
 
                 LOGGER.debug("Detected Z-Stack %s", self.version)
@@ -265,12 +311,87 @@ class ZNP:
             self.close()
             raise
 
+        latency = time.monotonic() - start_time
+
+        if stats is not None:
+            stats.record(latency, fast=fast, fell_back=fell_back)
+
         LOGGER.debug(
-            "Connected to %s at %s baud",
+            "Connected to %s at %s baud in %0.2fs",
             self._uart._transport.serial.name,
             self._uart._transport.serial.baudrate,
+            latency,
         )
 
+    def _skip_bootloader(self) -> None:
+        if not self._config[conf.CONF_ZNP_CONFIG][conf.CONF_SKIP_BOOTLOADER]:
+            return
+
+        LOGGER.debug("Sending bootloader skip byte")
+
+        # XXX: Z-Stack locks up if other radios try probing it first.
+        #      Writing the bootloader skip byte a bunch of times (at least 167)
+        #      appears to reset it.
+        skip = bytes([c.ubl.BootloaderRunMode.FORCE_RUN])
+        self._uart._transport_write(skip * 256)
+
+    async def _fast_connect(self) -> bool:
+        """
+        Probes the radio with pings on a short backoff schedule instead of waiting for
+        fixed delays. Returns whether or not the radio answered.
+        """
+
+        self._skip_bootloader()
+
+        for timeout in FAST_CONNECT_PING_TIMEOUTS:
+            try:
+                async with async_timeout.timeout(timeout):
+                    ping_rsp = await self.request(c.SYS.Ping.Req())
+            except asyncio.TimeoutError:
+                continue
+
+            self.capabilities = ping_rsp.Capabilities
+
+            return True
+
+        LOGGER.debug("Radio did not respond to fast connect, falling back")
+
+        return False
+
+    async def _conservative_connect(self, *, test_port: bool) -> None:
+        """
+        Waits for fixed delays before and after skipping the bootloader, for radios that
+        do not like being sent data immediately after the serial port is opened.
+        """
+
+        LOGGER.debug("Waiting %ss before sending anything", AFTER_CONNECT_DELAY)
+        await asyncio.sleep(AFTER_CONNECT_DELAY)
+
+        self._skip_bootloader()
+
+        # We have to disable all non-bootloader commands to enter the serial
+        # bootloader upon connecting to the UART.
+        if not test_port:
+            return
+
+        # Some Z-Stack 3 devices don't like you sending data immediately after
+        # opening the serial port. A small delay helps, but they also sometimes
+        # send a reset indication message when they're ready.
+        LOGGER.debug(
+            "Waiting %ss or until a reset indication is received", STARTUP_DELAY
+        )
+
+        try:
+            async with async_timeout.timeout(STARTUP_DELAY):
+                await self.wait_for_response(c.SYS.ResetInd.Callback(partial=True))
+        except asyncio.TimeoutError:
+            pass
+
+        LOGGER.debug("Testing connection to %s", self._port_path)
+
+        # Make sure that our port works
+        self.capabilities = (await self.request(c.SYS.Ping.Req())).Capabilities
+
     def connection_made(self) -> None:
         """
         Called by the UART object when a connection has been made.
@@ -285,8 +406,19 @@ class ZNP:
 
         LOGGER.debug("We were disconnected from %s: %s", self._port_path, exc)
 
-        if self._app is not None:
-            self._app.connection_lost(exc)
+        if self._app is None:
+            return
+
+        # Pending requests fail with a distinct error instead of being cancelled when
+        # the application closes us, so they can be told apart from real cancellation
+        error = ConnectionLostError(f"Lost connection to {self._port_path}: {exc}")
+
+        for listeners in self._listeners.values():
+            for listener in listeners:
+                if isinstance(listener, OneShotResponseListener):
+                    listener.fail(error)
+
+        self._app.connection_lost(exc)
 
     def close(self) -> None:
         """
@@ -355,6 +487,8 @@ class ZNP:
         XXX: Can be called multiple times in a single event loop step!
         """
 
+        self.last_frame_received = time.monotonic()
+
         command_cls = c.COMMANDS_BY_ID[frame.header]
         command = command_cls.from_frame(frame)
 
@@ -472,12 +606,23 @@ class ZNP:
 
         return self.wait_for_responses([response])
 
-    async def request(self, request: t.CommandBase, **response_params) -> t.CommandBase:
+    async def request(
+        self,
+        request: t.CommandBase,
+        *,
+        timeout: typing.Optional[float] = None,
+        **response_params,
+    ) -> t.CommandBase:
         """
         Sends a SREQ/AREQ request and returns its SRSP (only for SREQ), failing if any
-        of the SRSP's parameters don't match `response_params`.
+        of the SRSP's parameters don't match `response_params`. The SRSP has to arrive
+        within `timeout` seconds of the request being sent, which defaults to the
+        configured `sync_request_timeout`.
         """
 
+        if timeout is None:
+            timeout = self._config[conf.CONF_ZNP_CONFIG][conf.CONF_SREQ_TIMEOUT]
+
         # Common mistake is to do `znp.request(c.SYS.Ping())`
         if type(request) is not request.Req:
             raise ValueError(f"Cannot send a command that isn't a request: {request!r}")
@@ -504,6 +649,10 @@ class ZNP:
 
         # We should only be sending one SREQ at a time, according to the spec
         async with self._sync_request_lock:
+            # The connection may have been lost while we were waiting for the lock
+            if self._uart is None:
+                raise ConnectionLostError(f"Not connected, cannot send {request}")
+
             LOGGER.debug("Sending request: %s", request)
 
             # If our request has no response, we cannot wait for one
@@ -525,9 +674,7 @@ class ZNP:
             self._uart.send(request.to_frame())
 
             # We should get a SRSP in a reasonable amount of time
-            async with async_timeout.timeout(
-                self._config[conf.CONF_ZNP_CONFIG][conf.CONF_SREQ_TIMEOUT]
-            ):
+            async with async_timeout.timeout(timeout):
                 # We lock until either a sync response is seen or an error occurs
                 response = await response_future
 
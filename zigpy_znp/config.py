@@ -19,6 +19,14 @@ from zigpy.config import (  # noqa: F401
     cv_boolean,
 )
 
+import zigpy_znp.types as t
+from zigpy_znp.zigbee.retry import (
+    DEFAULT_MAX_RETRIES,
+    DEFAULT_RETRY_DELAY,
+    DEFAULT_RETRY_JITTER,
+    DEFAULT_MAX_RETRY_DELAY,
+    RecoveryStrategy,
+)
 from zigpy_znp.commands.util import LEDMode
 
 ConfigType = typing.Dict[str, typing.Any]
@@ -56,6 +64,45 @@ CONF_SREQ_TIMEOUT = "sync_request_timeout"
 CONF_ARSP_TIMEOUT = "async_response_timeout"
 CONF_AUTO_RECONNECT_RETRY_DELAY = "auto_reconnect_retry_delay"
 CONF_MAX_CONCURRENT_REQUESTS = "max_concurrent_requests"
+CONF_ADAPTIVE_CONCURRENCY = "adaptive_concurrency"
+CONF_MAX_CONCURRENT_REQUESTS_PER_DEVICE = "max_concurrent_requests_per_device"
+CONF_MAX_CONCURRENT_REQUESTS_PER_ROUTER = "max_concurrent_requests_per_router"
+CONF_FAST_RESTART = "fast_restart"
+CONF_FAST_CONNECT = "fast_connect"
+CONF_WARM_RECONNECT = "warm_reconnect"
+CONF_PROACTIVE_SOURCE_ROUTING = "proactive_source_routing"
+CONF_SLEEPY_DEVICE_REQUEST_EXPIRY = "sleepy_device_request_expiry"
+CONF_DUPLICATE_MESSAGE_WINDOW = "duplicate_message_window"
+CONF_STARTUP_CACHE_PATH = "startup_cache_path"
+
+CONF_RETRY_POLICY = "retry_policy"
+CONF_MAX_RETRIES = "max_retries"
+CONF_RETRY_DELAY = "retry_delay"
+CONF_MAX_RETRY_DELAY = "max_retry_delay"
+CONF_RETRY_JITTER = "jitter"
+CONF_LEARN_STRATEGIES = "learn_strategies"
+CONF_RECOVERY_STRATEGIES = "strategies"
+
+SCHEMA_RETRY_POLICY = vol.Schema(
+    {
+        vol.Optional(CONF_MAX_RETRIES, default=DEFAULT_MAX_RETRIES): vol.All(
+            int, vol.Range(min=1)
+        ),
+        vol.Optional(CONF_RETRY_DELAY, default=DEFAULT_RETRY_DELAY): VolPositiveNumber,
+        vol.Optional(
+            CONF_MAX_RETRY_DELAY, default=DEFAULT_MAX_RETRY_DELAY
+        ): VolPositiveNumber,
+        vol.Optional(CONF_RETRY_JITTER, default=DEFAULT_RETRY_JITTER): vol.All(
+            numbers.Real, vol.Range(min=0, max=1)
+        ),
+        vol.Optional(CONF_LEARN_STRATEGIES, default=True): cv_boolean,
+        vol.Optional(CONF_RECOVERY_STRATEGIES, default={}): {
+            EnumValue(t.Status, lambda v: str(v).upper()): [
+                EnumValue(RecoveryStrategy, lambda v: str(v).upper())
+            ]
+        },
+    }
+)
 
 CONFIG_SCHEMA = CONFIG_SCHEMA.extend(
     {
@@ -77,6 +124,25 @@ CONFIG_SCHEMA = CONFIG_SCHEMA.extend(
                 vol.Optional(CONF_MAX_CONCURRENT_REQUESTS, default="auto"): vol.Any(
                     "auto", VolPositiveNumber
                 ),
+                vol.Optional(CONF_ADAPTIVE_CONCURRENCY, default=False): cv_boolean,
+                vol.Optional(
+                    CONF_MAX_CONCURRENT_REQUESTS_PER_DEVICE, default=None
+                ): vol.Any(None, VolPositiveNumber),
+                vol.Optional(
+                    CONF_MAX_CONCURRENT_REQUESTS_PER_ROUTER, default=None
+                ): vol.Any(None, VolPositiveNumber),
+                vol.Optional(CONF_FAST_RESTART, default=False): cv_boolean,
+                vol.Optional(CONF_FAST_CONNECT, default=False): cv_boolean,
+                vol.Optional(CONF_WARM_RECONNECT, default=False): cv_boolean,
+                vol.Optional(CONF_PROACTIVE_SOURCE_ROUTING, default=False): cv_boolean,
+                vol.Optional(CONF_SLEEPY_DEVICE_REQUEST_EXPIRY, default=None): vol.Any(
+                    None, VolPositiveNumber
+                ),
+                vol.Optional(CONF_DUPLICATE_MESSAGE_WINDOW, default=None): vol.Any(
+                    None, VolPositiveNumber
+                ),
+                vol.Optional(CONF_STARTUP_CACHE_PATH, default=None): vol.Any(None, str),
+                vol.Optional(CONF_RETRY_POLICY, default={}): SCHEMA_RETRY_POLICY,
             }
         ),
     }
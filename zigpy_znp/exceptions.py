@@ -13,6 +13,14 @@ class CommandNotRecognized(Exception):
     pass
 
 
+class ConnectionLostError(DeliveryError):
+    pass
+
+
+class DeviceAsleepError(DeliveryError):
+    pass
+
+
 class InvalidCommandResponse(DeliveryError):
     def __init__(self, message, response):
         super().__init__(message)
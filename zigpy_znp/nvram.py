@@ -1,12 +1,66 @@
+import typing
+import logging
+
 import zigpy_znp.types as t
 import zigpy_znp.commands as c
 from zigpy_znp.types import nvids
-from zigpy_znp.exceptions import SecurityError, InvalidCommandResponse
+from zigpy_znp.exceptions import (
+    SecurityError,
+    CommandNotRecognized,
+    InvalidCommandResponse,
+)
+
+LOGGER = logging.getLogger(__name__)
+
+# (sys_id, item_id, sub_id), identical to the arguments of `NVRAMHelper.read`
+NVRAMKey = typing.Tuple[int, int, int]
 
 # Some NVIDs don't really exist and Z-Stack doesn't behave consistently when operations
 # are performed on them.
 PROXIED_NVIDS = {nvids.OsalNvIds.POLL_RATE_OLD16}
 
+# `SYS.OSALNVRead(Ext)` responses contain at most this many bytes of the item
+OSAL_NV_READ_MAX_LENGTH = 248
+
+
+class BulkStats:
+    """
+    Accounting for bulk NVRAM operations. Requests are sent back-to-back since the MT
+    interface only allows a single outstanding SREQ, savings come from skipping length
+    queries when an item's length is already known.
+    """
+
+    def __init__(self):
+        self.items = 0
+        self.saved_requests = 0
+
+    def __repr__(self) -> str:
+        return (
+            f"{type(self).__name__}(items={self.items},"
+            f" saved_requests={self.saved_requests})"
+        )
+
+
+def legacy_groups() -> typing.Iterator[typing.List[int]]:
+    """
+    Yields every legacy NVID, grouped into ranges for tables. All entries of a table
+    have the same length and no entries exist after the first missing one.
+    """
+
+    for nvid in nvids.OsalNvIds:
+        if nvid == nvids.OsalNvIds.INVALID_INDEX:
+            continue
+
+        if nvid in nvids.NWK_NVID_TABLES:
+            # Z-Stack's table ranges include their END NVID, as does `nvram_reset`
+            yield list(range(nvid, nvids.NWK_NVID_TABLES[nvid] + 1))
+        elif nvid not in nvids.NWK_NVID_TABLE_KEYS:
+            yield [nvid]
+
+
+def legacy_key(nv_id: int) -> NVRAMKey:
+    return nvids.NvSysIds.ZSTACK, nvids.ExNvIds.LEGACY, nv_id
+
 
 def serialize(value) -> bytes:
     if hasattr(value, "serialize"):
@@ -27,12 +81,31 @@ class NVRAMHelper:
     def __init__(self, znp):
         self.znp = znp
 
+    async def osal_length(self, nv_id: t.uint16_t) -> int:
+        """
+        Returns the length of an item in NVRAM, zero if it does not exist.
+        """
+
+        return (await self.znp.request(c.SYS.OSALNVLength.Req(Id=nv_id))).ItemLen
+
+    async def _osal_delete_known_length(self, nv_id: t.uint16_t, length: int) -> bool:
+        """
+        Deletes an item without querying its length first. Returns whether or not the
+        item was deleted, which fails if it is missing or the length is wrong.
+        """
+
+        delete_rsp = await self.znp.request(
+            c.SYS.OSALNVDelete.Req(Id=nv_id, ItemLen=length)
+        )
+
+        return delete_rsp.Status == t.Status.SUCCESS
+
     async def osal_delete(self, nv_id: t.uint16_t) -> bool:
         """
         Deletes an item from NVRAM. Returns whether or not the item existed.
         """
 
-        length = (await self.znp.request(c.SYS.OSALNVLength.Req(Id=nv_id))).ItemLen
+        length = await self.osal_length(nv_id)
 
         if length == 0:
             return False
@@ -52,7 +125,7 @@ class NVRAMHelper:
         """
 
         value = serialize(value)
-        length = (await self.znp.request(c.SYS.OSALNVLength.Req(Id=nv_id))).ItemLen
+        length = await self.osal_length(nv_id)
 
         # Recreate the item if the length is not correct
         if length != len(value) and nv_id not in PROXIED_NVIDS:
@@ -91,10 +164,33 @@ class NVRAMHelper:
                 RspStatus=t.Status.SUCCESS,
             )
 
-    async def osal_read(self, nv_id: t.uint16_t) -> bytes:
+    async def _osal_read_known_length(
+        self, nv_id: t.uint16_t, length: int
+    ) -> typing.Optional[bytes]:
+        """
+        Reads a short item with a single request, without querying its length first.
+        Returns `None` if the item could not be read this way.
+        """
+
+        # A response shorter than the maximum length contains the entire item
+        if not 0 < length < OSAL_NV_READ_MAX_LENGTH or nv_id in PROXIED_NVIDS:
+            return None
+
+        read_rsp = await self.znp.request(c.SYS.OSALNVReadExt.Req(Id=nv_id, Offset=0))
+
+        if read_rsp.Status != t.Status.SUCCESS or len(read_rsp.Value) != length:
+            return None
+
+        return read_rsp.Value
+
+    async def osal_read(self, nv_id: t.uint16_t, *, expected_length=None) -> bytes:
         """
         Reads a complete value from NVRAM.
 
+        If the item's length is likely known in advance (e.g. from a previous backup),
+        short items are read with a single request instead of probing their length
+        first. A mismatching length falls back to a normal read.
+
         Raises an `KeyError` error if the NVID doesn't exist.
         """
 
@@ -107,8 +203,14 @@ class NVRAMHelper:
 
             return read_rsp.Value
 
+        if expected_length is not None:
+            value = await self._osal_read_known_length(nv_id, expected_length)
+
+            if value is not None:
+                return value
+
         # Every item has a length, even missing ones
-        length = (await self.znp.request(c.SYS.OSALNVLength.Req(Id=nv_id))).ItemLen
+        length = await self.osal_length(nv_id)
 
         if length == 0:
             raise KeyError(f"NV item does not exist: {nv_id!r}")
@@ -147,6 +249,19 @@ class NVRAMHelper:
 
         return data
 
+    async def length(
+        self, sys_id: t.uint8_t, item_id: t.uint16_t, sub_id: t.uint16_t
+    ) -> int:
+        """
+        Returns the length of a subitem in NVRAM, zero if it does not exist.
+        """
+
+        length_rsp = await self.znp.request(
+            c.SYS.NVLength.Req(SysId=sys_id, ItemId=item_id, SubId=sub_id)
+        )
+
+        return length_rsp.Length
+
     async def delete(
         self, sys_id: t.uint8_t, item_id: t.uint16_t, sub_id: t.uint16_t
     ) -> bool:
@@ -177,11 +292,7 @@ class NVRAMHelper:
         """
 
         value = serialize(value)
-        length = (
-            await self.znp.request(
-                c.SYS.NVLength.Req(SysId=sys_id, ItemId=item_id, SubId=sub_id)
-            )
-        ).Length
+        length = await self.length(sys_id, item_id, sub_id)
 
         if length != len(value) and not (
             sys_id == nvids.NvSysIds.ZSTACK
@@ -243,10 +354,7 @@ class NVRAMHelper:
         Raises an `KeyError` error if the NVID doesn't exist.
         """
 
-        length_rsp = await self.znp.request(
-            c.SYS.NVLength.Req(SysId=sys_id, ItemId=item_id, SubId=sub_id)
-        )
-        length = length_rsp.Length
+        length = await self.length(sys_id, item_id, sub_id)
 
         if length == 0:
             raise KeyError(
@@ -273,3 +381,246 @@ class NVRAMHelper:
         assert len(data) == length
 
         return data
+
+    async def _bulk_legacy(
+        self,
+        operation,
+        hints: typing.Mapping[NVRAMKey, int],
+        stats: BulkStats,
+        progress,
+    ) -> None:
+        """
+        Runs an operation over every legacy item. The operation is called with the NVID
+        and its likely length, or `None`, and returns `(found, hint_hit, length)`, where
+        `hint_hit` is `None` if no length was provided.
+
+        The length of the first entry of a table is used for all subsequent entries.
+        """
+
+        for group in legacy_groups():
+            table_length = None
+
+            for nvid in group:
+                length = hints.get(legacy_key(nvid), table_length)
+                found, hint_hit, actual_length = await operation(nvid, length)
+
+                if hint_hit is not None:
+                    stats.saved_requests += 1 if hint_hit else -1
+
+                if not found:
+                    if len(group) > 1:
+                        LOGGER.debug(
+                            "Table 0x%04X has no entry 0x%04X, skipping the rest",
+                            group[0],
+                            nvid,
+                        )
+                    else:
+                        LOGGER.debug("Item 0x%04X does not exist, skipping", nvid)
+
+                    # Tables have no holes
+                    break
+
+                stats.items += 1
+                table_length = actual_length
+
+                if progress is not None:
+                    progress(legacy_key(nvid))
+
+    async def scan(
+        self, *, extended: bool = True, progress=None
+    ) -> typing.Dict[NVRAMKey, int]:
+        """
+        Builds a map of the lengths of every item in NVRAM without reading them.
+        """
+
+        lengths = {}
+
+        for group in legacy_groups():
+            for nvid in group:
+                # Proxied NVIDs report a length of zero but can still be read
+                if nvid in PROXIED_NVIDS:
+                    try:
+                        length = len(await self.osal_read(nvid))
+                    except (KeyError, SecurityError, InvalidCommandResponse):
+                        length = 0
+                else:
+                    length = await self.osal_length(nvid)
+
+                if not length:
+                    break
+
+                lengths[legacy_key(nvid)] = length
+
+                if progress is not None:
+                    progress(legacy_key(nvid))
+
+        if not extended:
+            return lengths
+
+        for item_id in nvids.ExNvIds:
+            if item_id == nvids.ExNvIds.LEGACY:
+                continue
+
+            for sub_id in range(2 ** 16):
+                key = (nvids.NvSysIds.ZSTACK, item_id, sub_id)
+
+                try:
+                    length = await self.length(*key)
+                except CommandNotRecognized:
+                    # CC2531 only supports the legacy NVRAM interface
+                    return lengths
+
+                if not length:
+                    break
+
+                lengths[key] = length
+
+                if progress is not None:
+                    progress(key)
+
+        return lengths
+
+    async def read_all(
+        self,
+        *,
+        extended: bool = True,
+        hints: typing.Mapping[NVRAMKey, int] = None,
+        stats: BulkStats = None,
+        progress=None,
+    ) -> typing.Dict[NVRAMKey, bytes]:
+        """
+        Reads every readable item in NVRAM. Legacy items whose lengths are known, either
+        from `hints` or because they are table entries, are read without querying their
+        length first. Items that cannot be read due to security policies are skipped.
+        """
+
+        hints = hints or {}
+        stats = stats if stats is not None else BulkStats()
+        items = {}
+
+        async def read_legacy(nvid, length):
+            hint_hit = None
+
+            if (
+                length is not None
+                and 0 < length < OSAL_NV_READ_MAX_LENGTH
+                and nvid not in PROXIED_NVIDS
+            ):
+                value = await self._osal_read_known_length(nvid, length)
+
+                if value is not None:
+                    items[legacy_key(nvid)] = value
+                    return True, True, length
+
+                hint_hit = False
+
+            try:
+                value = await self.osal_read(nvid)
+            except KeyError:
+                return False, hint_hit, None
+            except SecurityError:
+                # The item exists but cannot be read
+                LOGGER.error("Read not allowed for 0x%04X", nvid)
+                return True, hint_hit, None
+
+            items[legacy_key(nvid)] = value
+
+            return True, hint_hit, len(value)
+
+        await self._bulk_legacy(read_legacy, hints, stats, progress)
+
+        if not extended:
+            return items
+
+        for item_id in nvids.ExNvIds:
+            if item_id == nvids.ExNvIds.LEGACY:
+                continue
+
+            for sub_id in range(2 ** 16):
+                key = (nvids.NvSysIds.ZSTACK, item_id, sub_id)
+
+                try:
+                    items[key] = await self.read(*key)
+                except CommandNotRecognized:
+                    # CC2531 only supports the legacy NVRAM interface
+                    return items
+                except KeyError:
+                    # Once a read fails, no later reads will succeed
+                    break
+
+                stats.items += 1
+
+                if progress is not None:
+                    progress(key)
+
+        return items
+
+    async def delete_all(
+        self,
+        *,
+        extended: bool = True,
+        hints: typing.Mapping[NVRAMKey, int] = None,
+        stats: BulkStats = None,
+        progress=None,
+    ) -> int:
+        """
+        Deletes every item in NVRAM and returns the number of deleted items. Legacy
+        items whose lengths are known are deleted without querying their length first.
+        """
+
+        hints = hints or {}
+        stats = stats if stats is not None else BulkStats()
+        deleted = 0
+
+        async def delete_legacy(nvid, length):
+            nonlocal deleted
+            hint_hit = None
+
+            if length is not None:
+                if await self._osal_delete_known_length(nvid, length):
+                    deleted += 1
+                    return True, True, length
+
+                hint_hit = False
+
+            length = await self.osal_length(nvid)
+
+            if not length:
+                return False, hint_hit, None
+
+            await self.znp.request(
+                c.SYS.OSALNVDelete.Req(Id=nvid, ItemLen=length),
+                RspStatus=t.Status.SUCCESS,
+            )
+            deleted += 1
+
+            return True, hint_hit, length
+
+        await self._bulk_legacy(delete_legacy, hints, stats, progress)
+
+        if not extended:
+            return deleted
+
+        for item_id in nvids.ExNvIds:
+            if item_id == nvids.ExNvIds.LEGACY:
+                continue
+
+            for sub_id in range(2 ** 16):
+                key = (nvids.NvSysIds.ZSTACK, item_id, sub_id)
+
+                try:
+                    existed = await self.delete(*key)
+                except CommandNotRecognized:
+                    return deleted
+
+                if not existed:
+                    # Once a delete fails, no later deletes will succeed
+                    break
+
+                deleted += 1
+                stats.items += 1
+
+                if progress is not None:
+                    progress(key)
+
+        return deleted
@@ -1,3 +1,4 @@
+import sys
 import logging
 import argparse
 
@@ -34,6 +35,22 @@ class CustomArgumentParser(argparse.ArgumentParser):
         return args
 
 
+class BinaryFileType(argparse.FileType):
+    """
+    Binary `argparse.FileType` that maps `-` to the binary stdin or stdout. Before
+    Python 3.9, `argparse` returns the text streams for `-` regardless of the mode.
+    """
+
+    def __call__(self, string):
+        if string == "-":
+            if "r" in self._mode:
+                return sys.stdin.buffer
+            else:
+                return sys.stdout.buffer
+
+        return super().__call__(string)
+
+
 def setup_parser(description: str) -> argparse.ArgumentParser:
     """
     Creates an ArgumentParser that sets up a logger with a configurable verbosity
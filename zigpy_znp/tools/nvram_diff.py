@@ -0,0 +1,233 @@
+import os
+import sys
+import asyncio
+import logging
+
+import zigpy_znp.types as t
+from zigpy_znp.api import ZNP
+from zigpy_znp.config import CONFIG_SCHEMA
+from zigpy_znp.exceptions import SecurityError
+from zigpy_znp.znp.schema import parse_item
+from zigpy_znp.types.nvids import ExNvIds, NvSysIds
+from zigpy_znp.tools.common import BinaryFileType, setup_parser
+from zigpy_znp.tools.snapshot import NVRAMKey, load, json_name, parse_json_name
+
+LOGGER = logging.getLogger(__name__)
+
+
+def item_name(key: NVRAMKey) -> str:
+    return "/".join(json_name(key))
+
+
+def parse_item_name(name: str) -> NVRAMKey:
+    """
+    Parses `ITEM/SUBITEM` names. Names without a slash refer to legacy items.
+    """
+
+    if "/" in name:
+        return parse_json_name(*name.split("/", 1))
+
+    return parse_json_name(ExNvIds.LEGACY.name, name)
+
+
+def decode_item(key: NVRAMKey, value: bytes):
+    """
+    Decodes a known NVRAM item into its registered type. Returns `None` for unknown or
+    undecodable items.
+    """
+
+    try:
+        obj = parse_item(key, value)
+    except ValueError:
+        return None
+
+    if isinstance(obj, bytes):
+        return None
+
+    return obj
+
+
+def diff_fields(old, new, prefix: str = ""):
+    """
+    Yields `(field, old, new)` for every differing field of two structs, recursing into
+    nested structs.
+    """
+
+    old_fields = old.as_dict()
+    new_fields = new.as_dict()
+
+    names = list(old_fields) + [n for n in new_fields if n not in old_fields]
+
+    for name in names:
+        old_value = old_fields.get(name)
+        new_value = new_fields.get(name)
+
+        if old_value == new_value:
+            continue
+
+        if isinstance(old_value, t.Struct) and isinstance(new_value, t.Struct):
+            yield from diff_fields(old_value, new_value, f"{prefix}{name}.")
+        else:
+            yield f"{prefix}{name}", old_value, new_value
+
+
+class SnapshotNVRAM:
+    """
+    NVRAM source backed by a JSON backup or binary snapshot.
+    """
+
+    live = False
+
+    def __init__(self, items):
+        self.items = items
+
+    async def lengths(self):
+        length = getattr(self.items, "length", None)
+
+        if length is None:
+            return {key: len(value) for key, value in self.items.items()}
+
+        return {key: length(key) for key in self.items}
+
+    async def read(self, key: NVRAMKey) -> bytes:
+        return self.items[key]
+
+
+class RadioNVRAM:
+    """
+    NVRAM source backed by a live radio. Only lengths are queried up front.
+    """
+
+    live = True
+
+    def __init__(self, znp: ZNP):
+        self.znp = znp
+
+    async def lengths(self):
+        return await self.znp.nvram.scan()
+
+    async def read(self, key: NVRAMKey) -> bytes:
+        sys_id, item_id, sub_id = key
+
+        if sys_id == NvSysIds.ZSTACK and item_id == ExNvIds.LEGACY:
+            return await self.znp.nvram.osal_read(sub_id)
+
+        return await self.znp.nvram.read(sys_id, item_id, sub_id)
+
+
+async def diff_nvram(old, new, *, full: bool = False, requested=()):
+    """
+    Compares two NVRAM sources and returns a list of human-readable differences.
+
+    Items are compared by length first. Items with identical lengths are only read if
+    they were requested, if `full` is set, or if neither source is a live radio.
+    """
+
+    old_lengths = await old.lengths()
+    new_lengths = await new.lengths()
+
+    read_all = full or not (old.live or new.live)
+    requested = set(requested)
+
+    lines = []
+    unread = 0
+
+    for key in sorted(old_lengths.keys() | new_lengths.keys()):
+        old_length = old_lengths.get(key, 0)
+        new_length = new_lengths.get(key, 0)
+        name = item_name(key)
+
+        if not new_length:
+            lines.append(f"{name}: removed ({old_length} bytes)")
+            continue
+        elif not old_length:
+            lines.append(f"{name}: added ({new_length} bytes)")
+            continue
+
+        if old_length == new_length and not read_all and key not in requested:
+            unread += 1
+            continue
+
+        try:
+            old_value = await old.read(key)
+            new_value = await new.read(key)
+        except (KeyError, SecurityError):
+            lines.append(f"{name}: could not be read")
+            continue
+
+        if old_value == new_value:
+            continue
+
+        if old_length != new_length:
+            lines.append(f"{name}: length changed {old_length} -> {new_length}")
+        else:
+            lines.append(f"{name}: changed")
+
+        old_obj = decode_item(key, old_value)
+        new_obj = decode_item(key, new_value)
+
+        if isinstance(old_obj, t.Struct) and isinstance(new_obj, t.Struct):
+            for field, old_field, new_field in diff_fields(old_obj, new_obj):
+                lines.append(f"    {field}: {old_field!r} -> {new_field!r}")
+        elif old_obj is not None and new_obj is not None:
+            lines.append(f"    {old_obj!r} -> {new_obj!r}")
+        else:
+            lines.append(f"    {old_value.hex()} -> {new_value.hex()}")
+
+    if unread:
+        lines.append(f"{unread} items with identical lengths were not compared")
+
+    return lines
+
+
+async def main(argv):
+    parser = setup_parser(
+        "Compare a backup against a live radio or against another backup."
+        " The serial port can also be the path to a backup file."
+    )
+    parser.add_argument(
+        "--input",
+        "-i",
+        type=BinaryFileType("rb"),
+        help="Backup to compare against, either a JSON backup or a binary snapshot",
+        required=True,
+    )
+    parser.add_argument(
+        "--full",
+        action="store_true",
+        default=False,
+        help="Read every item from the radio, not only those with differing lengths",
+    )
+    parser.add_argument(
+        "--item",
+        dest="items",
+        action="append",
+        default=[],
+        help="Always compare this item, e.g. `NIB` or `TCLK_TABLE/0x0000`",
+    )
+
+    args = parser.parse_args(argv)
+
+    old = SnapshotNVRAM(load(args.input))
+    requested = [parse_item_name(name) for name in args.items]
+
+    if os.path.isfile(args.serial):
+        with open(args.serial, "rb") as f:
+            new = SnapshotNVRAM(load(f))
+            lines = await diff_nvram(old, new, full=args.full, requested=requested)
+    else:
+        znp = ZNP(CONFIG_SCHEMA({"device": {"path": args.serial}}))
+        await znp.connect()
+
+        try:
+            new = RadioNVRAM(znp)
+            lines = await diff_nvram(old, new, full=args.full, requested=requested)
+        finally:
+            znp.close()
+
+    for line in lines:
+        print(line)
+
+
+if __name__ == "__main__":
+    asyncio.run(main(sys.argv[1:]))  # pragma: no cover
@@ -2,93 +2,111 @@ import sys
 import json
 import asyncio
 import logging
-import argparse
 
 from zigpy_znp.api import ZNP
+from zigpy_znp.nvram import BulkStats
 from zigpy_znp.config import CONFIG_SCHEMA
-from zigpy_znp.exceptions import SecurityError, CommandNotRecognized
-from zigpy_znp.types.nvids import NWK_NVID_TABLES, ExNvIds, NvSysIds, OsalNvIds
-from zigpy_znp.tools.common import setup_parser
+from zigpy_znp.tools.common import BinaryFileType, setup_parser
+from zigpy_znp.tools.snapshot import (
+    Manifest,
+    NVRAMSnapshot,
+    to_json,
+    is_delta,
+    from_json,
+    json_name,
+    serialize,
+    make_delta,
+    is_snapshot,
+    build_manifest,
+    manifest_from_json,
+)
 
 LOGGER = logging.getLogger(__name__)
 
 
-async def backup(radio_path: str):
+async def backup(radio_path: str, *, previous: Manifest = None):
     znp = ZNP(CONFIG_SCHEMA({"device": {"path": radio_path}}))
     await znp.connect()
 
-    data = {}
-    data["LEGACY"] = {}
-
-    # Legacy items need to be handled first, since they are named
-    for nwk_nvid in OsalNvIds:
-        if nwk_nvid == OsalNvIds.INVALID_INDEX:
-            continue
-
-        # Tables span ranges of items. Naming them properly is useful.
-        if nwk_nvid in NWK_NVID_TABLES:
-            start = nwk_nvid
-            end = NWK_NVID_TABLES[nwk_nvid]
-
-            for offset in range(0, end - start):
-                key = f"{nwk_nvid.name}+{offset}"
-
-                try:
-                    value = await znp.nvram.osal_read(nwk_nvid + offset)
-                except SecurityError:
-                    LOGGER.error("Read not allowed for %s", key)
-                    continue
-                except KeyError:
-                    break
-
-                LOGGER.info("%s = %s", key, value)
-                data["LEGACY"][key] = value.hex()
-        else:
-            try:
-                value = await znp.nvram.osal_read(nwk_nvid)
-            except KeyError:
-                LOGGER.warning("Read failed for %s", nwk_nvid)
-                continue
-            except SecurityError:
-                LOGGER.error("Read not allowed for %s", nwk_nvid)
-                continue
-
-            LOGGER.info("%s = %s", nwk_nvid, value)
-            data["LEGACY"][nwk_nvid.name] = value.hex()
-
-    for nvid in ExNvIds:
-        # Skip the LEGACY items, we did them above
-        if nvid == ExNvIds.LEGACY:
-            continue
-
-        for sub_id in range(2 ** 16):
-            try:
-                value = await znp.nvram.read(
-                    sys_id=NvSysIds.ZSTACK, item_id=nvid, sub_id=sub_id
-                )
-            except CommandNotRecognized:
-                # CC2531 only supports the legacy NVRAM interface, even on Z-Stack 3
-                return data
-            except KeyError:
-                # Once a read fails, no later reads will succeed
-                break
-
-            LOGGER.info("%s[0x%04X] = %s", nvid.name, sub_id, value)
-            data.setdefault(nvid.name, {})[f"0x{sub_id:04X}"] = value.hex()
-
-    return data
+    try:
+        return await read_nvram(znp, previous=previous)
+    finally:
+        znp.close()
+
+
+def load_manifest(f) -> Manifest:
+    """
+    Loads the manifest of a previous full or incremental backup.
+    """
+
+    data = f.read()
+
+    if is_snapshot(data):
+        return build_manifest(NVRAMSnapshot(data))
+
+    obj = json.loads(data)
+
+    if is_delta(obj):
+        return manifest_from_json(obj["manifest"])
+
+    return build_manifest(from_json(obj))
+
+
+async def read_nvram(znp: ZNP, *, previous: Manifest = None):
+    """
+    Reads every NVRAM item into a JSON backup. Lengths from the manifest of a previous
+    backup are used to skip length queries of unchanged legacy items.
+    """
+
+    hints = {key: length for key, (length, _) in (previous or {}).items()}
+    stats = BulkStats()
+
+    def progress(key):
+        LOGGER.info("Read %s", "/".join(json_name(key)))
+
+    items = await znp.nvram.read_all(hints=hints, stats=stats, progress=progress)
+    LOGGER.info(
+        "Read %d items, skipped %d length queries", stats.items, stats.saved_requests
+    )
+
+    return to_json(items)
 
 
 async def main(argv):
     parser = setup_parser("Backup a radio's NVRAM")
     parser.add_argument(
-        "--output", "-o", type=argparse.FileType("w"), help="Output file", default="-"
+        "--output", "-o", type=BinaryFileType("wb"), help="Output file", default="-"
+    )
+    parser.add_argument(
+        "--format",
+        "-f",
+        choices=["json", "binary"],
+        default="json",
+        help="Backup format. Binary snapshots are smaller and can be memory-mapped.",
+    )
+    parser.add_argument(
+        "--previous",
+        "-p",
+        type=BinaryFileType("rb"),
+        default=None,
+        help="Previous full or incremental backup. Only changed items are written.",
     )
 
     args = parser.parse_args(argv)
 
-    obj = await backup(args.serial)
-    args.output.write(json.dumps(obj, indent=4))
+    if args.previous is not None and args.format != "json":
+        parser.error("Incremental backups can only be written as JSON")
+
+    previous = load_manifest(args.previous) if args.previous is not None else None
+    obj = await backup(args.serial, previous=previous)
+
+    if previous is not None:
+        delta = make_delta(previous, from_json(obj))
+        args.output.write(json.dumps(delta, indent=4).encode("utf-8"))
+    elif args.format == "binary":
+        args.output.write(serialize(from_json(obj)))
+    else:
+        args.output.write(json.dumps(obj, indent=4).encode("utf-8"))
 
 
 if __name__ == "__main__":
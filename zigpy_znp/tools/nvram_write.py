@@ -2,52 +2,47 @@ import sys
 import json
 import asyncio
 import logging
-import argparse
 
 import zigpy_znp.types as t
 import zigpy_znp.commands as c
 from zigpy_znp.api import ZNP
 from zigpy_znp.config import CONFIG_SCHEMA
-from zigpy_znp.types.nvids import ExNvIds, NvSysIds, OsalNvIds
-from zigpy_znp.tools.common import setup_parser
+from zigpy_znp.types.nvids import ExNvIds, NvSysIds
+from zigpy_znp.tools.common import BinaryFileType, setup_parser
+from zigpy_znp.tools.snapshot import load, from_json, apply_delta
 
 LOGGER = logging.getLogger(__name__)
 
 
 async def restore(radio_path, backup):
+    """
+    Restores a backup, either a JSON object or a mapping of NVRAM keys to values such as
+    a binary snapshot.
+    """
+
+    if "LEGACY" in backup:
+        backup = from_json(backup)
+
     znp = ZNP(CONFIG_SCHEMA({"device": {"path": radio_path}}))
 
     await znp.connect()
 
     # First write the NVRAM items common to all radios
-    for nwk_nvid, value in backup["LEGACY"].items():
-        if "+" in nwk_nvid:
-            nwk_nvid, _, offset = nwk_nvid.partition("+")
-            offset = int(offset)
-            nvid = OsalNvIds[nwk_nvid] + offset
-        else:
-            nvid = OsalNvIds[nwk_nvid]
-
-        value = bytes.fromhex(value)
-        await znp.nvram.osal_write(nvid, value, create=True)
+    for (sys_id, item_id, sub_id), value in backup.items():
+        if sys_id == NvSysIds.ZSTACK and item_id == ExNvIds.LEGACY:
+            await znp.nvram.osal_write(sub_id, value, create=True)
 
-    for item_name, sub_ids in backup.items():
-        item_id = ExNvIds[item_name]
-
-        if item_id == ExNvIds.LEGACY:
+    for (sys_id, item_id, sub_id), value in backup.items():
+        if sys_id == NvSysIds.ZSTACK and item_id == ExNvIds.LEGACY:
             continue
 
-        for sub_id, value in sub_ids.items():
-            sub_id = int(sub_id, 16)
-            value = bytes.fromhex(value)
-
-            await znp.nvram.write(
-                sys_id=NvSysIds.ZSTACK,
-                item_id=item_id,
-                sub_id=sub_id,
-                value=value,
-                create=True,
-            )
+        await znp.nvram.write(
+            sys_id=sys_id,
+            item_id=item_id,
+            sub_id=sub_id,
+            value=value,
+            create=True,
+        )
 
     # Reset afterwards to have the new values take effect
     await znp.request_callback_rsp(
@@ -59,11 +54,28 @@ async def restore(radio_path, backup):
 async def main(argv):
     parser = setup_parser("Restore a radio's NVRAM from a previous backup")
     parser.add_argument(
-        "--input", "-i", type=argparse.FileType("r"), help="Input file", required=True
+        "--input",
+        "-i",
+        type=BinaryFileType("rb"),
+        help="Input file, either a JSON backup or a binary snapshot",
+        required=True,
+    )
+    parser.add_argument(
+        "--delta",
+        "-d",
+        type=BinaryFileType("rb"),
+        action="append",
+        default=[],
+        help="Incremental backup to apply on top of the input, can be repeated",
     )
 
     args = parser.parse_args(argv)
-    backup = json.load(args.input)
+    backup = load(args.input)
+
+    # Incremental backups must be applied in the order they were created
+    for f in args.delta:
+        backup = apply_delta(backup, json.load(f))
+
     await restore(args.serial, backup)
 
 
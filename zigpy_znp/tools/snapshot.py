@@ -0,0 +1,346 @@
+import io
+import json
+import mmap
+import struct
+import typing
+import hashlib
+import collections.abc
+
+from zigpy_znp.nvram import NVRAMKey
+from zigpy_znp.types.nvids import NWK_NVID_TABLES, ExNvIds, NvSysIds, OsalNvIds
+
+# Binary snapshot layout, all little endian:
+#
+#   [Magic:8] [Version:2] [Count:4]
+#   Count * [SysId:1] [ItemId:2] [SubId:2] [Offset:4] [Length:4]
+#   [Data:...]
+#
+# Offsets are relative to the start of the data region, which immediately follows the
+# index. The index is small enough to be parsed up front, values are sliced out of the
+# (usually memory-mapped) file only when accessed.
+MAGIC = b"ZNPNVRAM"
+FORMAT_VERSION = 1
+
+HEADER = struct.Struct("<8sHI")
+INDEX_ENTRY = struct.Struct("<BHHII")
+
+
+def is_snapshot(data: bytes) -> bool:
+    """
+    Returns whether or not the provided data is the start of a binary snapshot.
+    """
+
+    return bytes(data[: len(MAGIC)]) == MAGIC
+
+
+def legacy_item_name(nvid: int) -> str:
+    """
+    Names a legacy NVID the same way `nvram_read` does in JSON backups.
+    """
+
+    # Tables span ranges of items
+    for start, end in NWK_NVID_TABLES.items():
+        if start <= nvid <= end:
+            return f"{start.name}+{nvid - start}"
+
+    try:
+        return OsalNvIds(nvid).name
+    except ValueError:
+        return f"0x{nvid:04X}"
+
+
+def parse_legacy_item_name(name: str) -> int:
+    """
+    Inverse of `legacy_item_name`.
+    """
+
+    if name.startswith("0x"):
+        return int(name, 16)
+    elif "+" in name:
+        name, _, offset = name.partition("+")
+        return OsalNvIds[name] + int(offset)
+    else:
+        return OsalNvIds[name]
+
+
+def json_name(key: NVRAMKey) -> typing.Tuple[str, str]:
+    """
+    Returns the item and sub-item names of an NVRAM key within JSON backups.
+    """
+
+    sys_id, item_id, sub_id = key
+
+    if sys_id != NvSysIds.ZSTACK:
+        raise ValueError(f"Only ZSTACK items can be stored in JSON: {sys_id!r}")
+
+    item_id = ExNvIds(item_id)
+
+    if item_id == ExNvIds.LEGACY:
+        return item_id.name, legacy_item_name(sub_id)
+
+    return item_id.name, f"0x{sub_id:04X}"
+
+
+def parse_json_name(item_name: str, sub_name: str) -> NVRAMKey:
+    """
+    Inverse of `json_name`.
+    """
+
+    item_id = ExNvIds[item_name]
+
+    if item_id == ExNvIds.LEGACY:
+        return NvSysIds.ZSTACK, item_id, parse_legacy_item_name(sub_name)
+
+    return NvSysIds.ZSTACK, item_id, int(sub_name, 16)
+
+
+def from_json(
+    obj: typing.Dict[str, typing.Dict[str, str]]
+) -> typing.Dict[NVRAMKey, bytes]:
+    """
+    Converts a JSON NVRAM backup into a flat dictionary of NVRAM keys and values.
+    Legacy items are always first.
+    """
+
+    items = {}
+
+    for item_name, sub_items in sorted(obj.items(), key=lambda i: i[0] != "LEGACY"):
+        for sub_name, value in sub_items.items():
+            items[parse_json_name(item_name, sub_name)] = bytes.fromhex(value)
+
+    return items
+
+
+def to_json(
+    items: typing.Mapping[NVRAMKey, bytes]
+) -> typing.Dict[str, typing.Dict[str, str]]:
+    """
+    Converts NVRAM keys and values into the JSON backup format.
+    """
+
+    obj = {}
+
+    for key, value in items.items():
+        item_name, sub_name = json_name(key)
+        obj.setdefault(item_name, {})[sub_name] = bytes(value).hex()
+
+    return obj
+
+
+def serialize(items: typing.Mapping[NVRAMKey, bytes]) -> bytes:
+    """
+    Serializes NVRAM keys and values into a binary snapshot.
+    """
+
+    index = []
+    data = []
+    offset = 0
+
+    for (sys_id, item_id, sub_id), value in items.items():
+        index.append(INDEX_ENTRY.pack(sys_id, item_id, sub_id, offset, len(value)))
+        data.append(bytes(value))
+        offset += len(value)
+
+    return b"".join([HEADER.pack(MAGIC, FORMAT_VERSION, len(index))] + index + data)
+
+
+class NVRAMSnapshot(collections.abc.Mapping):
+    """
+    Read-only view of a binary NVRAM snapshot. Only the index is parsed upon creation,
+    individual values are read from the underlying buffer on access.
+    """
+
+    def __init__(self, buffer: typing.Union[bytes, mmap.mmap]):
+        self._buffer = buffer
+        self._index = {}
+
+        if len(buffer) < HEADER.size:
+            raise ValueError("Snapshot is too short to contain a header")
+
+        magic, version, count = HEADER.unpack_from(buffer, 0)
+
+        if magic != MAGIC:
+            raise ValueError(f"Invalid snapshot magic: {magic!r}")
+
+        if version != FORMAT_VERSION:
+            raise ValueError(f"Unsupported snapshot version: {version}")
+
+        data_start = HEADER.size + count * INDEX_ENTRY.size
+
+        if len(buffer) < data_start:
+            raise ValueError("Snapshot is too short to contain its index")
+
+        for i in range(count):
+            sys_id, item_id, sub_id, offset, length = INDEX_ENTRY.unpack_from(
+                buffer, HEADER.size + i * INDEX_ENTRY.size
+            )
+
+            start = data_start + offset
+
+            if start + length > len(buffer):
+                raise ValueError(
+                    f"Snapshot item is truncated: {(sys_id, item_id, sub_id)!r}"
+                )
+
+            self._index[sys_id, item_id, sub_id] = (start, length)
+
+    @classmethod
+    def from_file(cls, f: typing.BinaryIO) -> "NVRAMSnapshot":
+        """
+        Memory-maps an open binary file. Streams that cannot be memory-mapped (e.g. a
+        pipe) are read into memory instead.
+        """
+
+        try:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError, io.UnsupportedOperation):
+            buffer = f.read()
+
+        return cls(buffer)
+
+    def close(self) -> None:
+        if isinstance(self._buffer, mmap.mmap):
+            self._buffer.close()
+
+    def __enter__(self) -> "NVRAMSnapshot":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def length(self, key: NVRAMKey) -> int:
+        """
+        Returns the length of an item without reading it.
+        """
+
+        return self._index[key][1]
+
+    def __getitem__(self, key: NVRAMKey) -> bytes:
+        start, length = self._index[key]
+
+        return bytes(self._buffer[start : start + length])
+
+    def __iter__(self) -> typing.Iterator[NVRAMKey]:
+        return iter(self._index)
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def __repr__(self) -> str:
+        return f"<{type(self).__name__} with {len(self)} items>"
+
+
+def load(f: typing.BinaryIO) -> typing.Mapping[NVRAMKey, bytes]:
+    """
+    Loads either a binary snapshot or a JSON backup from an open binary file.
+    """
+
+    if f.seekable():
+        is_binary = is_snapshot(f.read(len(MAGIC)))
+        f.seek(0)
+
+        if is_binary:
+            return NVRAMSnapshot.from_file(f)
+
+        return from_json(json.load(f))
+
+    data = f.read()
+
+    if is_snapshot(data):
+        return NVRAMSnapshot(data)
+
+    return from_json(json.loads(data))
+
+
+# Incremental backups only store the items that changed since a previous backup. Each
+# one also contains a manifest of every item's length and digest, which is enough to
+# create the next incremental backup and to verify the result of a restore.
+Manifest = typing.Dict[NVRAMKey, typing.Tuple[int, str]]
+
+
+def digest(value: bytes) -> str:
+    return hashlib.sha256(value).hexdigest()
+
+
+def is_delta(obj: typing.Dict[str, typing.Any]) -> bool:
+    return "manifest" in obj and "changed" in obj
+
+
+def build_manifest(items: typing.Mapping[NVRAMKey, bytes]) -> Manifest:
+    return {key: (len(value), digest(value)) for key, value in items.items()}
+
+
+def manifest_to_json(manifest: Manifest) -> typing.Dict[str, typing.Any]:
+    obj = {}
+
+    for key, (length, value_digest) in manifest.items():
+        item_name, sub_name = json_name(key)
+        obj.setdefault(item_name, {})[sub_name] = {
+            "length": length,
+            "sha256": value_digest,
+        }
+
+    return obj
+
+
+def manifest_from_json(obj: typing.Dict[str, typing.Any]) -> Manifest:
+    manifest = {}
+
+    for item_name, sub_items in obj.items():
+        for sub_name, entry in sub_items.items():
+            key = parse_json_name(item_name, sub_name)
+            manifest[key] = (entry["length"], entry["sha256"])
+
+    return manifest
+
+
+def make_delta(
+    previous: Manifest, items: typing.Mapping[NVRAMKey, bytes]
+) -> typing.Dict[str, typing.Any]:
+    """
+    Creates an incremental backup of `items` relative to a previous manifest.
+    """
+
+    manifest = build_manifest(items)
+    changed = {}
+
+    for key, value in items.items():
+        # Lengths are compared first, digests only if they match
+        if key not in previous or previous[key][0] != len(value):
+            changed[key] = value
+        elif previous[key][1] != manifest[key][1]:
+            changed[key] = value
+
+    removed = {}
+
+    for key in previous.keys() - items.keys():
+        item_name, sub_name = json_name(key)
+        removed.setdefault(item_name, []).append(sub_name)
+
+    return {
+        "manifest": manifest_to_json(manifest),
+        "changed": to_json(changed),
+        "removed": removed,
+    }
+
+
+def apply_delta(
+    items: typing.Mapping[NVRAMKey, bytes], delta: typing.Dict[str, typing.Any]
+) -> typing.Dict[NVRAMKey, bytes]:
+    """
+    Applies an incremental backup to a full backup, verifying the result against the
+    incremental backup's manifest.
+    """
+
+    result = dict(items)
+
+    for item_name, sub_names in delta["removed"].items():
+        for sub_name in sub_names:
+            result.pop(parse_json_name(item_name, sub_name), None)
+
+    result.update(from_json(delta["changed"]))
+
+    if build_manifest(result) != manifest_from_json(delta["manifest"]):
+        raise ValueError("Incremental backup does not apply to the provided backup")
+
+    return result
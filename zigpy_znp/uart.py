@@ -169,20 +169,25 @@ async def connect(config: conf.ConfigType, api, *, toggle_rts=True) -> ZnpMtProt
     # Skips the bootloader on slaesh's CC2652R USB stick
     if toggle_rts:
         LOGGER.debug("Toggling RTS/CTS to skip CC2652R bootloader")
-        transport.serial.dtr = False
-        transport.serial.rts = False
 
-        await asyncio.sleep(RTS_TOGGLE_DELAY)
+        try:
+            transport.serial.dtr = False
+            transport.serial.rts = False
 
-        transport.serial.dtr = False
-        transport.serial.rts = True
+            await asyncio.sleep(RTS_TOGGLE_DELAY)
 
-        await asyncio.sleep(RTS_TOGGLE_DELAY)
+            transport.serial.dtr = False
+            transport.serial.rts = True
 
-        transport.serial.dtr = False
-        transport.serial.rts = False
+            await asyncio.sleep(RTS_TOGGLE_DELAY)
 
-        await asyncio.sleep(RTS_TOGGLE_DELAY)
+            transport.serial.dtr = False
+            transport.serial.rts = False
+
+            await asyncio.sleep(RTS_TOGGLE_DELAY)
+        except OSError as e:
+            # Pseudo-terminals and some serial port emulators have no control lines
+            LOGGER.debug("Serial port does not support RTS/DTR: %s", e)
 
     LOGGER.debug("Connected to %s at %s baud", port, baudrate)
 
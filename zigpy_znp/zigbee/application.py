@@ -4,8 +4,10 @@ import typing
 import asyncio
 import logging
 import warnings
+import functools
 import itertools
 import contextlib
+import dataclasses
 
 import zigpy.zdo
 import zigpy.util
@@ -24,10 +26,39 @@ from zigpy.exceptions import DeliveryError
 import zigpy_znp.types as t
 import zigpy_znp.config as conf
 import zigpy_znp.commands as c
-from zigpy_znp.api import ZNP
-from zigpy_znp.znp.nib import NIB, CC2531NIB, parse_nib
-from zigpy_znp.exceptions import CommandNotRecognized, InvalidCommandResponse
-from zigpy_znp.types.nvids import OsalNvIds
+from zigpy_znp.api import ZNP, ConnectStats, detect_zstack_version
+from zigpy_znp.nvram import NVRAMKey
+from zigpy_znp.znp.nib import NIB, CC2531NIB
+from zigpy_znp.exceptions import (
+    DeviceAsleepError,
+    ConnectionLostError,
+    CommandNotRecognized,
+    InvalidCommandResponse,
+)
+from zigpy_znp.znp.schema import NVRAMView, parse_item
+from zigpy_znp.types.nvids import ExNvIds, NvSysIds, OsalNvIds
+from zigpy_znp.zigbee.retry import RetryPolicy, RecoveryState, RecoveryStrategy
+from zigpy_znp.zigbee.sleepy import SleepyDeviceQueue
+from zigpy_znp.zigbee.inbound import Priority, InboundQueue, DuplicateFilter
+from zigpy_znp.zigbee.joining import JoinRequest, JoinPipeline
+from zigpy_znp.zigbee.routing import RouteCache, SourceRouteTable
+from zigpy_znp.zigbee.concurrency import (
+    RequestSlot,
+    InFlightTable,
+    OrphanRegistry,
+    AdaptiveLimiter,
+    BroadcastBudget,
+)
+from zigpy_znp.zigbee.fingerprint import (
+    DeviceProfile,
+    StartupFingerprint,
+    nib_digest,
+    save_profile,
+    load_profiles,
+    settings_digest,
+    save_fingerprint,
+    load_fingerprints,
+)
 from zigpy_znp.zigbee.zdo_converters import ZDO_CONVERTERS
 
 with warnings.catch_warnings():
@@ -47,11 +78,39 @@ STARTUP_TIMEOUT = 5  # seconds
 ZDO_REQUEST_TIMEOUT = 15  # seconds
 DATA_CONFIRM_TIMEOUT = 8  # seconds
 DEVICE_JOIN_MAX_DELAY = 2  # seconds
+DEVICE_INTERVIEW_TIMEOUT = 60  # seconds
 NETWORK_COMMISSIONING_TIMEOUT = 30  # seconds
-WATCHDOG_PERIOD = 30  # seconds
-
-REQUEST_MAX_RETRIES = 5
-REQUEST_ERROR_RETRY_DELAY = 0.5  # second
+WATCHDOG_IDLE_INTERVAL = 10  # seconds
+WATCHDOG_PING_TIMEOUT = 2  # seconds
+WARM_RECONNECT_TIMEOUT = 10  # seconds
+ROUTE_CACHE_MAX_TTL = 60  # seconds
+
+# Consecutive failures without a source route before the best known path is used
+SOURCE_ROUTE_FAILURE_THRESHOLD = 3
+
+# Z-Stack's broadcast transaction table has 9 entries by default (`MAX_BCAST`), some
+# are left for the broadcasts Z-Stack sends on its own, like route requests
+MAX_OUTSTANDING_BROADCASTS = 6
+
+# Confirmation waits of timed out requests are kept around to catch late confirmations
+MAX_ORPHANED_CONFIRMS = 32
+ORPHANED_CONFIRM_MAX_AGE = 15  # seconds
+
+# Joining devices are discovered and interviewed only a few at a time
+MAX_CONCURRENT_JOINS = 4
+JOIN_INTERVIEW_POLL_INTERVAL = 0.5  # seconds
+
+# Received messages are handed to zigpy in batches, in between radio responses
+INBOUND_QUEUE_SIZE = 256
+INBOUND_BATCH_SIZE = 32
+INBOUND_BATCH_TIME_BUDGET = 0.01  # seconds
+
+# Security and alarm traffic skips ahead of everything else that was received
+HIGH_PRIORITY_CLUSTERS = {
+    clusters.security.IasZone.cluster_id,
+    clusters.security.IasAce.cluster_id,
+    clusters.security.IasWd.cluster_id,
+}
 
 # Errors that go away on their own after waiting for a bit
 REQUEST_TRANSIENT_ERRORS = {
@@ -79,9 +138,63 @@ DEFAULT_TC_LINK_KEY = t.TCLinkKey(
 )
 ZSTACK_CONFIGURE_SUCCESS = b"\x55"
 
+# Requests that can safely be sent twice, if it is unknown whether the first one was
+IDEMPOTENT_ZDO_REQUESTS = {
+    ZDOCmd.NWK_addr_req,
+    ZDOCmd.IEEE_addr_req,
+    ZDOCmd.Node_Desc_req,
+    ZDOCmd.Power_Desc_req,
+    ZDOCmd.Simple_Desc_req,
+    ZDOCmd.Active_EP_req,
+    ZDOCmd.Match_Desc_req,
+    ZDOCmd.Bind_req,
+    ZDOCmd.Unbind_req,
+    ZDOCmd.Mgmt_Lqi_req,
+    ZDOCmd.Mgmt_Rtg_req,
+}
+
+IDEMPOTENT_ZCL_COMMANDS = {
+    zigpy.zcl.foundation.Command.Read_Attributes,
+    zigpy.zcl.foundation.Command.Write_Attributes,
+    zigpy.zcl.foundation.Command.Configure_Reporting,
+    zigpy.zcl.foundation.Command.Read_Reporting_Configuration,
+    zigpy.zcl.foundation.Command.Discover_Attributes,
+    zigpy.zcl.foundation.Command.Discover_Commands_Received,
+    zigpy.zcl.foundation.Command.Discover_Commands_Generated,
+    zigpy.zcl.foundation.Command.Discover_Attribute_Extended,
+}
+
 LOGGER = logging.getLogger(__name__)
 
 
+def is_idempotent_request(dst_ep: int, cluster: int, data: bytes) -> bool:
+    """
+    Checks whether sending a request twice has the same effect as sending it once.
+    Only ZDO requests and global ZCL commands are considered.
+    """
+
+    if dst_ep == ZDO_ENDPOINT:
+        return cluster in IDEMPOTENT_ZDO_REQUESTS
+
+    try:
+        hdr, _ = zigpy.zcl.foundation.ZCLHeader.deserialize(data)
+    except ValueError:
+        return False
+
+    return hdr.frame_control.is_general and hdr.command_id in IDEMPOTENT_ZCL_COMMANDS
+
+
+@dataclasses.dataclass(frozen=True)
+class ProbeResult:
+    """
+    A ZNP radio found by probing a serial port.
+    """
+
+    device_config: conf.ConfigType
+    capabilities: t.MTCapabilities
+    version: float
+
+
 class ZNPCoordinator(zigpy.device.Device):
     """
     Coordinator zigpy device that keeps track of our endpoints and clusters.
@@ -123,12 +236,57 @@ class ControllerApplication(zigpy.application.ControllerApplication):
         self._watchdog_task.cancel()
 
         self._nib = NIB()
+        self._startup_fingerprint = None
+        self._device_profile = None
+        self._connect_stats = ConnectStats()
         self._network_key = None
         self._network_key_seq = None
-        self._concurrent_requests_semaphore = None
-        self._currently_waiting_requests = 0
+        self._concurrency_limiter = None
+        self._broadcast_budget = BroadcastBudget(MAX_OUTSTANDING_BROADCASTS)
+        self._in_flight_requests = InFlightTable()
+        self._orphaned_confirms = OrphanRegistry(
+            max_orphans=MAX_ORPHANED_CONFIRMS, max_age=ORPHANED_CONFIRM_MAX_AGE
+        )
         self._route_discovery_futures = {}
-        self._join_announce_tasks = {}
+        self._join_route_tasks: typing.Set[asyncio.Task] = set()
+        self._route_cache = RouteCache(ttl=ROUTE_CACHE_MAX_TTL)
+        self._source_routes = SourceRouteTable()
+        self._sleepy_devices = SleepyDeviceQueue(
+            expiry=self.znp_config[conf.CONF_SLEEPY_DEVICE_REQUEST_EXPIRY]
+        )
+        self._inbound_messages = InboundQueue(
+            max_size=INBOUND_QUEUE_SIZE,
+            time_budget=INBOUND_BATCH_TIME_BUDGET,
+            max_batch=INBOUND_BATCH_SIZE,
+        )
+
+        if self.znp_config[conf.CONF_DUPLICATE_MESSAGE_WINDOW]:
+            self._duplicate_filter = DuplicateFilter(
+                window=self.znp_config[conf.CONF_DUPLICATE_MESSAGE_WINDOW]
+            )
+        else:
+            self._duplicate_filter = None
+        self._join_pipeline = JoinPipeline(
+            self._handle_joined_device, max_concurrent=MAX_CONCURRENT_JOINS
+        )
+
+        # Endpoints registered at runtime, registered again upon every startup
+        self._runtime_endpoints: typing.Dict[int, typing.Dict[str, typing.Any]] = {}
+
+        # Indices of our registered endpoints
+        self._endpoint_profiles: typing.Dict[int, int] = {}
+        self._cluster_endpoints: typing.Dict[typing.Tuple[int, int], int] = {}
+        self._profile_endpoints: typing.Dict[int, int] = {}
+
+        retry_config = self.znp_config[conf.CONF_RETRY_POLICY]
+        self._retry_policy = RetryPolicy(
+            max_retries=retry_config[conf.CONF_MAX_RETRIES],
+            retry_delay=retry_config[conf.CONF_RETRY_DELAY],
+            max_retry_delay=retry_config[conf.CONF_MAX_RETRY_DELAY],
+            jitter=retry_config[conf.CONF_RETRY_JITTER],
+            learn=retry_config[conf.CONF_LEARN_STRATEGIES],
+            strategies=retry_config[conf.CONF_RECOVERY_STRATEGIES],
+        )
 
     ##################################################################
     # Implementation of the core zigpy ControllerApplication methods #
@@ -145,9 +303,12 @@ class ControllerApplication(zigpy.application.ControllerApplication):
         return self._network_key_seq
 
     @classmethod
-    async def probe(cls, device_config: conf.ConfigType) -> bool:
+    async def _probe_port(
+        cls, device_config: conf.ConfigType
+    ) -> typing.Optional[ProbeResult]:
         """
-        Checks whether the device represented by `device_config` is a valid ZNP radio.
+        Connects to the device represented by `device_config` and returns what was
+        detected, or `None` if it is not a valid ZNP radio.
         Doesn't throw any errors.
         """
 
@@ -158,15 +319,69 @@ class ControllerApplication(zigpy.application.ControllerApplication):
             async with async_timeout.timeout(PROBE_TIMEOUT):
                 await znp.connect()
 
-            return True
+            return ProbeResult(
+                device_config=device_config,
+                capabilities=znp.capabilities,
+                version=znp.version,
+            )
         except Exception as e:
             LOGGER.debug(
                 "Failed to probe ZNP radio with config %s", device_config, exc_info=e
             )
-            return False
+            return None
         finally:
             znp.close()
 
+    @classmethod
+    async def probe(cls, device_config: conf.ConfigType) -> bool:
+        """
+        Checks whether the device represented by `device_config` is a valid ZNP radio.
+        Doesn't throw any errors.
+        """
+
+        return (await cls._probe_port(device_config)) is not None
+
+    @classmethod
+    async def probe_many(
+        cls,
+        device_configs: typing.Iterable[conf.ConfigType],
+        *,
+        first: bool = False,
+    ) -> typing.List[ProbeResult]:
+        """
+        Probes multiple devices concurrently and returns the valid ZNP radios, in the
+        order in which they were provided.
+
+        If `first` is set, returns as soon as a radio is found and cancels the
+        remaining probes. Doesn't throw any errors.
+        """
+
+        tasks = [asyncio.create_task(cls._probe_port(c)) for c in device_configs]
+
+        try:
+            if not first:
+                return [r for r in await asyncio.gather(*tasks) if r is not None]
+
+            pending = set(tasks)
+
+            while pending:
+                _, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+
+                # Probes that finish at the same time are ordered like their configs
+                for task in tasks:
+                    if task.done() and task.result() is not None:
+                        return [task.result()]
+
+            return []
+        finally:
+            for task in tasks:
+                task.cancel()
+
+            # Serial ports must be closed before they can be used again
+            await asyncio.gather(*tasks, return_exceptions=True)
+
     async def shutdown(self):
         """
         Gracefully shuts down the application and cleans up all resources.
@@ -182,6 +397,19 @@ class ControllerApplication(zigpy.application.ControllerApplication):
             f.cancel()
 
         self._route_discovery_futures.clear()
+        self._broadcast_budget.reset()
+        self._orphaned_confirms.clear()
+        self._sleepy_devices.clear()
+
+        # Messages that were already received are still delivered. Joins among them
+        # are dropped along with the rest, nothing can be sent to the devices anymore.
+        self._inbound_messages.flush()
+
+        for task in self._join_route_tasks:
+            task.cancel()
+
+        self._join_route_tasks.clear()
+        self._join_pipeline.clear()
 
         # This will close the UART, which will then close the transport
         if self._znp is not None:
@@ -205,8 +433,13 @@ class ControllerApplication(zigpy.application.ControllerApplication):
     async def _startup(self, auto_form=False, force_form=False):
         assert self._znp is None
 
+        profile = self._find_device_profile()
+
         znp = ZNP(self.config)
-        await znp.connect()
+        await znp.connect(
+            stats=self._connect_stats,
+            version=profile.version if profile is not None else None,
+        )
 
         # We only assign `self._znp` after it has successfully connected
         self._znp = znp
@@ -214,18 +447,30 @@ class ControllerApplication(zigpy.application.ControllerApplication):
 
         self._bind_callbacks()
 
-        # Next, read out the NVRAM item that Zigbee2MQTT writes when it has configured
-        # a device to make sure that our network settings will not be reset.
-        if self._znp.version == 1.2:
-            configured_nv_item = OsalNvIds.HAS_CONFIGURED_ZSTACK1
-        else:
-            configured_nv_item = OsalNvIds.HAS_CONFIGURED_ZSTACK3
+        # Cached information is only valid for the radio and firmware it came from
+        device_info = await self._znp.request(
+            c.Util.GetDeviceInfo.Req(), RspStatus=t.Status.SUCCESS
+        )
+        version_rsp = await self._znp.request(c.SYS.Version.Req())
+        build_id = version_rsp.CodeRevision
 
-        try:
-            configured_value = await self._znp.nvram.osal_read(configured_nv_item)
-            is_configured = configured_value == ZSTACK_CONFIGURE_SUCCESS
-        except KeyError:
-            is_configured = False
+        profile = await self._verify_device_profile(
+            profile, ieee=device_info.IEEE, build_id=build_id
+        )
+
+        # A radio that is unchanged since its last startup was already configured by us
+        fingerprint = None
+        nib_value = None
+
+        if not force_form:
+            fingerprint, nib_value = await self._verify_startup_fingerprint(
+                ieee=device_info.IEEE, build_id=build_id
+            )
+
+        if fingerprint is not None:
+            is_configured = True
+        else:
+            is_configured = await self._is_configured()
 
         if not is_configured or force_form:
             if not auto_form and not force_form:
@@ -241,7 +486,9 @@ class ControllerApplication(zigpy.application.ControllerApplication):
             await self._reset()
 
             LOGGER.info("ZNP is already configured, not forming a new network")
-            await self._write_stack_settings(reset_if_changed=True)
+
+            if fingerprint is None:
+                await self._write_stack_settings(reset_if_changed=True)
 
         # At this point the device state should the same, regardless of whether we just
         # formed a new network or are restoring one
@@ -298,27 +545,40 @@ class ControllerApplication(zigpy.application.ControllerApplication):
 
         # The CC2531 running Z-Stack Home 1.2 overrides the LED setting if it is changed
         # before the coordinator has started.
-        if self.znp_config[conf.CONF_LED_MODE] is not None:
-            await self._set_led_mode(led=0xFF, mode=self.znp_config[conf.CONF_LED_MODE])
+        led_control = profile.led_control if profile is not None else None
 
-        device_info = await self._znp.request(
-            c.Util.GetDeviceInfo.Req(), RspStatus=t.Status.SUCCESS
-        )
+        if self.znp_config[conf.CONF_LED_MODE] is not None:
+            led_control = await self._set_led_mode(
+                led=0xFF, mode=self.znp_config[conf.CONF_LED_MODE]
+            )
 
         self._ieee = device_info.IEEE
+
+        if fingerprint is not None:
+            node_descriptor, _ = c.zdo.NullableNodeDescriptor.deserialize(
+                fingerprint.node_descriptor
+            )
+        else:
+            node_descriptor_rsp = await self._znp.request_callback_rsp(
+                request=c.ZDO.NodeDescReq.Req(DstAddr=0x0000, NWKAddrOfInterest=0x0000),
+                RspStatus=t.Status.SUCCESS,
+                callback=c.ZDO.NodeDescRsp.Callback(
+                    Src=0x0000, NWK=0x0000, partial=True
+                ),
+            )
+            node_descriptor = node_descriptor_rsp.NodeDescriptor
+
         self._nwk = 0x0000
 
         # Add the coordinator as a zigpy device. We do this up here because
         # `self._register_endpoint()` adds endpoints to this device object.
         self.devices[self.ieee] = ZNPCoordinator(self, self.ieee, self.nwk)
+        self._endpoint_profiles.clear()
+        self._cluster_endpoints.clear()
+        self._profile_endpoints.clear()
 
         # Give our Zigpy device a valid node descriptor
-        node_descriptor_rsp = await self._znp.request_callback_rsp(
-            request=c.ZDO.NodeDescReq.Req(DstAddr=0x0000, NWKAddrOfInterest=0x0000),
-            RspStatus=t.Status.SUCCESS,
-            callback=c.ZDO.NodeDescRsp.Callback(Src=0x0000, NWK=0x0000, partial=True),
-        )
-        self.zigpy_device.node_desc = node_descriptor_rsp.NodeDescriptor
+        self.zigpy_device.node_desc = node_descriptor
 
         # Register our endpoints
         await self._register_endpoint(
@@ -338,7 +598,11 @@ class ControllerApplication(zigpy.application.ControllerApplication):
             device_id=zigpy.profiles.zll.DeviceType.CONTROLLER,
         )
 
-        await self._load_device_info()
+        for kwargs in self._runtime_endpoints.values():
+            await self._register_endpoint(**kwargs)
+
+        # The NIB read while verifying the fingerprint only differs in runtime state
+        nvram = await self._load_device_info(nib=nib_value)
 
         # Now that we know what device we are, set the max concurrent requests
         if self.znp_config[conf.CONF_MAX_CONCURRENT_REQUESTS] == "auto":
@@ -346,13 +610,54 @@ class ControllerApplication(zigpy.application.ControllerApplication):
         else:
             max_concurrent_requests = self.znp_config[conf.CONF_MAX_CONCURRENT_REQUESTS]
 
-        self._concurrent_requests_semaphore = asyncio.Semaphore(max_concurrent_requests)
+        self._route_cache.ttl = self._route_cache_ttl()
 
-        version_rsp = await self._znp.request(c.SYS.Version.Req())
+        # The limiter and its statistics survive reconnects to the same radio
+        if (
+            self._concurrency_limiter is None
+            or self._concurrency_limiter.max_limit != max_concurrent_requests
+        ):
+            self._concurrency_limiter = AdaptiveLimiter(
+                max_concurrent_requests,
+                adaptive=self.znp_config[conf.CONF_ADAPTIVE_CONCURRENCY],
+                max_per_destination=self.znp_config[
+                    conf.CONF_MAX_CONCURRENT_REQUESTS_PER_DEVICE
+                ],
+                max_per_parent=self.znp_config[
+                    conf.CONF_MAX_CONCURRENT_REQUESTS_PER_ROUTER
+                ],
+            )
+
+        self._save_device_profile(
+            DeviceProfile(
+                ieee=self.ieee,
+                build_id=build_id,
+                device_path=self._device_path,
+                capabilities=int(self._znp.capabilities),
+                version=self._znp.version,
+                nib_format=type(self._nib).__name__,
+                led_control=led_control,
+                assoc_remove=profile.assoc_remove if profile is not None else None,
+            )
+        )
+
+        if fingerprint is None:
+            self._save_startup_fingerprint(
+                StartupFingerprint(
+                    ieee=self.ieee,
+                    build_id=build_id,
+                    version=self._znp.version,
+                    nib_length=len(nvram.raw[self._legacy_key(OsalNvIds.NIB)]),
+                    nib_digest=nib_digest(self._nib),
+                    nwkkey_length=len(nvram.raw[self._legacy_key(OsalNvIds.NWKKEY)]),
+                    settings_digest=settings_digest(self._stack_settings()),
+                    node_descriptor=node_descriptor.serialize(),
+                )
+            )
 
         LOGGER.info("Network settings")
         LOGGER.info("  Z-Stack version: %s", self._znp.version)
-        LOGGER.info("  Z-Stack build id: %s", version_rsp.CodeRevision)
+        LOGGER.info("  Z-Stack build id: %s", build_id)
         LOGGER.info("  Max concurrent requests: %s", max_concurrent_requests)
         LOGGER.info("  Channel: %s", self.channel)
         LOGGER.info("  PAN ID: 0x%04x", self.pan_id)
@@ -398,7 +703,11 @@ class ControllerApplication(zigpy.application.ControllerApplication):
 
         await self._reset()
 
-        nib = parse_nib(await self._znp.nvram.osal_read(OsalNvIds.NIB))
+        nib = self._parse_legacy(
+            OsalNvIds.NIB,
+            await self._znp.nvram.osal_read(OsalNvIds.NIB),
+            version=self._znp.version,
+        )
         nib.nwkPanId = pan_id
 
         await self._znp.nvram.osal_write(OsalNvIds.NIB, nib)
@@ -539,7 +848,11 @@ class ControllerApplication(zigpy.application.ControllerApplication):
         # not appear to be any user-facing MT command to read this information.
         while True:
             try:
-                nib = parse_nib(await self._znp.nvram.osal_read(OsalNvIds.NIB))
+                nib = self._parse_legacy(
+                    OsalNvIds.NIB,
+                    await self._znp.nvram.osal_read(OsalNvIds.NIB),
+                    version=self._znp.version,
+                )
 
                 LOGGER.debug("Current NIB is %s", nib)
 
@@ -612,7 +925,8 @@ class ControllerApplication(zigpy.application.ControllerApplication):
         else:
             destination = t.AddrModeAddress(mode=t.AddrMode.NWK, address=device.nwk)
 
-        return await self._send_request(
+        send_request = functools.partial(
+            self._send_request,
             dst_addr=destination,
             dst_ep=dst_ep,
             src_ep=src_ep,
@@ -624,6 +938,31 @@ class ControllerApplication(zigpy.application.ControllerApplication):
             data=data,
         )
 
+        if not self._is_sleepy(device):
+            return await send_request()
+
+        # Requests to sleepy devices that are asleep are held back until they wake up
+        expiry = self._sleepy_devices.expiry
+        deadline = time.monotonic() + expiry
+
+        while True:
+            if self._sleepy_devices.is_asleep(device.nwk):
+                LOGGER.debug("Holding back request until %s wakes up", device)
+
+                try:
+                    await self._sleepy_devices.wait_until_awake(
+                        device.nwk, timeout=deadline - time.monotonic()
+                    )
+                except asyncio.TimeoutError:
+                    raise DeviceAsleepError(
+                        f"Device {device.ieee} did not wake up within {expiry}s"
+                    )
+
+            try:
+                return await send_request()
+            except DeviceAsleepError as e:
+                LOGGER.debug("Device %s is asleep: %s", device, e)
+
     async def broadcast(
         self,
         profile,
@@ -756,6 +1095,33 @@ class ControllerApplication(zigpy.application.ControllerApplication):
                 RspStatus=t.Status.SUCCESS,
             )
 
+    async def register_endpoint(
+        self,
+        endpoint: int,
+        profile_id: int = zigpy.profiles.zha.PROFILE_ID,
+        device_id: int = zigpy.profiles.zha.DeviceType.CONFIGURATION_TOOL,
+        input_clusters: typing.Sequence[int] = (),
+        output_clusters: typing.Sequence[int] = (),
+    ) -> None:
+        """
+        Registers an additional coordinator endpoint without restarting. The endpoint
+        is registered again whenever the radio is started.
+        """
+
+        if endpoint == ZDO_ENDPOINT or endpoint in self.zigpy_device.endpoints:
+            raise ValueError(f"Endpoint {endpoint} is already registered")
+
+        kwargs = dict(
+            endpoint=endpoint,
+            profile_id=profile_id,
+            device_id=device_id,
+            input_clusters=list(input_clusters),
+            output_clusters=list(output_clusters),
+        )
+
+        await self._register_endpoint(**kwargs)
+        self._runtime_endpoints[endpoint] = kwargs
+
     def connection_lost(self, exc):
         """
         Propagated up from UART through ZNP when the connection is lost.
@@ -785,19 +1151,33 @@ class ControllerApplication(zigpy.application.ControllerApplication):
             c.AF.IncomingMsg.Callback(partial=True), self.on_af_message
         )
 
-        # ZDO requests need to be handled explicitly, one by one
+        # ZDO requests need to be handled explicitly, one by one. Network membership
+        # changes are queued ahead of other received messages.
         self._znp.callback_for_response(
             c.ZDO.EndDeviceAnnceInd.Callback(partial=True),
-            self.on_zdo_device_announce,
+            functools.partial(
+                self._inbound_messages.put,
+                self.on_zdo_device_announce,
+                priority=Priority.HIGH,
+            ),
         )
 
         self._znp.callback_for_response(
             c.ZDO.TCDevInd.Callback.Callback(partial=True),
-            self.on_zdo_tc_device_join,
+            functools.partial(
+                self._inbound_messages.put,
+                self.on_zdo_tc_device_join,
+                priority=Priority.HIGH,
+            ),
         )
 
         self._znp.callback_for_response(
-            c.ZDO.LeaveInd.Callback(partial=True), self.on_zdo_device_leave
+            c.ZDO.LeaveInd.Callback(partial=True),
+            functools.partial(
+                self._inbound_messages.put,
+                self.on_zdo_device_leave,
+                priority=Priority.HIGH,
+            ),
         )
 
         self._znp.callback_for_response(
@@ -836,34 +1216,22 @@ class ControllerApplication(zigpy.application.ControllerApplication):
         # `relays` is a property with a setter that emits an event
         device.relays = msg.Relays
 
+        # The route record was just used to reach us, so there is a route back
+        self._route_cache.mark_fresh(msg.DstAddr)
+        self._source_routes.record_route(msg.DstAddr, msg.Relays)
+
     def on_zdo_device_announce(self, msg: c.ZDO.EndDeviceAnnceInd.Callback) -> None:
         """
         ZDO end device announcement callback
         """
 
         LOGGER.info("ZDO device announce: %s", msg)
+        self._sleepy_devices.wake_up(msg.NWK)
 
-        # Cancel an existing join timer so we don't double announce
-        if msg.IEEE in self._join_announce_tasks:
-            self._join_announce_tasks.pop(msg.IEEE).cancel()
-
-        # Sometimes devices change their NWK when announcing so re-join it.
-        self.handle_join(
-            nwk=msg.NWK,
-            ieee=msg.IEEE,
-            parent_nwk=None,
-        )
-
-        device = self.get_device(ieee=msg.IEEE)
-
-        # We turn this back into a ZDO message and let zigpy handle it
-        self._receive_zdo_message(
-            cluster=ZDOCmd.Device_annce,
-            tsn=0xFF,
-            sender=device,
-            NWKAddr=msg.NWK,
-            IEEEAddr=msg.IEEE,
-            Capability=msg.Capabilities,
+        # Sometimes devices change their NWK when announcing so re-join it. This also
+        # replaces a pending join indication so we don't double announce.
+        self._join_pipeline.announced(
+            nwk=msg.NWK, ieee=msg.IEEE, capabilities=msg.Capabilities
         )
 
     def on_zdo_tc_device_join(self, msg: c.ZDO.TCDevInd.Callback) -> None:
@@ -874,31 +1242,116 @@ class ControllerApplication(zigpy.application.ControllerApplication):
         LOGGER.info("TC device join: %s", msg)
 
         # Perform route discovery (just in case) when a device joins the network so that
-        # we can begin initialization as soon as possible.
-        asyncio.create_task(self._discover_route(msg.SrcNwk))
-
-        if msg.SrcIEEE in self._join_announce_tasks:
-            self._join_announce_tasks.pop(msg.SrcIEEE).cancel()
+        # we can begin initialization as soon as possible. Known devices rejoining with
+        # the same address already have one, which is most of a join storm.
+        if not self._is_rejoin(nwk=msg.SrcNwk, ieee=msg.SrcIEEE):
+            task = asyncio.create_task(self._discover_join_route(msg.SrcNwk))
+            self._join_route_tasks.add(task)
+            task.add_done_callback(self._join_route_tasks.discard)
 
         # Some devices really don't like zigpy beginning its initialization process
         # before the device has announced itself. Wait a second or two before calling
         # `handle_join`, just in case the device announces itself first.
-        self._join_announce_tasks[msg.SrcIEEE] = asyncio.get_running_loop().call_later(
-            DEVICE_JOIN_MAX_DELAY,
-            lambda: self.handle_join(
-                nwk=msg.SrcNwk,
-                ieee=msg.SrcIEEE,
-                parent_nwk=msg.ParentNwk,
-            ),
+        self._join_pipeline.joined(
+            nwk=msg.SrcNwk,
+            ieee=msg.SrcIEEE,
+            parent_nwk=msg.ParentNwk,
+            delay=DEVICE_JOIN_MAX_DELAY,
+        )
+
+    def _is_rejoin(self, *, nwk: t.NWK, ieee: t.EUI64) -> bool:
+        """
+        Checks if a joining device is known, initialized, and kept its address.
+        """
+
+        device = self.devices.get(ieee)
+
+        return (
+            device is not None
+            and device.nwk == nwk
+            and device.status == zigpy.device.Status.ENDPOINTS_INIT
+        )
+
+    async def _discover_join_route(self, nwk: t.NWK) -> None:
+        """
+        Discovers a route to a joining device. Route requests are broadcast, so they
+        share the broadcast budget and a burst of joins cannot flood the network.
+        """
+
+        try:
+            async with self._limit_broadcasts():
+                await self._discover_route(nwk)
+        except Exception:
+            LOGGER.debug("Route discovery to 0x%04X failed", nwk, exc_info=True)
+
+    async def _handle_joined_device(self, join: JoinRequest) -> None:
+        """
+        Lets zigpy know about a joined device. Runs in a join pipeline slot, which is
+        held until the device's interview is done.
+        """
+
+        # zigpy does not interview known devices that kept their address again, it only
+        # rescans their group membership
+        self.handle_join(
+            nwk=join.nwk,
+            ieee=join.ieee,
+            parent_nwk=join.parent_nwk,
         )
 
+        device = self.get_device(ieee=join.ieee)
+
+        if join.announced:
+            # We turn this back into a ZDO message and let zigpy handle it
+            self._receive_zdo_message(
+                cluster=ZDOCmd.Device_annce,
+                tsn=0xFF,
+                sender=device,
+                NWKAddr=join.nwk,
+                IEEEAddr=join.ieee,
+                Capability=join.capabilities,
+            )
+
+        # Interviews are started by zigpy, the slot is kept until they finish
+        with contextlib.suppress(asyncio.TimeoutError):
+            async with async_timeout.timeout(DEVICE_INTERVIEW_TIMEOUT):
+                while device.initializing:
+                    await asyncio.sleep(JOIN_INTERVIEW_POLL_INTERVAL)
+
     def on_zdo_device_leave(self, msg: c.ZDO.LeaveInd.Callback) -> None:
         LOGGER.info("ZDO device left: %s", msg)
+        self._route_cache.invalidate(msg.NWK)
+        self._source_routes.remove(msg.NWK)
+        self._retry_policy.forget(msg.IEEE)
+        self._sleepy_devices.forget(msg.NWK)
+        self._join_pipeline.forget(msg.IEEE)
+
         self.handle_leave(nwk=msg.NWK, ieee=msg.IEEE)
 
     def on_af_message(self, msg: c.AF.IncomingMsg.Callback) -> None:
         """
-        Handler for all non-ZDO messages.
+        Handler for all non-ZDO messages. Messages are queued and handled in batches,
+        security and alarm messages first.
+        """
+
+        self._sleepy_devices.wake_up(msg.SrcAddr)
+
+        # Routers and retrying senders sometimes deliver the same frame twice
+        if self._duplicate_filter is not None and self._duplicate_filter.is_duplicate(
+            (msg.SrcAddr, msg.SrcEndpoint, msg.ClusterId, msg.TSN, hash(msg.Data))
+        ):
+            LOGGER.debug("Dropping duplicate message: %s", msg)
+            return
+
+        if msg.ClusterId in HIGH_PRIORITY_CLUSTERS:
+            priority = Priority.HIGH
+        else:
+            priority = Priority.NORMAL
+
+        self._inbound_messages.put(self._handle_af_message, msg, priority=priority)
+
+    def _handle_af_message(self, msg: c.AF.IncomingMsg.Callback) -> None:
+        """
+        Passes a received message on to zigpy.
         """
 
         try:
@@ -912,9 +1365,9 @@ class ControllerApplication(zigpy.application.ControllerApplication):
         device.radio_details(lqi=msg.LQI, rssi=None)
 
         # XXX: Is it possible to receive messages on non-assigned endpoints?
-        if msg.DstEndpoint in self.zigpy_device.endpoints:
-            profile = self.zigpy_device.endpoints[msg.DstEndpoint].profile_id
-        else:
+        profile = self._endpoint_profiles.get(msg.DstEndpoint)
+
+        if profile is None:
             LOGGER.warning("Received a message on an unregistered endpoint: %s", msg)
             profile = zigpy.profiles.zha.PROFILE_ID
 
@@ -949,20 +1402,31 @@ class ControllerApplication(zigpy.application.ControllerApplication):
 
     async def _watchdog_loop(self):
         """
-        Watchdog loop to periodically test if Z-Stack is still running.
+        Watchdog loop to test if Z-Stack is still running. Every frame received from the
+        radio counts as a heartbeat, it is only pinged once it has been quiet for a bit.
         """
 
         LOGGER.debug("Starting watchdog loop")
 
-        while True:
-            await asyncio.sleep(WATCHDOG_PERIOD)
+        # The radio was just connected to, which also counts
+        last_heartbeat = time.monotonic()
 
+        while True:
             # No point in trying to test the port if it's already disconnected
             if self._znp is None:
                 break
 
+            if self._znp.last_frame_received is not None:
+                last_heartbeat = max(last_heartbeat, self._znp.last_frame_received)
+
+            idle_time = time.monotonic() - last_heartbeat
+
+            if idle_time < WATCHDOG_IDLE_INTERVAL:
+                await asyncio.sleep(WATCHDOG_IDLE_INTERVAL - idle_time)
+                continue
+
             try:
-                await self._znp.request(c.SYS.Ping.Req())
+                await self._znp.request(c.SYS.Ping.Req(), timeout=WATCHDOG_PING_TIMEOUT)
             except Exception as e:
                 LOGGER.error(
                     "Watchdog check failed",
@@ -974,13 +1438,25 @@ class ControllerApplication(zigpy.application.ControllerApplication):
 
                 return
 
-    async def _set_led_mode(self, *, led, mode) -> None:
+            last_heartbeat = time.monotonic()
+
+    async def _set_led_mode(self, *, led, mode) -> bool:
         """
         Attempts to set the provided LED's mode. A Z-Stack bug causes the underlying
         command to never receive a response if the board has no LEDs, requiring this
         wrapper function to prevent the command from taking many seconds to time out.
+
+        Returns whether or not this build of Z-Stack supports LED control.
         """
 
+        # Builds known to lack LED support are not probed again
+        if (
+            self._device_profile is not None
+            and self._device_profile.led_control is False
+        ):
+            LOGGER.debug("Skipping LED control, the device profile does not support it")
+            return False
+
         # XXX: If Z-Stack is not compiled with HAL_LED, it will just not respond at all
         try:
             async with async_timeout.timeout(0.3):
@@ -990,15 +1466,17 @@ class ControllerApplication(zigpy.application.ControllerApplication):
                 )
         except (asyncio.TimeoutError, CommandNotRecognized):
             LOGGER.info("This build of Z-Stack does not appear to support LED control")
+            return False
 
-    async def _write_stack_settings(self, *, reset_if_changed: bool) -> None:
+        return True
+
+    def _stack_settings(self) -> typing.Dict[OsalNvIds, typing.Any]:
         """
-        Writes network-independent Z-Stack settings to NVRAM.
-        If no settings actually change, no reset will be performed.
+        Network-independent Z-Stack settings that are written to NVRAM.
         """
 
         # It's better to be explicit than rely on the NVRAM defaults
-        settings = {
+        return {
             OsalNvIds.LOGICAL_TYPE: t.DeviceLogicalType.Coordinator,
             # Source routing
             OsalNvIds.CONCENTRATOR_ENABLE: t.Bool(True),
@@ -1012,9 +1490,15 @@ class ControllerApplication(zigpy.application.ControllerApplication):
             OsalNvIds.ZDO_DIRECT_CB: t.Bool(True),
         }
 
+    async def _write_stack_settings(self, *, reset_if_changed: bool) -> None:
+        """
+        Writes network-independent Z-Stack settings to NVRAM.
+        If no settings actually change, no reset will be performed.
+        """
+
         any_changed = False
 
-        for nvid, value in settings.items():
+        for nvid, value in self._stack_settings().items():
             try:
                 current_value = await self._znp.nvram.osal_read(nvid)
             except InvalidCommandResponse:
@@ -1029,41 +1513,109 @@ class ControllerApplication(zigpy.application.ControllerApplication):
             # Reset to make the above NVRAM writes take effect
             await self._reset()
 
+    def _route_cache_ttl(self) -> float:
+        """
+        Routes are cached for no longer than Z-Stack itself keeps them.
+        """
+
+        ttls = [ROUTE_CACHE_MAX_TTL]
+
+        # Both values are in seconds, a route expiry time of 0 and a source route
+        # expiry time of 255 disable expiry
+        if self._nib.RouteExpiryTime:
+            ttls.append(self._nib.RouteExpiryTime)
+
+        src_rtg_expiry_time = self._stack_settings()[OsalNvIds.SRC_RTG_EXPIRY_TIME]
+
+        if src_rtg_expiry_time != 255:
+            ttls.append(src_rtg_expiry_time)
+
+        return min(ttls)
+
     @contextlib.asynccontextmanager
-    async def _limit_concurrency(self):
+    async def _limit_broadcasts(self):
+        """
+        Async context manager that keeps broadcasts and group casts from overflowing
+        Z-Stack's broadcast transaction table. They do not use up the concurrency slots
+        of unicast requests, only entries in the table.
+        """
+
+        budget = self._broadcast_budget
+
+        if budget.locked():
+            LOGGER.debug(
+                "Max outstanding broadcasts (%s) reached, delaying broadcast",
+                budget.capacity,
+            )
+
+        generation = await budget.acquire()
+
+        try:
+            yield RequestSlot()
+        finally:
+            # The table entry is used until the broadcast has been delivered. Until
+            # the NIB is read, assume that our own setting is in effect.
+            delivery_time = self._nib.BroadcastDeliveryTime
+
+            if delivery_time is None:
+                delivery_time = self._stack_settings()[OsalNvIds.BCAST_DELIVERY_TIME]
+
+            budget.release_after(0.1 * delivery_time, generation)
+
+    @contextlib.asynccontextmanager
+    async def _limit_concurrency(
+        self,
+        device: typing.Optional[zigpy.device.Device] = None,
+    ):
         """
         Async context manager that prevents devices from being overwhelmed by requests.
-        Mainly a thin wrapper around `asyncio.Semaphore` that logs when it has to wait.
+        Mainly a thin wrapper around `AdaptiveLimiter` that logs when it has to wait.
+
+        Requests to a device are also limited per device and per the router that the
+        device was last heard through, with waiting requests scheduled fairly across
+        devices.
+
+        Yields a `RequestSlot` that is used to report the outcome of the request.
         """
 
+        limiter = self._concurrency_limiter
+
         # Allow sending some requests before the application has fully started
-        if self._concurrent_requests_semaphore is None:
-            yield
+        if limiter is None:
+            yield RequestSlot()
             return
 
+        if device is not None:
+            destination = device.ieee
+
+            # The first relay of a device's route is the router it is attached to
+            parent = device.relays[0] if device.relays else None
+        else:
+            destination = parent = None
+
         start_time = time.time()
-        was_locked = self._concurrent_requests_semaphore.locked()
+        was_locked = limiter.would_wait(destination, parent)
 
         if was_locked:
-            self._currently_waiting_requests += 1
             LOGGER.debug(
-                "Max concurrency reached, delaying requests (%s enqueued)",
-                self._currently_waiting_requests,
+                "Max concurrency (%s) reached, delaying requests (%s enqueued)",
+                limiter.limit,
+                limiter.waiting + 1,
             )
 
+        epoch = await limiter.acquire(destination, parent)
+
         try:
-            async with self._concurrent_requests_semaphore:
-                if was_locked:
-                    LOGGER.debug(
-                        "Previously delayed request is now running, "
-                        "delayed by %0.2f seconds",
-                        time.time() - start_time,
-                    )
+            if was_locked:
+                LOGGER.debug(
+                    "Previously delayed request is now running, "
+                    "delayed by %0.2f seconds",
+                    time.time() - start_time,
+                )
 
-                yield
+            yield RequestSlot(limiter, epoch)
         finally:
-            if was_locked:
-                self._currently_waiting_requests -= 1
+            limiter.release(destination, parent)
 
     def _receive_zdo_message(
         self,
@@ -1104,6 +1656,8 @@ class ControllerApplication(zigpy.application.ControllerApplication):
         connection to be essentially stateless.
         """
 
+        warm = self.znp_config[conf.CONF_WARM_RECONNECT] and self._ieee is not None
+
         for attempt in itertools.count(start=1):
             LOGGER.debug(
                 "Trying to reconnect to %s, attempt %d",
@@ -1112,6 +1666,14 @@ class ControllerApplication(zigpy.application.ControllerApplication):
             )
 
             try:
+                # Once the radio is reachable, a warm reconnect either works or the
+                # radio has changed and needs a full startup
+                if warm:
+                    if await self._warm_reconnect():
+                        return
+
+                    warm = False
+
                 await self._startup()
                 return
             except asyncio.CancelledError:
@@ -1129,6 +1691,123 @@ class ControllerApplication(zigpy.application.ControllerApplication):
                     ]
                 )
 
+    async def _warm_reconnect(self) -> bool:
+        """
+        Reconnects to a radio that is still running our network without restarting it.
+        Listeners are re-bound and endpoints the radio lost are re-registered.
+
+        Returns `False` if the radio has changed and a full startup is required.
+        """
+
+        profile = self._find_device_profile()
+
+        znp = ZNP(self.config)
+        await znp.connect(
+            stats=self._connect_stats,
+            version=profile.version if profile is not None else None,
+        )
+
+        try:
+            device_info = await znp.request(
+                c.Util.GetDeviceInfo.Req(), RspStatus=t.Status.SUCCESS
+            )
+
+            if self._startup_fingerprint is not None:
+                nib_length = self._startup_fingerprint.nib_length
+            else:
+                nib_length = None
+
+            nib = self._parse_legacy(
+                OsalNvIds.NIB,
+                await znp.nvram.osal_read(OsalNvIds.NIB, expected_length=nib_length),
+                version=znp.version,
+            )
+        except Exception:
+            znp.close()
+            raise
+
+        if device_info.IEEE != self.ieee:
+            reason = f"IEEE address is now {device_info.IEEE}"
+        elif profile is not None and profile.capabilities != znp.capabilities:
+            reason = "capabilities have changed"
+        elif device_info.DeviceState != t.DeviceState.StartedAsCoordinator:
+            reason = f"device state is {device_info.DeviceState!r}"
+        elif nib_digest(nib) != nib_digest(self._nib):
+            reason = "network has changed"
+        else:
+            reason = None
+
+        if reason is not None:
+            LOGGER.info("Cannot reconnect without restarting the radio: %s", reason)
+            znp.close()
+
+            return False
+
+        # The radio may have lost its endpoints even though it was not restarted. This
+        # is done before the new connection is installed, so a failure leaks nothing.
+        try:
+            active_eps_rsp = await znp.request_callback_rsp(
+                request=c.ZDO.ActiveEpReq.Req(DstAddr=0x0000, NWKAddrOfInterest=0x0000),
+                RspStatus=t.Status.SUCCESS,
+                callback=c.ZDO.ActiveEpRsp.Callback(
+                    Src=0x0000, NWK=0x0000, partial=True
+                ),
+            )
+
+            for endpoint_id, endpoint in self.zigpy_device.endpoints.items():
+                if endpoint_id == ZDO_ENDPOINT:
+                    continue
+
+                if endpoint_id in active_eps_rsp.ActiveEndpoints:
+                    continue
+
+                LOGGER.debug("Re-registering endpoint %s", endpoint_id)
+
+                await znp.request(
+                    c.AF.Register.Req(
+                        Endpoint=endpoint_id,
+                        ProfileId=endpoint.profile_id,
+                        DeviceId=endpoint.device_type,
+                        DeviceVersion=0b0000,
+                        LatencyReq=c.af.LatencyReq.NoLatencyReqs,
+                        InputClusters=list(endpoint.in_clusters),
+                        OutputClusters=list(endpoint.out_clusters),
+                    ),
+                    RspStatus=t.Status.SUCCESS,
+                )
+        except Exception:
+            znp.close()
+            raise
+
+        self._znp = znp
+        self._znp.set_application(self)
+        self._bind_callbacks()
+
+        LOGGER.info("Reconnected to the radio without restarting it")
+
+        self._watchdog_task = asyncio.create_task(self._watchdog_loop())
+
+        return True
+
+    async def _wait_for_reconnect(self) -> None:
+        """
+        Waits for an in-progress reconnect to finish.
+
+        Raises `ConnectionLostError` if the application is not reconnecting or if the
+        reconnect takes too long.
+        """
+
+        try:
+            async with async_timeout.timeout(WARM_RECONNECT_TIMEOUT):
+                while self._znp is None or not self._reconnect_task.done():
+                    if self._reconnect_task.done():
+                        raise ConnectionLostError("Radio is not reconnecting")
+
+                    # The task is replaced if the connection is lost again
+                    await asyncio.wait([self._reconnect_task])
+        except asyncio.TimeoutError:
+            raise ConnectionLostError("Timed out waiting for the radio to reconnect")
+
     async def _register_endpoint(
         self,
         endpoint,
@@ -1159,7 +1838,7 @@ class ControllerApplication(zigpy.application.ControllerApplication):
 
         zigpy_ep.status = zigpy.endpoint.Status.ZDO_INIT
 
-        return await self._znp.request(
+        rsp = await self._znp.request(
             c.AF.Register.Req(
                 Endpoint=endpoint,
                 ProfileId=profile_id,
@@ -1172,21 +1851,251 @@ class ControllerApplication(zigpy.application.ControllerApplication):
             RspStatus=t.Status.SUCCESS,
         )
 
-    async def _load_device_info(self):
+        # The first endpoint with a cluster is used to send requests for it, otherwise
+        # the last endpoint with the same profile
+        self._endpoint_profiles[endpoint] = profile_id
+        self._profile_endpoints[profile_id] = endpoint
+
+        for cluster in itertools.chain(input_clusters, output_clusters):
+            self._cluster_endpoints.setdefault((profile_id, cluster), endpoint)
+
+        return rsp
+
+    @staticmethod
+    def _legacy_key(nvid: OsalNvIds) -> NVRAMKey:
+        return NvSysIds.ZSTACK, ExNvIds.LEGACY, nvid
+
+    @classmethod
+    def _parse_legacy(
+        cls, nvid: OsalNvIds, value: bytes, *, version: typing.Optional[float]
+    ):
         """
-        Loads low-level network information from NVRAM.
+        Parses a legacy NVRAM item with the layouts registered in the NVRAM schema.
         """
 
-        # Parsing the NIB struct gives us access to low-level info, like the channel
-        self._nib = parse_nib(await self._znp.nvram.osal_read(OsalNvIds.NIB))
-        LOGGER.debug("Parsed NIB: %s", self._nib)
+        return parse_item(cls._legacy_key(nvid), value, version=version)
+
+    async def _is_configured(self) -> bool:
+        """
+        Reads out the NVRAM item that Zigbee2MQTT writes when it has configured a device
+        to make sure that our network settings will not be reset.
+        """
 
-        nwkkey = await self._znp.nvram.osal_read(OsalNvIds.NWKKEY)
+        if self._znp.version == 1.2:
+            configured_nv_item = OsalNvIds.HAS_CONFIGURED_ZSTACK1
+        else:
+            configured_nv_item = OsalNvIds.HAS_CONFIGURED_ZSTACK3
 
-        if self._znp.version < 3.30:
-            key_info, _ = t.NwkActiveKeyItemsCC2531.deserialize(nwkkey)
+        try:
+            configured_value = await self._znp.nvram.osal_read(configured_nv_item)
+        except KeyError:
+            return False
+
+        return configured_value == ZSTACK_CONFIGURE_SUCCESS
+
+    def _load_startup_fingerprints(self) -> typing.Dict[t.EUI64, StartupFingerprint]:
+        if not self.znp_config[conf.CONF_FAST_RESTART]:
+            return {}
+
+        path = self.znp_config[conf.CONF_STARTUP_CACHE_PATH]
+        fingerprints = load_fingerprints(path) if path is not None else {}
+
+        # The fingerprint from our own last startup is the most recent one
+        if self._startup_fingerprint is not None:
+            fingerprints[self._startup_fingerprint.ieee] = self._startup_fingerprint
+
+        return fingerprints
+
+    def _save_startup_fingerprint(self, fingerprint: StartupFingerprint) -> None:
+        if not self.znp_config[conf.CONF_FAST_RESTART]:
+            return
+
+        self._startup_fingerprint = fingerprint
+        path = self.znp_config[conf.CONF_STARTUP_CACHE_PATH]
+
+        if path is not None:
+            save_fingerprint(path, fingerprint)
+
+    @property
+    def _device_path(self) -> str:
+        return self.config[conf.CONF_DEVICE][conf.CONF_DEVICE_PATH]
+
+    def _find_device_profile(self) -> typing.Optional[DeviceProfile]:
+        """
+        Finds the profile of the radio that was last seen on our serial port, if there
+        is exactly one. It has to be verified once the radio can be identified.
+        """
+
+        if not self.znp_config[conf.CONF_FAST_RESTART]:
+            return None
+
+        if (
+            self._device_profile is not None
+            and self._device_profile.device_path == self._device_path
+        ):
+            return self._device_profile
+
+        path = self.znp_config[conf.CONF_STARTUP_CACHE_PATH]
+
+        if path is None:
+            return None
+
+        profiles = [
+            p
+            for p in load_profiles(path).values()
+            if p.device_path == self._device_path
+        ]
+
+        if len(profiles) != 1:
+            return None
+
+        return profiles[0]
+
+    async def _verify_device_profile(
+        self,
+        profile: typing.Optional[DeviceProfile],
+        *,
+        ieee: t.EUI64,
+        build_id: typing.Optional[int],
+    ) -> typing.Optional[DeviceProfile]:
+        """
+        Checks that the profile used to connect belongs to the connected radio. The
+        Z-Stack version is detected again if it does not.
+        """
+
+        if profile is None:
+            self._device_profile = None
+            return None
+
+        if profile.ieee != ieee:
+            reason = f"IEEE address is now {ieee}"
+        elif profile.build_id != build_id:
+            reason = "firmware has changed"
+        elif profile.capabilities != self._znp.capabilities:
+            reason = "capabilities have changed"
         else:
-            key_info, _ = t.NwkActiveKeyItems.deserialize(nwkkey)
+            reason = None
+
+        if reason is not None:
+            LOGGER.debug("Ignoring device profile, %s", reason)
+
+            self._device_profile = None
+            self._znp.version = await detect_zstack_version(self._znp)
+
+            return None
+
+        LOGGER.debug("Radio matches its device profile: %s", profile)
+        self._device_profile = profile
+
+        return profile
+
+    def _save_device_profile(self, profile: DeviceProfile) -> None:
+        self._device_profile = profile
+
+        if not self.znp_config[conf.CONF_FAST_RESTART]:
+            return
+
+        path = self.znp_config[conf.CONF_STARTUP_CACHE_PATH]
+
+        if path is not None:
+            save_profile(path, profile)
+
+    def _update_device_profile(self, **features: typing.Optional[bool]) -> None:
+        """
+        Records features discovered at runtime in the current device profile.
+        """
+
+        if self._device_profile is None:
+            return
+
+        profile = dataclasses.replace(self._device_profile, **features)
+
+        if profile != self._device_profile:
+            self._save_device_profile(profile)
+
+    async def _verify_startup_fingerprint(
+        self, *, ieee: t.EUI64, build_id: typing.Optional[int]
+    ) -> typing.Tuple[typing.Optional[StartupFingerprint], typing.Optional[bytes]]:
+        """
+        Checks whether the radio is unchanged since its last startup. Returns the
+        matching fingerprint and the current NIB, or `(None, None)`.
+        """
+
+        fingerprint = self._load_startup_fingerprints().get(ieee)
+
+        if fingerprint is None:
+            LOGGER.debug("No startup fingerprint for %s", ieee)
+            return None, None
+
+        if fingerprint.version != self._znp.version:
+            LOGGER.debug("Z-Stack version has changed, ignoring startup fingerprint")
+            return None, None
+
+        if fingerprint.settings_digest != settings_digest(self._stack_settings()):
+            LOGGER.debug("Stack settings have changed, ignoring startup fingerprint")
+            return None, None
+
+        if fingerprint.build_id != build_id:
+            LOGGER.debug("Firmware has changed, ignoring startup fingerprint")
+            return None, None
+
+        try:
+            nib_value = await self._znp.nvram.osal_read(
+                OsalNvIds.NIB, expected_length=fingerprint.nib_length
+            )
+            nib = self._parse_legacy(
+                OsalNvIds.NIB, nib_value, version=self._znp.version
+            )
+        except (KeyError, ValueError):
+            LOGGER.debug("NIB could not be read, ignoring startup fingerprint")
+            return None, None
+
+        if nib_digest(nib) != fingerprint.nib_digest:
+            LOGGER.debug("Network has changed, ignoring startup fingerprint")
+            return None, None
+
+        LOGGER.debug("Radio matches its startup fingerprint: %s", fingerprint)
+        self._startup_fingerprint = fingerprint
+
+        return fingerprint, nib_value
+
+    async def _load_device_info(self, *, nib: typing.Optional[bytes] = None):
+        """
+        Loads low-level network information from NVRAM. An already read NIB can be
+        provided to avoid reading it again.
+
+        Returns a view of the NVRAM items that were used.
+        """
+
+        # Lengths are known if we have started up before
+        if self._startup_fingerprint is not None:
+            nib_length = self._startup_fingerprint.nib_length
+            nwkkey_length = self._startup_fingerprint.nwkkey_length
+        else:
+            nib_length = nwkkey_length = None
+
+        if nib is None:
+            nib = await self._znp.nvram.osal_read(
+                OsalNvIds.NIB, expected_length=nib_length
+            )
+
+        nwkkey = await self._znp.nvram.osal_read(
+            OsalNvIds.NWKKEY, expected_length=nwkkey_length
+        )
+
+        nvram = NVRAMView(
+            {
+                self._legacy_key(OsalNvIds.NIB): nib,
+                self._legacy_key(OsalNvIds.NWKKEY): nwkkey,
+            },
+            version=self._znp.version,
+        )
+
+        # Parsing the NIB struct gives us access to low-level info, like the channel
+        self._nib = nvram.legacy(OsalNvIds.NIB)
+        LOGGER.debug("Parsed NIB: %s", self._nib)
+
+        key_info = nvram.legacy(OsalNvIds.NWKKEY)
 
         self._channel = self._nib.nwkLogicalChannel
         self._channels = self._nib.channelList
@@ -1198,6 +2107,8 @@ class ControllerApplication(zigpy.application.ControllerApplication):
 
         LOGGER.debug("Parsed key info: %s", key_info)
 
+        return nvram
+
     async def _reset(self) -> None:
         """
         Performs a soft reset within Z-Stack.
@@ -1209,6 +2120,10 @@ class ControllerApplication(zigpy.application.ControllerApplication):
             callback=c.SYS.ResetInd.Callback(partial=True),
         )
 
+        # Resetting clears the routing and broadcast transaction tables
+        self._route_cache.clear()
+        self._broadcast_budget.reset()
+
     def _find_endpoint(self, dst_ep: int, profile: int, cluster: int) -> int:
         """
         Zigpy defaults to sending messages with src_ep == dst_ep. This does not work
@@ -1218,26 +2133,13 @@ class ControllerApplication(zigpy.application.ControllerApplication):
         if dst_ep == ZDO_ENDPOINT:
             return ZDO_ENDPOINT
 
-        # Always fall back to endpoint 1
-        candidates = [1]
+        # An exact match
+        # TODO: pass in `is_server_cluster` or something similar
+        if (profile, cluster) in self._cluster_endpoints:
+            return self._cluster_endpoints[profile, cluster]
 
-        for ep_id, endpoint in self.zigpy_device.endpoints.items():
-            if ep_id == ZDO_ENDPOINT:
-                continue
-
-            if endpoint.profile_id != profile:
-                continue
-
-            # An exact match, no need to continue further
-            # TODO: pass in `is_server_cluster` or something similar
-            if cluster in endpoint.out_clusters or cluster in endpoint.in_clusters:
-                return endpoint.endpoint_id
-
-            # Otherwise, keep track of the candidate cluster
-            # if we don't find anything better
-            candidates.append(endpoint.endpoint_id)
-
-        return candidates[-1]
+        # Otherwise, any endpoint with the same profile. Always fall back to endpoint 1.
+        return self._profile_endpoints.get(profile, 1)
 
     async def _send_zdo_request(
         self, dst_addr, dst_ep, src_ep, cluster, sequence, options, radius, data
@@ -1372,36 +2274,47 @@ class ControllerApplication(zigpy.application.ControllerApplication):
             )
 
         if dst_addr.mode == t.AddrMode.Broadcast:
-            # Broadcasts will not receive a confirmation but they still take time
-            # and use up concurrency slots
+            # Broadcasts will not receive a confirmation. The time they take to be
+            # delivered is accounted for by `_limit_broadcasts`.
             response = await self._znp.request(
                 request=request, RspStatus=t.Status.SUCCESS
             )
-
-            await asyncio.sleep(0.1 * self._nib.BroadcastDeliveryTime)
         else:
-            async with async_timeout.timeout(DATA_CONFIRM_TIMEOUT):
-                # Shield from cancellation to prevent requests that time out
-                # in higher layers from missing expected responses
-                response = await asyncio.shield(
-                    self._znp.request_callback_rsp(
-                        request=request,
-                        RspStatus=t.Status.SUCCESS,
-                        callback=c.AF.DataConfirm.Callback(
-                            partial=True,
-                            TSN=sequence,
-                            # XXX: can this ever not match?
-                            # Endpoint=src_ep,
-                        ),
-                    )
+            # Confirmations are matched by TSN and endpoint, only one request can use
+            # the pair at a time
+            key = await self._in_flight_requests.reserve(sequence, src_ep)
+
+            # The pair stays reserved until the confirmation arrives or its orphaned
+            # wait is cancelled, even if we stop waiting for it
+            confirm = asyncio.ensure_future(
+                self._znp.request_callback_rsp(
+                    request=request,
+                    RspStatus=t.Status.SUCCESS,
+                    callback=c.AF.DataConfirm.Callback(
+                        partial=True,
+                        TSN=sequence,
+                        Endpoint=src_ep,
+                    ),
                 )
+            )
+            confirm.add_done_callback(lambda _: self._in_flight_requests.release(key))
 
-                # Both the callback and the response can have an error status
-                if response.Status != t.Status.SUCCESS:
-                    raise InvalidCommandResponse(
-                        f"Unsuccessful request status code: {response.Status!r}",
-                        response,
-                    )
+            try:
+                async with async_timeout.timeout(DATA_CONFIRM_TIMEOUT):
+                    # Shield from cancellation to prevent requests that time out
+                    # in higher layers from missing expected responses
+                    response = await asyncio.shield(confirm)
+            except (asyncio.TimeoutError, asyncio.CancelledError):
+                # Late confirmations are still caught, within limits
+                self._orphaned_confirms.adopt(confirm)
+                raise
+
+            # Both the callback and the response can have an error status
+            if response.Status != t.Status.SUCCESS:
+                raise InvalidCommandResponse(
+                    f"Unsuccessful request status code: {response.Status!r}",
+                    response,
+                )
 
         return response
 
@@ -1419,6 +2332,9 @@ class ControllerApplication(zigpy.application.ControllerApplication):
         if nwk in self._route_discovery_futures:
             return await self._route_discovery_futures[nwk]
 
+        # The outcome of route discovery is not reported, the next request will tell
+        self._route_cache.invalidate(nwk)
+
         future = asyncio.get_running_loop().create_future()
         self._route_discovery_futures[nwk] = future
 
@@ -1436,6 +2352,103 @@ class ControllerApplication(zigpy.application.ControllerApplication):
             future.set_result(True)
             del self._route_discovery_futures[nwk]
 
+    def _is_sleepy(self, device: typing.Optional[zigpy.device.Device]) -> bool:
+        """
+        Checks if requests to the device are parked while it is asleep.
+        """
+
+        return (
+            self._sleepy_devices.expiry is not None
+            and device is not None
+            and device.node_desc is not None
+            and device.node_desc.is_end_device
+            and not device.node_desc.is_receiver_on_when_idle
+        )
+
+    async def _recover_request(
+        self, device: zigpy.device.Device, status: t.Status, recovery: RecoveryState
+    ) -> None:
+        """
+        Applies the first untried recovery strategy for a request that failed with the
+        provided status.
+        """
+
+        # If we can't contact the device by forcing a specific route, there is no point
+        # in trying this more than once.
+        if (
+            RecoveryStrategy.LAST_GOOD_ROUTE in recovery.tried
+            and recovery.relays is not None
+        ):
+            recovery.relays = None
+
+        for strategy in self._retry_policy.recovery_strategies(status, device.ieee):
+            if strategy in recovery.tried:
+                continue
+
+            if strategy == RecoveryStrategy.ASSOC_REMOVE:
+                # `UTIL.AssocRemove` is only available in newer Z-Stack 3 builds
+                if self._znp.version < 3.30 or (
+                    self._device_profile is not None
+                    and self._device_profile.assoc_remove is False
+                ):
+                    continue
+
+                recovery.tried.add(strategy)
+
+                # XXX: do we use NWK or IEEE?
+                association = await self._znp.request(
+                    c.Util.AssocGetWithAddress.Req(
+                        IEEE=device.ieee,
+                        NWK=device.nwk,
+                    )
+                )
+
+                # The device is not our child, there is nothing to remove
+                if association.Device.nodeRelation == c.util.NodeRelation.NOTUSED:
+                    break
+
+                try:
+                    await self._znp.request(c.Util.AssocRemove.Req(IEEE=device.ieee))
+                except CommandNotRecognized:
+                    LOGGER.debug(
+                        "The UTIL.AssocRemove command is available only"
+                        " in Z-Stack 3 releases built after 20201017"
+                    )
+                    self._update_device_profile(assoc_remove=False)
+                    break
+
+                recovery.association = association
+                self._update_device_profile(assoc_remove=True)
+
+                # Route discovery must be performed right after
+                await self._discover_route(device.nwk)
+            elif strategy == RecoveryStrategy.ROUTE_DISCOVERY:
+                # While we can in theory poll and wait until the route is fixed, letting
+                # the retry mechanism deal with it simpler.
+                recovery.tried.add(strategy)
+                await self._discover_route(device.nwk)
+            elif strategy == RecoveryStrategy.DISABLE_ROUTE_DISCOVERY_SUPPRESSION:
+                # This appears to generate a bit more network traffic
+                recovery.tried.add(strategy)
+                recovery.options &= ~c.af.TransmitOptions.SUPPRESS_ROUTE_DISC_NETWORK
+            elif strategy == RecoveryStrategy.LAST_GOOD_ROUTE:
+                # `ZDO.SrcRtgInd` callbacks tell us the paths taken by messages from the
+                # device back to the coordinator. Sending packets backwards via the best
+                # of them may work.
+                recovery.tried.add(strategy)
+                best_route = self._source_routes.best_route(device.nwk)
+
+                if best_route is not None:
+                    recovery.relays = list(best_route.relays)
+                else:
+                    recovery.relays = (device.relays or [])[::-1]
+
+            LOGGER.debug("Trying to reach %s: %s", device, strategy)
+            self._retry_policy.record_attempt(device.ieee, strategy)
+            recovery.pending = strategy
+
+            break
+
     async def _send_request(
         self,
         dst_addr,
@@ -1463,19 +2476,43 @@ class ControllerApplication(zigpy.application.ControllerApplication):
 
         status = None
         response = None
-        association = None
-        force_relays = None
+        policy = self._retry_policy
+        recovery = RecoveryState(options=options)
+
+        # Devices whose default routing keeps failing are first sent requests through
+        # the best path they are known to be reachable by
+        if (
+            self.znp_config[conf.CONF_PROACTIVE_SOURCE_ROUTING]
+            and device is not None
+            and dst_ep != ZDO_ENDPOINT
+            and self._source_routes.default_failures(device.nwk)
+            >= SOURCE_ROUTE_FAILURE_THRESHOLD
+        ):
+            best_route = self._source_routes.best_route(device.nwk)
 
-        tried_assoc_remove = False
-        tried_route_discovery = False
-        tried_disable_route_discovery_suppression = False
-        tried_last_good_route = False
+            if best_route is not None:
+                LOGGER.debug("Proactively using source route %s", best_route)
+                recovery.relays = list(best_route.relays)
+                recovery.tried.add(RecoveryStrategy.LAST_GOOD_ROUTE)
 
         # Don't release the concurrency-limiting semaphore until we are done trying.
         # There is no point in allowing requests to take turns getting buffer errors.
+        # Idempotent requests survive a warm reconnect, they are simply sent again
+        requeue = self.znp_config[conf.CONF_WARM_RECONNECT] and is_idempotent_request(
+            dst_ep, cluster, data
+        )
+
+        if dst_addr.mode in (t.AddrMode.Broadcast, t.AddrMode.Group):
+            limit_concurrency = self._limit_broadcasts()
+        else:
+            limit_concurrency = self._limit_concurrency(device)
+
         try:
-            async with self._limit_concurrency():
-                for attempt in range(REQUEST_MAX_RETRIES):
+            async with limit_concurrency as slot:
+                for attempt in range(policy.max_retries):
+                    if requeue and self._znp is None:
+                        await self._wait_for_reconnect()
+
                     try:
                         # ZDO requests do not generate `AF.DataConfirm` messages
                         # indicating that a route is missing so we need to explicitly
@@ -1484,6 +2521,7 @@ class ControllerApplication(zigpy.application.ControllerApplication):
                             dst_ep == ZDO_ENDPOINT
                             and dst_addr.mode == t.AddrMode.NWK
                             and dst_addr.address != 0x0000
+                            and not self._route_cache.is_fresh(dst_addr.address)
                         ):
                             route_status = await self._znp.request(
                                 c.ZDO.ExtRouteChk.Req(
@@ -1496,7 +2534,9 @@ class ControllerApplication(zigpy.application.ControllerApplication):
                                 )
                             )
 
-                            if route_status.Status != c.zdo.RoutingStatus.SUCCESS:
+                            if route_status.Status == c.zdo.RoutingStatus.SUCCESS:
+                                self._route_cache.mark_fresh(dst_addr.address)
+                            else:
                                 await self._discover_route(dst_addr.address)
 
                         response = await self._send_request_raw(
@@ -1506,116 +2546,115 @@ class ControllerApplication(zigpy.application.ControllerApplication):
                             profile=profile,
                             cluster=cluster,
                             sequence=sequence,
-                            options=options,
+                            options=recovery.options,
                             radius=radius,
                             data=data,
-                            relays=force_relays,
+                            relays=recovery.relays,
                         )
+                        slot.record_success()
+
+                        if device is not None:
+                            # Only AF requests are confirmed to have been delivered
+                            if dst_ep != ZDO_ENDPOINT:
+                                self._route_cache.mark_fresh(device.nwk)
+
+                            self._source_routes.record_result(
+                                device.nwk,
+                                recovery.relays if dst_ep != ZDO_ENDPOINT else None,
+                                success=True,
+                            )
+
+                            if recovery.pending is not None:
+                                policy.record_result(
+                                    device.ieee, recovery.pending, success=True
+                                )
+
                         break
+                    except ConnectionLostError as e:
+                        if not requeue:
+                            raise
+
+                        LOGGER.debug(
+                            "Re-queueing request after a lost connection: %s", e
+                        )
+                        await self._wait_for_reconnect()
+                    except asyncio.TimeoutError:
+                        # The device never replied, its route may be gone
+                        if device is not None and dst_ep == ZDO_ENDPOINT:
+                            self._route_cache.invalidate(device.nwk)
+
+                        raise
                     except InvalidCommandResponse as e:
                         status = e.response.Status
 
                         if status not in REQUEST_RETRYABLE_ERRORS:
                             raise
 
-                        # We cannot do anything but retry if the error is transient or
-                        # we are not sending a unicast request. Retry at least once.
-                        if (
-                            status in REQUEST_TRANSIENT_ERRORS
-                            or attempt == 0
-                            or device is None
+                        # Sleepy end devices only receive requests when they poll
+                        # their parent, retrying just wastes airtime until then
+                        if status == t.Status.MAC_TRANSACTION_EXPIRED and (
+                            self._is_sleepy(device)
                         ):
-                            LOGGER.debug(
-                                "Request failed (%s), retry attempt %s of %s",
-                                e,
-                                attempt + 1,
-                                REQUEST_MAX_RETRIES,
+                            self._sleepy_devices.mark_asleep(device.nwk)
+                            raise DeviceAsleepError(str(e)) from e
+
+                        # The radio is running out of buffers, send fewer requests
+                        if status in REQUEST_TRANSIENT_ERRORS:
+                            slot.record_error()
+                        elif device is not None:
+                            self._route_cache.invalidate(device.nwk)
+                            self._source_routes.record_result(
+                                device.nwk,
+                                recovery.relays if dst_ep != ZDO_ENDPOINT else None,
+                                success=False,
                             )
-                            await asyncio.sleep(3 * REQUEST_ERROR_RETRY_DELAY)
-                            continue
-
-                        # If we can't contact the device by forcing a specific route,
-                        # there is not point in trying this more than once.
-                        if tried_last_good_route and force_relays is not None:
-                            force_relays = None
 
-                        # Child aging is disabled so if a child switches parents from
-                        # the coordinator to another router, we will not be able to
-                        # re-discover a route to it. We have to manually drop the child
-                        # to do this.
-                        if (
-                            status == t.Status.MAC_TRANSACTION_EXPIRED
-                            and association is None
-                            and not tried_assoc_remove
-                            and self._znp.version >= 3.30
-                        ):
-                            # XXX: do we use NWK or IEEE?
-                            association = await self._znp.request(
-                                c.Util.AssocGetWithAddress.Req(
-                                    IEEE=device.ieee,
-                                    NWK=device.nwk,
-                                )
+                        if device is not None and recovery.pending is not None:
+                            policy.record_result(
+                                device.ieee, recovery.pending, success=False
                             )
-
-                            if (
-                                association.Device.nodeRelation
-                                != c.util.NodeRelation.NOTUSED
-                            ):
-                                try:
-                                    await self._znp.request(
-                                        c.Util.AssocRemove.Req(IEEE=device.ieee)
-                                    )
-                                    tried_assoc_remove = True
-
-                                    # Route discovery must be performed right after
-                                    await self._discover_route(device.nwk)
-                                except CommandNotRecognized:
-                                    LOGGER.debug(
-                                        "The UTIL.AssocRemove command is available only"
-                                        " in Z-Stack 3 releases built after 20201017"
-                                    )
-                        elif not tried_route_discovery:
-                            # If that doesn't work, try re-discovering the route.
-                            # While we can in theory poll and wait until it is fixed,
-                            # letting the retry mechanism deal with it simpler.
-                            await self._discover_route(device.nwk)
-                            tried_route_discovery = True
-                        elif not tried_disable_route_discovery_suppression:
-                            # Disable route discovery suppression. This appears to
-                            # generate a bit more network traffic.
-                            options &= ~c.af.TransmitOptions.SUPPRESS_ROUTE_DISC_NETWORK
-                            tried_disable_route_discovery_suppression = True
-                        elif not tried_last_good_route and device is not None:
-                            # `ZDO.SrcRtgInd` callbacks tell us the last path taken by
-                            # messages from the device back to the coordinator. Sending
-                            # packets backwards via this same route may work.
-                            force_relays = (device.relays or [])[::-1]
-                            tried_last_good_route = True
+                            recovery.pending = None
 
                         LOGGER.debug(
                             "Request failed (%s), retry attempt %s of %s",
                             e,
                             attempt + 1,
-                            REQUEST_MAX_RETRIES,
+                            policy.max_retries,
                         )
 
-                        # We've tried everything already so at this point just wait
-                        await asyncio.sleep(REQUEST_ERROR_RETRY_DELAY)
+                        # There is nothing left to do after the last attempt
+                        if attempt == policy.max_retries - 1:
+                            continue
+
+                        # We cannot do anything but retry if the error is transient or
+                        # we are not sending a unicast request. Retry at least once.
+                        if not (
+                            status in REQUEST_TRANSIENT_ERRORS
+                            or attempt == 0
+                            or device is None
+                        ):
+                            await self._recover_request(device, status, recovery)
+
+                        await asyncio.sleep(
+                            policy.backoff(
+                                attempt, transient=status in REQUEST_TRANSIENT_ERRORS
+                            )
+                        )
                 else:
                     raise DeliveryError(
-                        f"Request failed after {REQUEST_MAX_RETRIES} attempts:"
+                        f"Request failed after {policy.max_retries} attempts:"
                         f" {status!r}"
                     )
         finally:
             # We *must* re-add the device association if we previously removed it but
             # the request still failed. Otherwise, it may be a direct child and we will
             # not be able to find it again.
-            if tried_assoc_remove and response is None:
+            if recovery.association is not None and response is None:
                 await self._znp.request(
                     c.Util.AssocAdd.Req(
                         NWK=device.nwk,
                         IEEE=device.ieee,
-                        NodeRelation=association.Device.nodeRelation,
+                        NodeRelation=recovery.association.Device.nodeRelation,
                     )
                 )
 
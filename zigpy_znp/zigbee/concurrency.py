@@ -0,0 +1,544 @@
+import typing
+import asyncio
+import logging
+import collections
+import dataclasses
+
+LOGGER = logging.getLogger(__name__)
+
+# Window multiplier applied upon a resource error
+DECREASE_FACTOR = 0.5
+
+# Smoothing factor of the exponentially weighted error rate
+ERROR_RATE_ALPHA = 0.1
+
+
+@dataclasses.dataclass
+class DestinationStats:
+    """
+    Queueing statistics of requests sent to a single destination.
+    """
+
+    requests: int = 0
+    delayed: int = 0
+    in_flight: int = 0
+    total_wait: float = 0.0
+    max_wait: float = 0.0
+
+    @property
+    def average_wait(self) -> typing.Optional[float]:
+        if not self.requests:
+            return None
+
+        return self.total_wait / self.requests
+
+    def record_wait(self, wait: float) -> None:
+        self.requests += 1
+        self.delayed += wait > 0
+        self.total_wait += wait
+        self.max_wait = max(self.max_wait, wait)
+
+
+@dataclasses.dataclass(frozen=True)
+class _Waiter:
+    destination: typing.Hashable
+    parent: typing.Hashable
+    future: asyncio.Future
+    start_time: float
+
+
+class AdaptiveLimiter:
+    """
+    Concurrency limiter with an additive-increase/multiplicative-decrease window.
+
+    The window is halved when a request fails because the radio ran out of resources
+    and grows by one slot after a full window of requests succeeds, never exceeding
+    `max_limit`. Only one decrease happens per window of requests: errors from requests
+    that were started before the last decrease are caused by the same congestion.
+
+    Requests can be tagged with a destination and the router it is reached through.
+    Each destination and each parent router can hold only a limited number of slots
+    and waiting requests are scheduled round-robin across destinations, so a single
+    slow device cannot starve the rest of the network.
+    """
+
+    def __init__(
+        self,
+        max_limit: int,
+        *,
+        min_limit: int = 1,
+        adaptive: bool = True,
+        max_per_destination: typing.Optional[int] = None,
+        max_per_parent: typing.Optional[int] = None,
+    ):
+        self.max_limit = max_limit
+        self.min_limit = min(min_limit, max_limit)
+        self.adaptive = adaptive
+        self.max_per_destination = max_per_destination
+        self.max_per_parent = max_per_parent
+
+        self.window = float(max_limit)
+        self.in_flight = 0
+
+        self.successes = 0
+        self.errors = 0
+        self.increases = 0
+        self.decreases = 0
+        self.error_rate = 0.0
+
+        self.destination_stats: typing.Dict[
+            typing.Hashable, DestinationStats
+        ] = collections.defaultdict(DestinationStats)
+
+        self._epoch = 0
+        self._window_successes = 0
+        self._parent_in_flight = collections.Counter()
+
+        # Waiters are queued per destination, destinations are served in turn
+        self._queues: typing.Dict[
+            typing.Hashable, typing.Deque[_Waiter]
+        ] = collections.OrderedDict()
+
+    @property
+    def limit(self) -> int:
+        return max(self.min_limit, int(self.window))
+
+    @property
+    def waiting(self) -> int:
+        return sum(len(queue) for queue in self._queues.values())
+
+    def locked(self) -> bool:
+        return self.in_flight >= self.limit
+
+    def _has_capacity(self, destination, parent) -> bool:
+        if self.locked():
+            return False
+
+        if (
+            destination is not None
+            and self.max_per_destination is not None
+            and self.destination_stats[destination].in_flight
+            >= self.max_per_destination
+        ):
+            return False
+
+        if (
+            parent is not None
+            and self.max_per_parent is not None
+            and self._parent_in_flight[parent] >= self.max_per_parent
+        ):
+            return False
+
+        return True
+
+    def would_wait(self, destination=None, parent=None) -> bool:
+        return destination in self._queues or not self._has_capacity(
+            destination, parent
+        )
+
+    def _take(self, destination, parent) -> None:
+        self.in_flight += 1
+        self.destination_stats[destination].in_flight += 1
+
+        if parent is not None:
+            self._parent_in_flight[parent] += 1
+
+    async def acquire(self, destination=None, parent=None) -> int:
+        """
+        Waits for a free slot for the provided destination, reached through `parent`.
+        Returns the current epoch, which has to be passed back when recording the
+        request's result.
+        """
+
+        loop = asyncio.get_running_loop()
+        start_time = loop.time()
+
+        if not self.would_wait(destination, parent):
+            self._take(destination, parent)
+            self.destination_stats[destination].record_wait(0)
+
+            return self._epoch
+
+        waiter = _Waiter(destination, parent, loop.create_future(), start_time)
+        self._queues.setdefault(destination, collections.deque()).append(waiter)
+
+        try:
+            await waiter.future
+        except asyncio.CancelledError:
+            # We may have been handed a slot right before being cancelled
+            if waiter.future.done() and not waiter.future.cancelled():
+                self.release(destination, parent)
+            else:
+                self._remove_waiter(waiter)
+
+            raise
+
+        self.destination_stats[destination].record_wait(loop.time() - start_time)
+
+        return self._epoch
+
+    def _remove_waiter(self, waiter: _Waiter) -> None:
+        queue = self._queues.get(waiter.destination)
+
+        if queue is None or waiter not in queue:
+            return
+
+        queue.remove(waiter)
+
+        if not queue:
+            del self._queues[waiter.destination]
+
+    def release(self, destination=None, parent=None) -> None:
+        self.in_flight -= 1
+        self.destination_stats[destination].in_flight -= 1
+        assert self.in_flight >= 0
+
+        if parent is not None:
+            self._parent_in_flight[parent] -= 1
+
+            if not self._parent_in_flight[parent]:
+                del self._parent_in_flight[parent]
+
+        self._wake_up()
+
+    def record_success(self) -> None:
+        self.successes += 1
+        self.error_rate *= 1 - ERROR_RATE_ALPHA
+
+        if not self.adaptive or self.window >= self.max_limit:
+            return
+
+        # One slot is added for every full window of successful requests
+        self._window_successes += 1
+
+        if self._window_successes < self.limit:
+            return
+
+        self._window_successes = 0
+        self.window = min(self.max_limit, self.window + 1)
+        self.increases += 1
+
+        LOGGER.debug("Increased concurrency limit to %s", self.limit)
+        self._wake_up()
+
+    def record_error(self, epoch: int) -> None:
+        self.errors += 1
+        self.error_rate = ERROR_RATE_ALPHA + (1 - ERROR_RATE_ALPHA) * self.error_rate
+
+        if not self.adaptive or epoch != self._epoch:
+            return
+
+        self._epoch += 1
+        self._window_successes = 0
+        self.decreases += 1
+        self.window = max(self.min_limit, self.window * DECREASE_FACTOR)
+
+        LOGGER.debug("Decreased concurrency limit to %s", self.limit)
+
+    def _wake_up(self) -> None:
+        # Slots are handed over directly so newly arriving requests cannot jump ahead.
+        # Each destination gets one slot per round, capped destinations are skipped.
+        while self._queues and not self.locked():
+            for destination, queue in self._queues.items():
+                waiter = queue[0]
+
+                if self._has_capacity(destination, waiter.parent):
+                    break
+            else:
+                return
+
+            queue.popleft()
+
+            if queue:
+                self._queues.move_to_end(destination)
+            else:
+                del self._queues[destination]
+
+            # The waiting request was cancelled but has not yet removed itself
+            if waiter.future.done():
+                continue
+
+            self._take(destination, waiter.parent)
+            waiter.future.set_result(None)
+
+    def __repr__(self) -> str:
+        return (
+            f"<{type(self).__name__}(limit={self.limit}, max_limit={self.max_limit}, "
+            f"in_flight={self.in_flight}, waiting={self.waiting}, "
+            f"destinations={len(self.destination_stats)}, "
+            f"successes={self.successes}, errors={self.errors}, "
+            f"error_rate={self.error_rate:0.2f})>"
+        )
+
+
+@dataclasses.dataclass(frozen=True)
+class RequestSlot:
+    """
+    Concurrency slot held by a single request, used to report the request's outcome.
+    Requests sent before the limiter exists hold a slot without a limiter.
+    """
+
+    limiter: typing.Optional[AdaptiveLimiter] = None
+    epoch: int = 0
+
+    def record_success(self) -> None:
+        if self.limiter is not None:
+            self.limiter.record_success()
+
+    def record_error(self) -> None:
+        if self.limiter is not None:
+            self.limiter.record_error(self.epoch)
+
+
+class BroadcastBudget:
+    """
+    Token bucket that keeps broadcasts from overflowing Z-Stack's broadcast transaction
+    table. Every broadcast takes a token that is only returned once the broadcast has
+    been delivered, after the network's broadcast delivery time.
+
+    Tokens belong to the generation they were taken in. Tokens of a generation that
+    ended with a reset are ignored when they are returned.
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.outstanding = 0
+
+        self.broadcasts = 0
+        self.delayed = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+        self._generation = 0
+        self._waiters: typing.Deque[asyncio.Future] = collections.deque()
+        self._timers: typing.Set[asyncio.TimerHandle] = set()
+
+    @property
+    def waiting(self) -> int:
+        return sum(not f.done() for f in self._waiters)
+
+    def locked(self) -> bool:
+        return self.outstanding >= self.capacity
+
+    async def acquire(self) -> int:
+        """
+        Takes a token and returns the generation it belongs to.
+        """
+
+        loop = asyncio.get_running_loop()
+        start_time = loop.time()
+
+        if self.locked() or self._waiters:
+            future = loop.create_future()
+            self._waiters.append(future)
+
+            try:
+                generation = await future
+            except asyncio.CancelledError:
+                # We may have been handed a token right before being cancelled
+                if future.done() and not future.cancelled():
+                    self._release(future.result())
+                elif future in self._waiters:
+                    self._waiters.remove(future)
+
+                raise
+
+            self.delayed += 1
+        else:
+            self.outstanding += 1
+            generation = self._generation
+
+        wait = loop.time() - start_time
+
+        self.broadcasts += 1
+        self.total_wait += wait
+        self.max_wait = max(self.max_wait, wait)
+
+        return generation
+
+    def release_after(self, delay: float, generation: int) -> None:
+        """
+        Returns a token once the broadcast that took it has been delivered.
+        """
+
+        def release():
+            self._timers.discard(handle)
+            self._release(generation)
+
+        handle = asyncio.get_running_loop().call_later(delay, release)
+        self._timers.add(handle)
+
+    def reset(self) -> None:
+        """
+        Returns all tokens. Resetting the radio clears its broadcast transaction table.
+        """
+
+        for handle in self._timers:
+            handle.cancel()
+
+        self._timers.clear()
+        self._generation += 1
+        self.outstanding = 0
+        self._wake_up()
+
+    def _release(self, generation: int) -> None:
+        # Broadcasts sent before a reset may still be returning their tokens
+        if generation != self._generation:
+            return
+
+        self.outstanding = max(0, self.outstanding - 1)
+        self._wake_up()
+
+    def _wake_up(self) -> None:
+        while self._waiters and not self.locked():
+            future = self._waiters.popleft()
+
+            if future.done():
+                continue
+
+            self.outstanding += 1
+            future.set_result(self._generation)
+
+    def __repr__(self) -> str:
+        return (
+            f"<{type(self).__name__}(capacity={self.capacity}, "
+            f"outstanding={self.outstanding}, waiting={self.waiting}, "
+            f"broadcasts={self.broadcasts}, delayed={self.delayed}, "
+            f"max_wait={self.max_wait:0.2f})>"
+        )
+
+
+class InFlightTable:
+    """
+    Tracks the `(TSN, endpoint)` pairs of requests that are waiting for an
+    `AF.DataConfirm`. Confirmations can only be told apart by these two values, so a
+    request that would reuse the pair of another in-flight request is deferred until
+    the other request's confirmation has arrived or timed out.
+    """
+
+    def __init__(self):
+        self.collisions = 0
+        self.total_deferral = 0.0
+        self.max_in_flight = 0
+
+        self._active: typing.Dict[typing.Tuple[int, int], asyncio.Future] = {}
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._active)
+
+    def __contains__(self, key: typing.Tuple[int, int]) -> bool:
+        return key in self._active
+
+    async def reserve(self, tsn: int, endpoint: int) -> typing.Tuple[int, int]:
+        """
+        Waits until no other request uses the provided TSN and endpoint and reserves
+        them. The reservation must be released with `release`.
+        """
+
+        key = (tsn, endpoint)
+
+        if key in self._active:
+            loop = asyncio.get_running_loop()
+            start_time = loop.time()
+            self.collisions += 1
+
+            LOGGER.debug("TSN %s of endpoint %s is in use, deferring request", *key)
+
+            # More than one request can be waiting for the same pair
+            while key in self._active:
+                await asyncio.shield(self._active[key])
+
+            self.total_deferral += loop.time() - start_time
+
+        self._active[key] = asyncio.get_running_loop().create_future()
+        self.max_in_flight = max(self.max_in_flight, len(self._active))
+
+        return key
+
+    def release(self, key: typing.Tuple[int, int]) -> None:
+        future = self._active.pop(key)
+        future.set_result(None)
+
+    def __repr__(self) -> str:
+        return (
+            f"<{type(self).__name__}(in_flight={self.in_flight}, "
+            f"max_in_flight={self.max_in_flight}, collisions={self.collisions}, "
+            f"total_deferral={self.total_deferral:0.2f})>"
+        )
+
+
+class OrphanRegistry:
+    """
+    Keeps track of confirmation waits that outlived the request that started them.
+    Their listeners are kept alive to catch late confirmations but are cancelled once
+    they get too old or too numerous, which frees their TSNs for reuse.
+    """
+
+    def __init__(self, *, max_orphans: int, max_age: float):
+        self.max_orphans = max_orphans
+        self.max_age = max_age
+
+        self.adopted = 0
+        self.late = 0
+        self.expired = 0
+        self.evicted = 0
+
+        self._orphans: typing.Dict[
+            asyncio.Future, asyncio.TimerHandle
+        ] = collections.OrderedDict()
+
+    @property
+    def live(self) -> int:
+        return len(self._orphans)
+
+    def adopt(self, future: asyncio.Future) -> None:
+        if future.done():
+            return
+
+        self.adopted += 1
+        handle = asyncio.get_running_loop().call_later(
+            self.max_age, self._expire, future
+        )
+        self._orphans[future] = handle
+        future.add_done_callback(self._forget)
+
+        # The oldest waits are the least likely to still receive a confirmation
+        while len(self._orphans) > self.max_orphans:
+            oldest, handle = self._orphans.popitem(last=False)
+            handle.cancel()
+            oldest.cancel()
+            self.evicted += 1
+
+        LOGGER.debug("Waiting for a late confirmation, %d orphaned waits", self.live)
+
+    def _expire(self, future: asyncio.Future) -> None:
+        del self._orphans[future]
+        future.cancel()
+        self.expired += 1
+
+    def _forget(self, future: asyncio.Future) -> None:
+        handle = self._orphans.pop(future, None)
+
+        # Expired and evicted waits have already been removed
+        if handle is None:
+            return
+
+        handle.cancel()
+
+        # Nobody else will retrieve the exception of an orphaned wait
+        if not future.cancelled() and future.exception() is None:
+            self.late += 1
+
+    def clear(self) -> None:
+        for future, handle in self._orphans.items():
+            handle.cancel()
+            future.cancel()
+
+        self._orphans.clear()
+
+    def __repr__(self) -> str:
+        return (
+            f"<{type(self).__name__}(live={self.live}, adopted={self.adopted}, "
+            f"late={self.late}, expired={self.expired}, evicted={self.evicted})>"
+        )
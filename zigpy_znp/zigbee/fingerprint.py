@@ -0,0 +1,236 @@
+import os
+import json
+import typing
+import hashlib
+import logging
+import dataclasses
+
+import zigpy_znp.types as t
+from zigpy_znp.znp.nib import NIB, CC2531NIB
+
+LOGGER = logging.getLogger(__name__)
+
+# NIB fields that describe the network itself. Counters and runtime state change during
+# normal operation, comparing them would make every fingerprint stale.
+NIB_NETWORK_FIELDS = (
+    "nwkDevAddress",
+    "nwkLogicalChannel",
+    "channelList",
+    "nwkPanId",
+    "extendedPANID",
+    "nwkUpdateId",
+    "SecurityLevel",
+    "BroadcastDeliveryTime",
+    "RouteDiscoveryTime",
+)
+
+
+def nib_digest(nib: typing.Union[NIB, CC2531NIB]) -> str:
+    """
+    Hashes the network-specific fields of a NIB.
+    """
+
+    data = b"".join(getattr(nib, name).serialize() for name in NIB_NETWORK_FIELDS)
+
+    return hashlib.sha256(type(nib).__name__.encode() + data).hexdigest()
+
+
+def settings_digest(settings: typing.Mapping[int, typing.Any]) -> str:
+    """
+    Hashes the Z-Stack settings written to NVRAM upon startup.
+    """
+
+    data = b"".join(
+        t.uint16_t(nvid).serialize() + value.serialize()
+        for nvid, value in sorted(settings.items())
+    )
+
+    return hashlib.sha256(data).hexdigest()
+
+
+@dataclasses.dataclass(frozen=True)
+class StartupFingerprint:
+    """
+    State of a radio after a successful startup. A radio that still matches its
+    fingerprint does not need its configuration to be re-read or re-written.
+    """
+
+    ieee: t.EUI64
+    build_id: typing.Optional[int]
+    version: float
+    nib_length: int
+    nib_digest: str
+    nwkkey_length: int
+    settings_digest: str
+    node_descriptor: bytes
+
+    def to_json(self) -> typing.Dict[str, typing.Any]:
+        return {
+            "ieee": str(self.ieee),
+            "build_id": self.build_id,
+            "version": self.version,
+            "nib_length": self.nib_length,
+            "nib_digest": self.nib_digest,
+            "nwkkey_length": self.nwkkey_length,
+            "settings_digest": self.settings_digest,
+            "node_descriptor": self.node_descriptor.hex(),
+        }
+
+    @classmethod
+    def from_json(cls, obj: typing.Dict[str, typing.Any]) -> "StartupFingerprint":
+        return cls(
+            ieee=t.EUI64.convert(obj["ieee"]),
+            build_id=obj["build_id"],
+            version=obj["version"],
+            nib_length=obj["nib_length"],
+            nib_digest=obj["nib_digest"],
+            nwkkey_length=obj["nwkkey_length"],
+            settings_digest=obj["settings_digest"],
+            node_descriptor=bytes.fromhex(obj["node_descriptor"]),
+        )
+
+
+@dataclasses.dataclass(frozen=True)
+class DeviceProfile:
+    """
+    Properties of a radio and its firmware that are expensive to detect. A profile is
+    only valid for the radio and firmware build it was created for.
+    """
+
+    ieee: t.EUI64
+    build_id: typing.Optional[int]
+    device_path: str
+    capabilities: int
+    version: float
+    nib_format: str
+
+    # Features discovered at runtime, `None` if unknown
+    led_control: typing.Optional[bool] = None
+    assoc_remove: typing.Optional[bool] = None
+
+    def to_json(self) -> typing.Dict[str, typing.Any]:
+        return {
+            "ieee": str(self.ieee),
+            "build_id": self.build_id,
+            "device_path": self.device_path,
+            "capabilities": self.capabilities,
+            "version": self.version,
+            "nib_format": self.nib_format,
+            "led_control": self.led_control,
+            "assoc_remove": self.assoc_remove,
+        }
+
+    @classmethod
+    def from_json(cls, obj: typing.Dict[str, typing.Any]) -> "DeviceProfile":
+        if obj["nib_format"] not in (NIB.__name__, CC2531NIB.__name__):
+            raise ValueError(f"Unknown NIB format: {obj['nib_format']!r}")
+
+        return cls(
+            ieee=t.EUI64.convert(obj["ieee"]),
+            build_id=obj["build_id"],
+            device_path=obj["device_path"],
+            capabilities=obj["capabilities"],
+            version=obj["version"],
+            nib_format=obj["nib_format"],
+            led_control=obj["led_control"],
+            assoc_remove=obj["assoc_remove"],
+        )
+
+
+# Every radio has a single cache entry with one section per kind of cached object:
+#
+#   {"00:12:4b:...": {"fingerprint": {...}, "profile": {...}}}
+CACHE_SECTIONS = {
+    "fingerprint": StartupFingerprint,
+    "profile": DeviceProfile,
+}
+
+
+def _load_cache(path: str) -> typing.Dict[str, typing.Dict[str, typing.Any]]:
+    try:
+        with open(path, "r") as f:
+            obj = json.load(f)
+
+        if not isinstance(obj, dict) or not all(
+            isinstance(entry, dict) for entry in obj.values()
+        ):
+            raise ValueError("Cache entries must be objects")
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as e:
+        LOGGER.warning("Ignoring invalid startup cache %s: %s", path, e)
+        return {}
+
+    return obj
+
+
+def _load_section(path: str, section: str) -> typing.Dict[t.EUI64, typing.Any]:
+    cls = CACHE_SECTIONS[section]
+    objects = {}
+
+    for entry in _load_cache(path).values():
+        if section not in entry:
+            continue
+
+        try:
+            obj = cls.from_json(entry[section])
+        except (ValueError, KeyError, TypeError, AttributeError) as e:
+            LOGGER.warning(
+                "Ignoring invalid %s in startup cache %s: %s", section, path, e
+            )
+            continue
+
+        objects[obj.ieee] = obj
+
+    return objects
+
+
+def _save_section(path: str, section: str, obj: typing.Any) -> None:
+    cache = _load_cache(path)
+    cache.setdefault(str(obj.ieee), {})[section] = obj.to_json()
+
+    # Write to a temporary file first so a crash never leaves a truncated cache behind
+    tmp_path = f"{path}.tmp"
+
+    try:
+        with open(tmp_path, "w") as f:
+            json.dump(cache, f, indent=4)
+
+        os.replace(tmp_path, path)
+    except OSError as e:
+        LOGGER.warning("Failed to write startup cache %s: %s", path, e)
+
+
+def load_fingerprints(path: str) -> typing.Dict[t.EUI64, StartupFingerprint]:
+    """
+    Loads all fingerprints from a cache file. A missing or corrupt file is treated as
+    an empty cache.
+    """
+
+    return _load_section(path, "fingerprint")
+
+
+def save_fingerprint(path: str, fingerprint: StartupFingerprint) -> None:
+    """
+    Adds a fingerprint to a cache file, replacing any previous one for the same radio.
+    """
+
+    _save_section(path, "fingerprint", fingerprint)
+
+
+def load_profiles(path: str) -> typing.Dict[t.EUI64, DeviceProfile]:
+    """
+    Loads all device profiles from a cache file. A missing or corrupt file is treated
+    as an empty cache.
+    """
+
+    return _load_section(path, "profile")
+
+
+def save_profile(path: str, profile: DeviceProfile) -> None:
+    """
+    Adds a device profile to a cache file, replacing any previous one for the same
+    radio.
+    """
+
+    _save_section(path, "profile", profile)
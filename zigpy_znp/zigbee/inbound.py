@@ -0,0 +1,213 @@
+import enum
+import time
+import typing
+import asyncio
+import logging
+import collections
+import dataclasses
+
+LOGGER = logging.getLogger(__name__)
+
+
+class Priority(enum.IntEnum):
+    """
+    Inbound lanes, lower values are dispatched first.
+    """
+
+    HIGH = 0
+    NORMAL = 1
+
+
+@dataclasses.dataclass
+class LaneStats:
+    """
+    Time-to-dispatch statistics of a single lane.
+    """
+
+    dispatched: int = 0
+    total_delay: float = 0.0
+    max_delay: float = 0.0
+
+    @property
+    def average_delay(self) -> typing.Optional[float]:
+        if not self.dispatched:
+            return None
+
+        return self.total_delay / self.dispatched
+
+    def record_delay(self, delay: float) -> None:
+        self.dispatched += 1
+        self.total_delay += delay
+        self.max_delay = max(self.max_delay, delay)
+
+
+@dataclasses.dataclass(frozen=True)
+class _InboundItem:
+    handler: typing.Callable[[typing.Any], None]
+    message: typing.Any
+    received_time: float
+
+
+class InboundQueue:
+    """
+    Bounded queue of received messages that are dispatched by a separate task, so that
+    a burst of messages does not delay parsing and handling of the radio's responses.
+
+    Messages are queued in priority lanes, higher priority lanes are always emptied
+    first. Within a lane, messages are dispatched in the order they were received.
+
+    Messages are dispatched in batches. A batch ends once it has taken `time_budget`
+    seconds or contains `max_batch` messages, after which other tasks can run. When the
+    queue is full, the next message is dispatched immediately to make room.
+    """
+
+    def __init__(self, *, max_size: int, time_budget: float, max_batch: int):
+        self.max_size = max_size
+        self.time_budget = time_budget
+        self.max_batch = max_batch
+
+        self.received = 0
+        self.overflows = 0
+        self.batches = 0
+        self.max_depth = 0
+
+        self.lane_stats = {priority: LaneStats() for priority in Priority}
+
+        self._lanes: typing.Dict[Priority, typing.Deque[_InboundItem]] = {
+            priority: collections.deque() for priority in sorted(Priority)
+        }
+        self._task: typing.Optional[asyncio.Task] = None
+
+    @property
+    def depth(self) -> int:
+        return sum(len(lane) for lane in self._lanes.values())
+
+    @property
+    def dispatched(self) -> int:
+        return sum(stats.dispatched for stats in self.lane_stats.values())
+
+    def put(
+        self,
+        handler: typing.Callable[[typing.Any], None],
+        message: typing.Any,
+        *,
+        priority: Priority = Priority.NORMAL,
+    ) -> None:
+        self.received += 1
+
+        if self.depth >= self.max_size:
+            self.overflows += 1
+            self._dispatch_next()
+
+        self._lanes[priority].append(_InboundItem(handler, message, time.monotonic()))
+        self.max_depth = max(self.max_depth, self.depth)
+
+        # The consumer task only runs while there are messages
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._consume())
+
+    def flush(self) -> None:
+        """
+        Stops the consumer task and dispatches all queued messages.
+        """
+
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+        while self._dispatch_next():
+            pass
+
+    def _dispatch_next(self) -> bool:
+        for priority, lane in self._lanes.items():
+            if lane:
+                break
+        else:
+            return False
+
+        item = lane.popleft()
+        self.lane_stats[priority].record_delay(time.monotonic() - item.received_time)
+
+        try:
+            item.handler(item.message)
+        except Exception:
+            LOGGER.error("Failed to handle message %s", item.message, exc_info=True)
+
+        return True
+
+    async def _consume(self) -> None:
+        loop = asyncio.get_running_loop()
+
+        while self.depth:
+            start_time = loop.time()
+            count = 0
+
+            while (
+                count < self.max_batch
+                and loop.time() - start_time < self.time_budget
+                and self._dispatch_next()
+            ):
+                count += 1
+
+            self.batches += 1
+
+            # Let the radio's responses through before the next batch
+            await asyncio.sleep(0)
+
+    def __repr__(self) -> str:
+        return (
+            f"<{type(self).__name__}(depth={self.depth}, max_depth={self.max_depth}, "
+            f"received={self.received}, dispatched={self.dispatched}, "
+            f"batches={self.batches}, overflows={self.overflows})>"
+        )
+
+
+class DuplicateFilter:
+    """
+    Remembers recently seen messages for `window` seconds to detect duplicates. Only
+    hashes of the messages are stored.
+    """
+
+    def __init__(self, window: float):
+        self.window = window
+
+        self.checked = 0
+        self.duplicates = 0
+
+        # Insertion order is also expiration order
+        self._seen: typing.Dict[int, float] = collections.OrderedDict()
+
+    def is_duplicate(self, key: typing.Hashable) -> bool:
+        """
+        Checks if a message was seen within the window and remembers it.
+        """
+
+        now = time.monotonic()
+        self.checked += 1
+
+        while self._seen:
+            oldest, expiry = next(iter(self._seen.items()))
+
+            if expiry > now:
+                break
+
+            del self._seen[oldest]
+
+        key_hash = hash(key)
+
+        if key_hash in self._seen:
+            self.duplicates += 1
+            return True
+
+        self._seen[key_hash] = now + self.window
+
+        return False
+
+    def __len__(self) -> int:
+        return len(self._seen)
+
+    def __repr__(self) -> str:
+        return (
+            f"<{type(self).__name__}(window={self.window}, size={len(self)}, "
+            f"checked={self.checked}, duplicates={self.duplicates})>"
+        )
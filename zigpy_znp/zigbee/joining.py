@@ -0,0 +1,184 @@
+import typing
+import asyncio
+import logging
+import collections
+import dataclasses
+
+import zigpy_znp.types as t
+import zigpy_znp.commands as c
+
+LOGGER = logging.getLogger(__name__)
+
+
+@dataclasses.dataclass
+class JoinRequest:
+    """
+    A device that joined or announced itself and still has to be handled.
+    """
+
+    nwk: t.NWK
+    ieee: t.EUI64
+    parent_nwk: typing.Optional[t.NWK]
+
+    # Only announcements carry the device's capabilities
+    capabilities: typing.Optional[c.zdo.MACCapabilities] = None
+
+    @property
+    def announced(self) -> bool:
+        return self.capabilities is not None
+
+
+class JoinPipeline:
+    """
+    Handles joining devices with bounded concurrency, so a network full of devices
+    rejoining at once does not saturate the radio.
+
+    Join indications are held back for a little while to give the device a chance to
+    announce itself. All join indications and announcements of a device received until
+    it is handled are coalesced into one request. A device is never handled twice at
+    the same time, new requests wait until the current one is done.
+    """
+
+    def __init__(
+        self,
+        handler: typing.Callable[[JoinRequest], typing.Awaitable[None]],
+        *,
+        max_concurrent: int,
+    ):
+        self.max_concurrent = max_concurrent
+
+        self.joins = 0
+        self.announcements = 0
+        self.coalesced = 0
+        self.handled = 0
+        self.max_active = 0
+
+        self._handler = handler
+        self._pending: typing.Dict[t.EUI64, JoinRequest] = {}
+        self._timers: typing.Dict[t.EUI64, asyncio.TimerHandle] = {}
+        self._ready: typing.Dict[t.EUI64, None] = collections.OrderedDict()
+        self._active: typing.Dict[t.EUI64, asyncio.Task] = {}
+
+    @property
+    def active(self) -> int:
+        return len(self._active)
+
+    @property
+    def waiting(self) -> int:
+        return len(self._pending)
+
+    def joined(
+        self,
+        nwk: t.NWK,
+        ieee: t.EUI64,
+        parent_nwk: typing.Optional[t.NWK],
+        *,
+        delay: float,
+    ) -> None:
+        """
+        Handles a join indication after `delay` seconds, unless the device announces
+        itself first.
+        """
+
+        self.joins += 1
+
+        if ieee in self._pending:
+            self.coalesced += 1
+
+            # An announcement already carries everything we need
+            if not self._pending[ieee].announced:
+                self._pending[ieee] = JoinRequest(nwk, ieee, parent_nwk)
+
+            return
+
+        self._pending[ieee] = JoinRequest(nwk, ieee, parent_nwk)
+        self._timers[ieee] = asyncio.get_running_loop().call_later(
+            delay, self._mark_ready, ieee
+        )
+
+    def announced(
+        self, nwk: t.NWK, ieee: t.EUI64, capabilities: c.zdo.MACCapabilities
+    ) -> None:
+        """
+        Handles a device announcement as soon as possible.
+        """
+
+        self.announcements += 1
+
+        if ieee in self._pending:
+            self.coalesced += 1
+
+        self._pending[ieee] = JoinRequest(
+            nwk, ieee, parent_nwk=None, capabilities=capabilities
+        )
+        self._mark_ready(ieee)
+
+    def forget(self, ieee: t.EUI64) -> None:
+        """
+        Drops a request that has not been handled yet.
+        """
+
+        self._pending.pop(ieee, None)
+        self._ready.pop(ieee, None)
+
+        if ieee in self._timers:
+            self._timers.pop(ieee).cancel()
+
+    def clear(self) -> None:
+        for timer in self._timers.values():
+            timer.cancel()
+
+        for task in self._active.values():
+            task.cancel()
+
+        self._timers.clear()
+        self._pending.clear()
+        self._ready.clear()
+        self._active.clear()
+
+    def _mark_ready(self, ieee: t.EUI64) -> None:
+        if ieee in self._timers:
+            self._timers.pop(ieee).cancel()
+
+        self._ready[ieee] = None
+        self._start_ready()
+
+    def _start_ready(self) -> None:
+        for ieee in list(self._ready):
+            if len(self._active) >= self.max_concurrent:
+                break
+
+            # Wait for the device's current request to finish
+            if ieee in self._active:
+                continue
+
+            del self._ready[ieee]
+            request = self._pending.pop(ieee)
+
+            task = asyncio.create_task(self._handler(request))
+            task.add_done_callback(lambda task, ieee=ieee: self._done(ieee, task))
+            self._active[ieee] = task
+
+        self.max_active = max(self.max_active, len(self._active))
+
+    def _done(self, ieee: t.EUI64, task: asyncio.Task) -> None:
+        if self._active.get(ieee) is not task:
+            return
+
+        del self._active[ieee]
+        self.handled += 1
+
+        if not task.cancelled() and task.exception() is not None:
+            LOGGER.error(
+                "Failed to handle joined device %s", ieee, exc_info=task.exception()
+            )
+
+        self._start_ready()
+
+    def __repr__(self) -> str:
+        return (
+            f"<{type(self).__name__}(max_concurrent={self.max_concurrent}, "
+            f"active={self.active}, waiting={self.waiting}, joins={self.joins}, "
+            f"announcements={self.announcements}, coalesced={self.coalesced}, "
+            f"handled={self.handled})>"
+        )
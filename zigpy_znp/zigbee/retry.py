@@ -0,0 +1,193 @@
+import enum
+import random
+import typing
+import logging
+import collections
+import dataclasses
+
+import zigpy_znp.types as t
+import zigpy_znp.commands as c
+
+LOGGER = logging.getLogger(__name__)
+
+DEFAULT_MAX_RETRIES = 5
+DEFAULT_RETRY_DELAY = 0.5  # seconds
+DEFAULT_MAX_RETRY_DELAY = 5  # seconds
+DEFAULT_RETRY_JITTER = 0.25
+
+# Errors that go away on their own are retried after a longer delay
+TRANSIENT_DELAY_FACTOR = 3
+
+# A strategy has to be tried this many times on a device before it is trusted
+LEARNING_MIN_ATTEMPTS = 2
+LEARNING_SUCCESS_THRESHOLD = 0.5
+
+
+class RecoveryStrategy(enum.Enum):
+    """
+    Ways of reaching a device after a request to it failed.
+    """
+
+    # Drop the device from the coordinator's child table and re-discover its route
+    ASSOC_REMOVE = "assoc_remove"
+
+    # Broadcast a route request for the device
+    ROUTE_DISCOVERY = "route_discovery"
+
+    # Let routers along the way discover a route on their own
+    DISABLE_ROUTE_DISCOVERY_SUPPRESSION = "disable_route_discovery_suppression"
+
+    # Send the request through the best path the device is known to be reachable by
+    LAST_GOOD_ROUTE = "last_good_route"
+
+
+# Rough airtime of every strategy, in frames sent
+STRATEGY_COST = {
+    RecoveryStrategy.LAST_GOOD_ROUTE: 1,
+    RecoveryStrategy.DISABLE_ROUTE_DISCOVERY_SUPPRESSION: 2,
+    RecoveryStrategy.ROUTE_DISCOVERY: 4,
+    RecoveryStrategy.ASSOC_REMOVE: 5,
+}
+
+_ROUTE_REPAIR = (
+    RecoveryStrategy.ROUTE_DISCOVERY,
+    RecoveryStrategy.DISABLE_ROUTE_DISCOVERY_SUPPRESSION,
+    RecoveryStrategy.LAST_GOOD_ROUTE,
+)
+
+# Strategies are tried in order, one per failed attempt
+DEFAULT_RECOVERY_STRATEGIES = {
+    t.Status.APS_NO_ACK: _ROUTE_REPAIR,
+    t.Status.NWK_NO_ROUTE: _ROUTE_REPAIR,
+    t.Status.MAC_NO_ACK: _ROUTE_REPAIR,
+    # Child aging is disabled so a child that switched parents has to be dropped
+    t.Status.MAC_TRANSACTION_EXPIRED: (RecoveryStrategy.ASSOC_REMOVE,) + _ROUTE_REPAIR,
+}
+
+
+@dataclasses.dataclass
+class StrategyStats:
+    """
+    How well a recovery strategy worked for a single device.
+    """
+
+    attempts: int = 0
+    successes: int = 0
+    airtime: int = 0
+
+    @property
+    def success_rate(self) -> float:
+        # Untried strategies are assumed to work half of the time
+        return (self.successes + 1) / (self.attempts + 2)
+
+
+@dataclasses.dataclass
+class RecoveryState:
+    """
+    Recovery progress of a single request.
+    """
+
+    options: c.af.TransmitOptions
+    relays: typing.Optional[typing.List[t.NWK]] = None
+    # Removed association that has to be restored if the request fails
+    association: typing.Optional[c.Util.AssocGetWithAddress.Rsp] = None
+    tried: typing.Set[RecoveryStrategy] = dataclasses.field(default_factory=set)
+
+    # Strategy applied before the current attempt, credited with its outcome
+    pending: typing.Optional[RecoveryStrategy] = None
+
+
+class RetryPolicy:
+    """
+    Decides how long to wait between attempts to send a request and which strategies
+    to use to reach a device that a request failed to reach.
+
+    Every device remembers how well each strategy worked for it. Strategies that have
+    worked before are tried first, cheapest first.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_retries: int = DEFAULT_MAX_RETRIES,
+        retry_delay: float = DEFAULT_RETRY_DELAY,
+        max_retry_delay: float = DEFAULT_MAX_RETRY_DELAY,
+        jitter: float = DEFAULT_RETRY_JITTER,
+        learn: bool = True,
+        strategies: typing.Optional[
+            typing.Mapping[t.Status, typing.Sequence[RecoveryStrategy]]
+        ] = None,
+    ):
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+        self.jitter = jitter
+        self.learn = learn
+
+        self.strategies = dict(DEFAULT_RECOVERY_STRATEGIES)
+        self.strategies.update(strategies or {})
+
+        self.device_stats: typing.Dict[
+            t.EUI64, typing.Dict[RecoveryStrategy, StrategyStats]
+        ] = collections.defaultdict(lambda: collections.defaultdict(StrategyStats))
+
+    def backoff(self, attempt: int, *, transient: bool = False) -> float:
+        """
+        Exponential backoff with jitter, so requests that failed together are not
+        retried together.
+        """
+
+        delay = self.retry_delay * 2 ** attempt
+
+        if transient:
+            delay *= TRANSIENT_DELAY_FACTOR
+
+        delay = min(self.max_retry_delay, delay)
+
+        return delay * random.uniform(1 - self.jitter, 1)
+
+    def recovery_strategies(
+        self, status: t.Status, ieee: typing.Optional[t.EUI64] = None
+    ) -> typing.List[RecoveryStrategy]:
+        """
+        Strategies to try for a request that failed with the provided status, in order.
+        """
+
+        strategies = list(self.strategies.get(status, ()))
+
+        if not self.learn or ieee is None or ieee not in self.device_stats:
+            return strategies
+
+        stats = self.device_stats[ieee]
+        proven = [
+            s
+            for s in strategies
+            if s in stats
+            and stats[s].attempts >= LEARNING_MIN_ATTEMPTS
+            and stats[s].success_rate >= LEARNING_SUCCESS_THRESHOLD
+        ]
+        proven.sort(key=lambda s: STRATEGY_COST[s])
+
+        return proven + [s for s in strategies if s not in proven]
+
+    def record_attempt(self, ieee: t.EUI64, strategy: RecoveryStrategy) -> None:
+        stats = self.device_stats[ieee][strategy]
+        stats.airtime += STRATEGY_COST[strategy]
+
+    def record_result(
+        self, ieee: t.EUI64, strategy: RecoveryStrategy, *, success: bool
+    ) -> None:
+        stats = self.device_stats[ieee][strategy]
+        stats.attempts += 1
+        stats.successes += success
+
+    def forget(self, ieee: t.EUI64) -> None:
+        self.device_stats.pop(ieee, None)
+
+    def __repr__(self) -> str:
+        return (
+            f"<{type(self).__name__}(max_retries={self.max_retries}, "
+            f"retry_delay={self.retry_delay}, max_retry_delay={self.max_retry_delay}, "
+            f"jitter={self.jitter}, learn={self.learn}, "
+            f"devices={len(self.device_stats)})>"
+        )
@@ -0,0 +1,177 @@
+import time
+import typing
+import logging
+import dataclasses
+
+import zigpy_znp.types as t
+
+LOGGER = logging.getLogger(__name__)
+
+# Route records older than this are not used to send requests
+SOURCE_ROUTE_MAX_AGE = 30 * 60  # seconds
+
+# Number of distinct paths remembered for every device
+SOURCE_ROUTE_MAX_PATHS = 4
+
+
+class RouteCache:
+    """
+    Remembers which destinations recently had a working route, so that their routes do
+    not have to be checked before every request. Entries expire after `ttl` seconds.
+    """
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+
+        self._expiry: typing.Dict[t.NWK, float] = {}
+
+    def is_fresh(self, nwk: t.NWK) -> bool:
+        expiry = self._expiry.get(nwk)
+
+        if expiry is not None and time.monotonic() < expiry:
+            self.hits += 1
+            return True
+
+        self._expiry.pop(nwk, None)
+        self.misses += 1
+
+        return False
+
+    def mark_fresh(self, nwk: t.NWK) -> None:
+        self._expiry[nwk] = time.monotonic() + self.ttl
+
+    def invalidate(self, nwk: t.NWK) -> None:
+        self._expiry.pop(nwk, None)
+
+    def clear(self) -> None:
+        self._expiry.clear()
+
+    def __len__(self) -> int:
+        return len(self._expiry)
+
+    def __repr__(self) -> str:
+        return (
+            f"<{type(self).__name__}(ttl={self.ttl}, routes={len(self)}, "
+            f"hits={self.hits}, misses={self.misses})>"
+        )
+
+
+@dataclasses.dataclass
+class SourceRoute:
+    """
+    A path to a device, with the relays in the order they are used when sending.
+    """
+
+    relays: typing.Tuple[t.NWK, ...]
+    last_seen: float
+    successes: int = 0
+    failures: int = 0
+
+    @property
+    def success_rate(self) -> float:
+        # Unused paths are assumed to work half of the time
+        return (self.successes + 1) / (self.successes + self.failures + 2)
+
+
+class SourceRouteTable:
+    """
+    Paths to devices learned from route records, along with how well each one worked.
+    Also counts the consecutive failures of requests sent without a source route.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_age: float = SOURCE_ROUTE_MAX_AGE,
+        max_paths: int = SOURCE_ROUTE_MAX_PATHS,
+    ):
+        self.max_age = max_age
+        self.max_paths = max_paths
+
+        self._routes: typing.Dict[
+            t.NWK, typing.Dict[typing.Tuple[t.NWK, ...], SourceRoute]
+        ] = {}
+        self._default_failures: typing.Dict[t.NWK, int] = {}
+
+    def record_route(self, nwk: t.NWK, relays: typing.Sequence[t.NWK]) -> None:
+        """
+        Adds a route record. Its relays are ordered from the device towards us.
+        """
+
+        key = tuple(relays[::-1])
+        routes = self._routes.setdefault(nwk, {})
+
+        if key not in routes:
+            routes[key] = SourceRoute(relays=key, last_seen=time.monotonic())
+        else:
+            routes[key].last_seen = time.monotonic()
+
+        # Forget the worst paths, preferring to keep ones seen more recently
+        while len(routes) > self.max_paths:
+            worst = min(routes.values(), key=lambda r: (r.success_rate, r.last_seen))
+            del routes[worst.relays]
+
+    def record_result(
+        self,
+        nwk: t.NWK,
+        relays: typing.Optional[typing.Sequence[t.NWK]],
+        *,
+        success: bool,
+    ) -> None:
+        """
+        Records the outcome of a request sent through the provided relays, or without a
+        source route if there are none.
+        """
+
+        if relays is None:
+            if success:
+                self._default_failures.pop(nwk, None)
+            else:
+                self._default_failures[nwk] = self._default_failures.get(nwk, 0) + 1
+
+            return
+
+        route = self._routes.get(nwk, {}).get(tuple(relays))
+
+        if route is None:
+            return
+
+        if success:
+            route.successes += 1
+
+            # A confirmed delivery proves the path just as well as a route record
+            route.last_seen = time.monotonic()
+        else:
+            route.failures += 1
+
+    def default_failures(self, nwk: t.NWK) -> int:
+        return self._default_failures.get(nwk, 0)
+
+    def routes(self, nwk: t.NWK) -> typing.List[SourceRoute]:
+        return list(self._routes.get(nwk, {}).values())
+
+    def best_route(self, nwk: t.NWK) -> typing.Optional[SourceRoute]:
+        """
+        Picks the recently seen path with the highest success rate. Ties are broken in
+        favor of the most recently seen path.
+        """
+
+        now = time.monotonic()
+        routes = [r for r in self.routes(nwk) if now - r.last_seen <= self.max_age]
+
+        if not routes:
+            return None
+
+        return max(routes, key=lambda r: (r.success_rate, r.last_seen))
+
+    def remove(self, nwk: t.NWK) -> None:
+        self._routes.pop(nwk, None)
+        self._default_failures.pop(nwk, None)
+
+    def __repr__(self) -> str:
+        return (
+            f"<{type(self).__name__}(devices={len(self._routes)}, "
+            f"paths={sum(len(r) for r in self._routes.values())})>"
+        )
@@ -0,0 +1,120 @@
+import time
+import typing
+import asyncio
+import logging
+
+import async_timeout
+
+import zigpy_znp.types as t
+from zigpy_znp.exceptions import ConnectionLostError
+
+LOGGER = logging.getLogger(__name__)
+
+
+class SleepyDeviceQueue:
+    """
+    Parks requests to sleepy end devices while they are asleep. A device is considered
+    asleep once a request to it expires in its parent's indirect queue and awake again
+    as soon as anything is heard from it. Devices are only considered asleep for
+    `expiry` seconds, which is also how long requests are parked.
+    """
+
+    def __init__(self, expiry: float):
+        self.expiry = expiry
+
+        self.parked = 0
+        self.released = 0
+        self.expired = 0
+
+        self._asleep: typing.Dict[t.NWK, float] = {}
+        self._waiters: typing.Dict[t.NWK, typing.List[asyncio.Future]] = {}
+
+    def is_asleep(self, nwk: t.NWK) -> bool:
+        since = self._asleep.get(nwk)
+
+        if since is None:
+            return False
+
+        if time.monotonic() - since > self.expiry:
+            del self._asleep[nwk]
+            return False
+
+        return True
+
+    def mark_asleep(self, nwk: t.NWK) -> None:
+        self._asleep[nwk] = time.monotonic()
+
+    def pending(self, nwk: t.NWK) -> int:
+        return len(self._waiters.get(nwk, []))
+
+    async def wait_until_awake(self, nwk: t.NWK, timeout: float) -> None:
+        """
+        Waits until the device is heard from. Raises `asyncio.TimeoutError` if it does
+        not wake up in time.
+        """
+
+        future = asyncio.get_running_loop().create_future()
+        waiters = self._waiters.setdefault(nwk, [])
+        waiters.append(future)
+        self.parked += 1
+
+        try:
+            async with async_timeout.timeout(max(0, timeout)):
+                await future
+        except asyncio.TimeoutError:
+            self.expired += 1
+            raise
+        finally:
+            if future in waiters:
+                waiters.remove(future)
+
+            if not waiters and self._waiters.get(nwk) is waiters:
+                del self._waiters[nwk]
+
+        self.released += 1
+
+    def wake_up(self, nwk: t.NWK) -> None:
+        """
+        Releases all requests parked for the device.
+        """
+
+        self._asleep.pop(nwk, None)
+        waiters = self._waiters.pop(nwk, [])
+
+        if waiters:
+            LOGGER.debug(
+                "Device 0x%04X woke up, releasing %d requests", nwk, len(waiters)
+            )
+
+        for future in waiters:
+            if not future.done():
+                future.set_result(None)
+
+    def forget(self, nwk: t.NWK) -> None:
+        self._asleep.pop(nwk, None)
+
+    def clear(self) -> None:
+        """
+        Fails all parked requests. The radio is gone, so they can never be sent.
+        """
+
+        for nwk, waiters in self._waiters.items():
+            for future in waiters:
+                if not future.done():
+                    future.set_exception(
+                        ConnectionLostError(
+                            f"Connection lost while device 0x{nwk:04X} was asleep"
+                        )
+                    )
+
+        self._waiters.clear()
+        self._asleep.clear()
+
+    def __repr__(self) -> str:
+        return (
+            f"<{type(self).__name__}(expiry={self.expiry}, "
+            f"asleep={len(self._asleep)}, "
+            f"waiting={sum(len(w) for w in self._waiters.values())}, "
+            f"parked={self.parked}, released={self.released}, "
+            f"expired={self.expired})>"
+        )
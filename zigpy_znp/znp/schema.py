@@ -0,0 +1,238 @@
+import typing
+import dataclasses
+import collections.abc
+
+import zigpy_znp.types as t
+from zigpy_znp.nvram import NVRAMKey
+from zigpy_znp.znp.nib import NIB, CC2531NIB
+from zigpy_znp.types.nvids import NWK_NVID_TABLES, ExNvIds, NvSysIds, OsalNvIds
+
+# Structs on 32-bit platforms are padded to a word boundary
+MAX_STRUCT_PADDING = 3
+
+
+@dataclasses.dataclass(frozen=True)
+class ItemType:
+    type: type
+
+    # Z-Stack versions that use this layout, `None` if unbounded
+    min_version: typing.Optional[float] = None
+    max_version: typing.Optional[float] = None
+
+    # Trailing bytes that may follow the struct. Layouts that already include their
+    # padding must fit exactly.
+    max_padding: int = MAX_STRUCT_PADDING
+
+    def matches_version(self, version: typing.Optional[float]) -> bool:
+        if version is None:
+            return True
+
+        if self.min_version is not None and version < self.min_version:
+            return False
+
+        if self.max_version is not None and version >= self.max_version:
+            return False
+
+        return True
+
+
+# Items with more than one layout are distinguished by their length first and by the
+# Z-Stack version only when more than one layout fits
+LEGACY_ITEMS = {
+    OsalNvIds.EXTADDR: (ItemType(t.EUI64),),
+    OsalNvIds.NIB: (
+        ItemType(NIB, max_padding=0),
+        ItemType(CC2531NIB, max_padding=0),
+    ),
+    OsalNvIds.EXTENDED_PAN_ID: (ItemType(t.ExtendedPanId),),
+    OsalNvIds.BCAST_DELIVERY_TIME: (ItemType(t.uint8_t),),
+    OsalNvIds.CONCENTRATOR_ENABLE: (ItemType(t.Bool),),
+    OsalNvIds.CONCENTRATOR_DISCOVERY: (ItemType(t.uint8_t),),
+    OsalNvIds.CONCENTRATOR_RC: (ItemType(t.Bool),),
+    OsalNvIds.SRC_RTG_EXPIRY_TIME: (ItemType(t.uint8_t),),
+    OsalNvIds.NWK_ACTIVE_KEY_INFO: (ItemType(t.NwkKeyDesc),),
+    OsalNvIds.NWK_ALTERN_KEY_INFO: (ItemType(t.NwkKeyDesc),),
+    OsalNvIds.NWK_CHILD_AGE_ENABLE: (ItemType(t.Bool),),
+    OsalNvIds.APS_USE_EXT_PANID: (ItemType(t.ExtendedPanId),),
+    OsalNvIds.PRECFGKEY: (ItemType(t.KeyData),),
+    OsalNvIds.PRECFGKEYS_ENABLE: (ItemType(t.Bool),),
+    OsalNvIds.PANID: (ItemType(t.PanId),),
+    OsalNvIds.CHANLIST: (ItemType(t.Channels),),
+    OsalNvIds.LOGICAL_TYPE: (ItemType(t.DeviceLogicalType),),
+    OsalNvIds.ZDO_DIRECT_CB: (ItemType(t.Bool),),
+    OsalNvIds.NWKKEY: (
+        ItemType(t.NwkActiveKeyItems, min_version=3.30),
+        ItemType(t.NwkActiveKeyItemsCC2531, max_version=3.30),
+    ),
+}
+
+# Legacy tables, keyed by their first NVID
+LEGACY_TABLES = {
+    OsalNvIds.LEGACY_NWK_SEC_MATERIAL_TABLE_START: (ItemType(t.NwkSecMaterialDesc),),
+    OsalNvIds.LEGACY_TCLK_TABLE_START: (ItemType(t.TCLKDevEntry),),
+}
+
+EX_TABLES = {
+    ExNvIds.NWK_SEC_MATERIAL_TABLE: (ItemType(t.NwkSecMaterialDesc),),
+    ExNvIds.TCLK_TABLE: (ItemType(t.TCLKDevEntry),),
+}
+
+
+def legacy_table_start(nvid: int) -> typing.Optional[OsalNvIds]:
+    """
+    Returns the first NVID of the legacy table containing `nvid`, if there is one.
+    """
+
+    for start, end in NWK_NVID_TABLES.items():
+        if start <= nvid <= end:
+            return start
+
+    return None
+
+
+def item_types(key: NVRAMKey) -> typing.Tuple[ItemType, ...]:
+    """
+    Returns the possible layouts of an NVRAM item. Unknown items have none.
+    """
+
+    sys_id, item_id, sub_id = key
+
+    if sys_id != NvSysIds.ZSTACK:
+        return ()
+
+    if item_id != ExNvIds.LEGACY:
+        return EX_TABLES.get(item_id, ())
+
+    if sub_id in LEGACY_ITEMS:
+        return LEGACY_ITEMS[sub_id]
+
+    return LEGACY_TABLES.get(legacy_table_start(sub_id), ())
+
+
+def parse_item(key: NVRAMKey, value: bytes, *, version: float = None):
+    """
+    Parses an NVRAM item into its registered type. Unknown items are returned as bytes.
+
+    Raises a `ValueError` if no known layout fits the value.
+    """
+
+    types = item_types(key)
+
+    if not types:
+        return value
+
+    # Layouts for the current version are tried first
+    candidates = [i for i in types if i.matches_version(version)]
+    candidates += [i for i in types if i not in candidates]
+
+    parsed = []
+
+    for item_type in candidates:
+        try:
+            obj, remaining = item_type.type.deserialize(value)
+        except ValueError:
+            continue
+
+        if len(remaining) <= item_type.max_padding:
+            parsed.append((obj, remaining))
+
+    # An exact fit is always preferred over one with trailing padding
+    for obj, remaining in parsed:
+        if not remaining:
+            return obj
+
+    if parsed:
+        return parsed[0][0]
+
+    raise ValueError(f"Value of NVRAM item {key!r} has no known layout: {value!r}")
+
+
+class TableView(collections.abc.Sequence):
+    """
+    Sequence of table entries, each parsed only when accessed.
+    """
+
+    def __init__(self, view: "NVRAMView", keys: typing.List[NVRAMKey]):
+        self._view = view
+        self._keys = keys
+
+    @property
+    def keys(self) -> typing.List[NVRAMKey]:
+        return list(self._keys)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._view[key] for key in self._keys[index]]
+
+        return self._view[self._keys[index]]
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __repr__(self) -> str:
+        return f"<{type(self).__name__} with {len(self)} entries>"
+
+
+class NVRAMView(collections.abc.Mapping):
+    """
+    Read-only view of NVRAM keys and values that parses known items into their types
+    on access. Parsed values are cached.
+    """
+
+    def __init__(
+        self, items: typing.Mapping[NVRAMKey, bytes], *, version: float = None
+    ):
+        self._items = items
+        self._version = version
+        self._cache = {}
+
+    @property
+    def raw(self) -> typing.Mapping[NVRAMKey, bytes]:
+        return self._items
+
+    def __getitem__(self, key: NVRAMKey):
+        if key not in self._cache:
+            self._cache[key] = parse_item(key, self._items[key], version=self._version)
+
+        return self._cache[key]
+
+    def __iter__(self) -> typing.Iterator[NVRAMKey]:
+        return iter(self._items)
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def legacy(self, nvid: OsalNvIds):
+        """
+        Returns a parsed legacy item.
+        """
+
+        return self[NvSysIds.ZSTACK, ExNvIds.LEGACY, nvid]
+
+    def table(self, table: typing.Union[OsalNvIds, ExNvIds]) -> TableView:
+        """
+        Returns the entries of a table. Legacy tables are specified by their first NVID
+        and end at the first missing entry.
+        """
+
+        if isinstance(table, OsalNvIds):
+            keys = []
+
+            for nvid in range(table, NWK_NVID_TABLES[table] + 1):
+                key = (NvSysIds.ZSTACK, ExNvIds.LEGACY, nvid)
+
+                if key not in self._items:
+                    break
+
+                keys.append(key)
+        else:
+            keys = sorted(
+                key
+                for key in self._items
+                if key[0] == NvSysIds.ZSTACK and key[1] == table
+            )
+
+        return TableView(self, keys)
+
+    def __repr__(self) -> str:
+        return f"<{type(self).__name__} with {len(self)} items>"